@@ -0,0 +1,473 @@
+#!/usr/bin/env python
+
+"""
+Program that benchmarks the profile pipeline on synthetic DEMs generated offline.
+
+Each stage is timed separately: the WGS 84 transformation of points, the reads of DEM values, the profiles (one by one
+and in batches), the output formats and the requests to the web server. The definitions of the profiles and the sizes
+of the batches are swept, and the results are written to a JSON file that can be compared with the one of a previous
+run (-c), the program then exits with a non zero status if a stage got slower.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import tempfile
+import time
+import timeit
+import urllib
+import urllib2
+
+import cherrypy
+import numpy as np
+from osgeo import gdal
+from osgeo import osr
+
+import dataset_pool
+import geods
+import hgt
+import profile_format
+import profile_server
+import profiler
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+STAGES = ('transform', 'read', 'profile', 'profile_many', 'format', 'server')
+DEM_KINDS = ('mem', 'gtiff', 'hgt')
+DEFAULT_DEFINITIONS = (64, 256, 1024, 4096, profiler.AUTO)
+DEFAULT_BATCH_SIZES = (1, 16, 256)
+FORMATS = (('json', profile_format.JSON), ('binary', profile_format.BINARY), ('png', profile_format.PNG),
+           ('png_raster', profile_format.PNG_raster))
+# endpoints requested by the server stage, with their extra parameters
+ENDPOINTS = (('json', {}), ('binary', {}), ('png', {'style': 'raster'}), ('png', {'style': 'plot'}))
+
+# pixel size of the synthetic DEMs: 3 arc seconds (like SRTM3) for a geographic CRS, in meters for a projected one
+GEOGRAPHIC_PIXEL_SIZE = 1 / 1200.
+PROJECTED_PIXEL_SIZE = 90.
+# center of the synthetic DEMs, .hgt tiles are named after it
+CENTER_LAT = 43.5
+CENTER_LONG = 1.5
+HGT_TILE_NAME = 'N43E001.hgt'
+# the random segments are drawn in the central part of the DEMs
+SEGMENTS_MARGIN = 0.1
+# number of points of the transform and read stages
+STAGE_POINTS = (1000, 100000)
+# slowdown of a stage, compared to the baseline, reported as a regression
+REGRESSION_THRESHOLD = 0.1
+
+
+def synthetic_terrain(random, rows, columns):
+    """
+    Generate a random terrain: smooth hills made of sine waves, plus some noise.
+
+    :param random: the numpy RandomState generating the terrain
+    :param rows: the number of rows
+    :param columns: the number of columns
+    :return: the elevations in meters, a numpy array of int16
+    """
+    y_steps = np.linspace(0, 1, rows)[:, np.newaxis]
+    x_steps = np.linspace(0, 1, columns)
+    terrain = np.empty((rows, columns))
+    terrain.fill(500.)
+    for _ in range(8):
+        frequency_x, frequency_y = random.uniform(1, 20, 2)
+        phase_x, phase_y = random.uniform(0, 2 * np.pi, 2)
+        amplitude = random.uniform(100, 400) / max(frequency_x, frequency_y) ** 0.5
+        terrain += amplitude * np.sin(2 * np.pi * frequency_x * x_steps + phase_x) * \
+            np.sin(2 * np.pi * frequency_y * y_steps + phase_y)
+    terrain += random.normal(0, 3, terrain.shape)
+
+    return np.clip(terrain, 0, 8000).astype(np.int16)
+
+
+def create_gdal_dem(filename, terrain, epsg=4326, block_size=256, driver_name='GTiff'):
+    """
+    Create a GDAL DEM centered on CENTER_LAT, CENTER_LONG.
+
+    :param filename: the file location, '' for the MEM driver
+    :param terrain: the elevations, see synthetic_terrain
+    :param epsg: the EPSG code of the coordinate system, defaults to 4326 (WGS 84)
+    :param block_size: the size of the square blocks of a GeoTIFF, defaults to 256, 0 for strips of one row
+    :param driver_name: the GDAL driver, 'GTiff' or 'MEM'
+    :return: the dataset, opened read only for a GeoTIFF
+    """
+    rows, columns = terrain.shape
+    spatial_ref = osr.SpatialReference()
+    spatial_ref.ImportFromEPSG(epsg)
+    projection_ref = spatial_ref.ExportToWkt()
+    if spatial_ref.IsGeographic():
+        pixel_size = GEOGRAPHIC_PIXEL_SIZE
+        center_x, center_y = CENTER_LONG, CENTER_LAT
+    else:
+        pixel_size = PROJECTED_PIXEL_SIZE
+        center_x, center_y = geods.transform_from_wgs84(projection_ref, CENTER_LAT, CENTER_LONG)
+
+    options = []
+    if driver_name == 'GTiff':
+        options = ['TILED=YES', 'BLOCKXSIZE=%d' % block_size, 'BLOCKYSIZE=%d' % block_size] if block_size else \
+            ['BLOCKYSIZE=1']
+    data_source = gdal.GetDriverByName(driver_name).Create(filename, columns, rows, 1, gdal.GDT_Int16, options)
+    data_source.SetGeoTransform((float(center_x) - columns * pixel_size / 2, pixel_size, 0,
+                                 float(center_y) + rows * pixel_size / 2, 0, -pixel_size))
+    data_source.SetProjection(projection_ref)
+    band = data_source.GetRasterBand(1)
+    band.SetNoDataValue(hgt.HGT_NO_DATA)
+    band.WriteArray(terrain)
+    band.FlushCache()
+    if driver_name == 'MEM':
+        return data_source
+
+    data_source = None  # closes the file
+    return gdal.Open(filename, gdal.GA_ReadOnly)
+
+
+def create_hgt_dem(directory, terrain):
+    """
+    Create a .hgt tile (HGT_TILE_NAME), read natively.
+
+    :param directory: the directory to create the tile in
+    :param terrain: the elevations, see synthetic_terrain, of size 1201x1201 or 3601x3601
+    :return: the hgt.HGTDataSource
+    """
+    if terrain.shape not in ((1201, 1201), (3601, 3601)):
+        raise Exception(".hgt tiles have 1201 or 3601 rows and columns, got: %dx%d" % terrain.shape)
+
+    filename = os.path.join(directory, HGT_TILE_NAME)
+    terrain.astype(hgt.HGT_DTYPE).tofile(filename)
+    return hgt.HGTDataSource(filename)
+
+
+def create_dem(kind, directory, terrain, epsg, block_size):
+    """
+    Create a synthetic DEM.
+
+    :param kind: one of DEM_KINDS
+    :param directory: the directory to create the files in
+    :param terrain: the elevations, see synthetic_terrain
+    :param epsg: the EPSG code of the coordinate system, ignored by .hgt tiles (WGS 84)
+    :param block_size: the size of the blocks of a GeoTIFF, 0 for strips
+    :return: the couple of the name of the DEM, describing it in the results, and the dataset
+    """
+    rows, columns = terrain.shape
+    if kind == 'hgt':
+        return 'hgt-%d' % rows, create_hgt_dem(directory, terrain)
+
+    if kind == 'mem':
+        return 'mem-epsg%d-%dx%d' % (epsg, columns, rows), create_gdal_dem('', terrain, epsg, driver_name='MEM')
+
+    return 'gtiff-epsg%d-%dx%d-%s' % (epsg, columns, rows, 'block%d' % block_size if block_size else 'strips'), \
+        create_gdal_dem(os.path.join(directory, 'dem.tif'), terrain, epsg, block_size)
+
+
+def random_points(random, data_source, count):
+    """
+    Draw random WGS 84 points in the central part of a dataset.
+
+    :param random: the numpy RandomState drawing the points
+    :param data_source: the dataset
+    :param count: the number of points
+    :return: the couple of numpy arrays (latitudes, longitudes)
+    """
+    transform = data_source.GetGeoTransform()
+    pixel_x = random.uniform(SEGMENTS_MARGIN, 1 - SEGMENTS_MARGIN, count) * data_source.RasterXSize
+    pixel_y = random.uniform(SEGMENTS_MARGIN, 1 - SEGMENTS_MARGIN, count) * data_source.RasterYSize
+    transformer = geods.get_wgs84_transformer(data_source.GetProjectionRef())
+
+    return transformer.inverse_transform_points(transform[0] + pixel_x * transform[1],
+                                                transform[3] + pixel_y * transform[5])
+
+
+def time_calls(function, repeat, warmup=1):
+    """
+    Time the calls of a function.
+
+    :param function: the function to call, without arguments
+    :param repeat: the number of timed calls
+    :param warmup: the number of calls made before timing, defaults to 1
+    :return: the dict of the 'runs' count and the 'min', 'median' and 'mean' durations in seconds
+    """
+    for _ in range(warmup):
+        function()
+
+    durations = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        function()
+        durations.append(timeit.default_timer() - start)
+
+    return {'runs': repeat, 'min': min(durations), 'median': float(np.median(durations)),
+            'mean': float(np.mean(durations))}
+
+
+def transform_cases(data_source, random, _):
+    """
+    Cases of the transform stage: geods.transform_from_wgs84 of random points.
+
+    :return: the generator of (parameters, function, items per call) cases
+    """
+    projection_ref = data_source.GetProjectionRef()
+    for count in STAGE_POINTS:
+        latitudes, longitudes = random_points(random, data_source, count)
+        yield {'points': count}, lambda: geods.transform_from_wgs84(projection_ref, latitudes, longitudes), count
+
+
+def read_cases(data_source, random, _):
+    """
+    Cases of the read stage: geods.read_ds_data of random pixels, and of the pixels along a segment.
+
+    :return: the generator of (parameters, function, items per call) cases
+    """
+    for count in STAGE_POINTS:
+        offset_x = random.randint(0, data_source.RasterXSize, count)
+        offset_y = random.randint(0, data_source.RasterYSize, count)
+        yield {'points': count, 'pattern': 'scattered'}, lambda: geods.read_ds_data(data_source, offset_x,
+                                                                                    offset_y), count
+
+        steps = np.linspace(SEGMENTS_MARGIN, 1 - SEGMENTS_MARGIN, count)
+        line_x = (steps * data_source.RasterXSize).astype(int)
+        line_y = (steps[::-1] * data_source.RasterYSize).astype(int)
+        yield {'points': count, 'pattern': 'segment'}, lambda: geods.read_ds_data(data_source, line_x, line_y), count
+
+
+def profile_cases(data_source, segments, args):
+    """
+    Cases of the profile stage: profiler.profile of the segments, one by one, for each definition.
+
+    :return: the generator of (parameters, function, items per call) cases
+    """
+    for definition in args.definitions:
+        cycle = itertools.cycle(zip(*segments))
+        yield {'definition': definition}, lambda: profiler.profile(data_source, *next(cycle), definition=definition,
+                                                                   frequency=5.8e9), 1
+
+
+def profile_many_cases(data_source, segments, args):
+    """
+    Cases of the profile_many stage: profiler.profile_many of batches of segments, for each definition (EXACT is not
+    supported) and batch size.
+
+    :return: the generator of (parameters, function, items per call) cases
+    """
+    for definition in args.definitions:
+        if definition == profiler.EXACT:
+            continue
+        for batch_size in args.batch_sizes:
+            batch = [coordinates[np.arange(batch_size) % len(coordinates)] for coordinates in segments]
+            yield {'definition': definition, 'batch_size': batch_size}, \
+                lambda: profiler.profile_many(data_source, *batch, definition=definition), batch_size
+
+
+def format_cases(data_source, segments, args):
+    """
+    Cases of the format stage: each output format of a profile, for each definition.
+
+    :return: the generator of (parameters, function, items per call) cases
+    """
+    for definition in args.definitions:
+        profile_data = profiler.profile(data_source, *[coordinates[0] for coordinates in segments],
+                                        definition=definition, frequency=5.8e9)
+        for name, output_format in FORMATS:
+            yield {'definition': definition, 'format': name}, lambda: output_format.get_data(profile_data), 1
+
+
+def free_port():
+    """
+    :return: a free TCP port of the local host
+    """
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def server_cases(data_source, segments, args):
+    """
+    Cases of the server stage: requests to the endpoints of a profile_server.Profile served in this process, without
+    response cache, for each definition.
+
+    :return: the generator of (parameters, function, items per call) cases
+    """
+    # the server is configured by main, it is restarted for each DEM
+    port = cherrypy.server.socket_port
+    # the requests are sent one at a time, a single handle is enough
+    pool = dataset_pool.DatasetPool(lambda: data_source, 1)
+    cherrypy.tree.mount(profile_server.Profile(pool), '/profile')
+    cherrypy.engine.start()
+    try:
+        for definition in args.definitions:
+            for endpoint, params in ENDPOINTS:
+                urls = ['http://127.0.0.1:%d/profile/%s?%s' % (port, endpoint, urllib.urlencode(dict(
+                    params, lat1=lat1, long1=long1, lat2=lat2, long2=long2, definition=definition)))
+                    for lat1, long1, lat2, long2 in zip(*segments)]
+                cycle = itertools.cycle(urls)
+                yield dict(params, definition=definition, endpoint=endpoint), \
+                    lambda: urllib2.urlopen(next(cycle)).read(), 1
+    finally:
+        cherrypy.engine.stop()
+
+
+STAGE_CASES = {
+    'transform': transform_cases,
+    'read': read_cases,
+    'profile': profile_cases,
+    'profile_many': profile_many_cases,
+    'format': format_cases,
+    'server': server_cases
+}
+
+
+def run_stage(stage, dem_name, data_source, random, args):
+    """
+    Time the cases of a stage.
+
+    :param stage: one of STAGES
+    :param dem_name: the name of the DEM, see create_dem
+    :param data_source: the DEM
+    :param random: the numpy RandomState drawing the points
+    :param args: the command line arguments
+    :return: the list of results
+    """
+    if stage in ('transform', 'read'):
+        context = random
+    else:
+        lat1, long1 = random_points(random, data_source, args.segments)
+        lat2, long2 = random_points(random, data_source, args.segments)
+        context = (lat1, long1, lat2, long2)
+
+    results = []
+    for params, function, items in STAGE_CASES[stage](data_source, context, args):
+        result = dict(time_calls(function, args.repeat), dem=dem_name, stage=stage, params=params)
+        result['items_per_second'] = items / result['median'] if result['median'] > 0 else None
+        LOGGER.info("%s %s %s: %.3f ms (median), %.1f items/s", dem_name, stage, format_params(params),
+                    result['median'] * 1000, result['items_per_second'] or 0)
+        results.append(result)
+
+    return results
+
+
+def format_params(params):
+    """
+    :param params: the parameters of a case
+    :return: the parameters as a short string
+    """
+    return ' '.join('%s=%s' % item for item in sorted(params.items()))
+
+
+def result_key(result):
+    """
+    :param result: a result of run_stage
+    :return: the key identifying the case of the result between two runs
+    """
+    return result['dem'], result['stage'], format_params(result['params'])
+
+
+def compare_results(baseline, results, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare results to the ones of a previous run, logging the changes of the median durations.
+
+    :param baseline: the results of the previous run
+    :param results: the results of this run
+    :param threshold: the slowdown reported as a regression, defaults to REGRESSION_THRESHOLD
+    :return: the number of regressions
+    """
+    baseline_results = dict((result_key(result), result) for result in baseline)
+    regressions = 0
+    for result in results:
+        base = baseline_results.get(result_key(result))
+        if base is None:
+            continue
+
+        change = result['median'] / base['median'] - 1 if base['median'] > 0 else 0
+        log = LOGGER.info
+        if change > threshold:
+            regressions += 1
+            log = LOGGER.warning
+        log("%s %s %s: %.3f ms -> %.3f ms (%+.0f%%)", result['dem'], result['stage'], format_params(result['params']),
+            base['median'] * 1000, result['median'] * 1000, change * 100)
+
+    return regressions
+
+
+def environment():
+    """
+    :return: the description of the environment of the run
+    """
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'gdal': gdal.__version__
+    }
+
+
+def main():
+    """Main entrypoint"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', '--dem-kinds', nargs='+', choices=DEM_KINDS, default=list(DEM_KINDS),
+                        help="kinds of synthetic DEMs: GDAL in memory, GeoTIFF file or .hgt tile, defaults to all")
+    parser.add_argument('-sz', '--size', type=int, default=1201,
+                        help="number of rows and columns of the DEMs, defaults to 1201 (.hgt tiles need 1201 or 3601)")
+    parser.add_argument('-e', '--epsg', type=int, default=4326,
+                        help="EPSG code of the coordinate system of the GDAL DEMs, ex: 3035, defaults to 4326")
+    parser.add_argument('-bs', '--block-size', type=int, default=256,
+                        help="size of the square blocks of the GeoTIFF DEMs, 0 for strips, defaults to 256")
+    parser.add_argument('-s', '--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help="stages to benchmark, defaults to all")
+    parser.add_argument('-df', '--definitions', nargs='+', type=profiler.parse_definition,
+                        default=list(DEFAULT_DEFINITIONS), help="definitions of the profiles, including 'exact' and "
+                                                                "'auto', defaults to 64 256 1024 4096 auto")
+    parser.add_argument('-ba', '--batch-sizes', nargs='+', type=int, default=list(DEFAULT_BATCH_SIZES),
+                        help="numbers of profiles computed at once by profile_many, defaults to 1 16 256")
+    parser.add_argument('-n', '--segments', type=int, default=64, help="number of random segments, defaults to 64")
+    parser.add_argument('-r', '--repeat', type=int, default=20, help="timed calls per case, defaults to 20")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random terrains and segments")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="results file, defaults to benchmark.json")
+    parser.add_argument('-c', '--compare', metavar='BASELINE',
+                        help="results file of a previous run to compare with, ex: benchmark-master.json")
+    args = parser.parse_args()
+
+    gdal.AllRegister()
+    if 'server' in args.stages:
+        cherrypy.config.update({'server.socket_host': '127.0.0.1', 'server.socket_port': free_port(),
+                                'log.screen': False, 'engine.autoreload.on': False, 'checker.on': False})
+        cherrypy.log.access_log.propagate = False
+
+    directory = tempfile.mkdtemp(prefix='benchmark')
+    results = []
+    try:
+        for kind in args.dem_kinds:
+            random = np.random.RandomState(args.seed)
+            terrain = synthetic_terrain(random, args.size, args.size)
+            dem_name, data_source = create_dem(kind, directory, terrain, args.epsg, args.block_size)
+            for stage in args.stages:
+                results.extend(run_stage(stage, dem_name, data_source, random, args))
+            data_source = None
+    finally:
+        shutil.rmtree(directory)
+        if 'server' in args.stages:
+            cherrypy.engine.exit()
+
+    with open(args.output, 'w') as output:
+        json.dump({'environment': environment(), 'arguments': vars(args), 'results': results}, output, indent=2,
+                  sort_keys=True)
+    LOGGER.info("results written to %s", args.output)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare_results(json.load(baseline)['results'], results)
+        if regressions:
+            LOGGER.warning("%d cases are more than %d%% slower", regressions, REGRESSION_THRESHOLD * 100)
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
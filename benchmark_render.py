@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""
+Program that benchmarks the rendering of PNG profiles: it renders many synthetic profiles with a plot style and
+reports the number of renders per second and the peak memory used by the process, which must stay steady.
+"""
+
+import argparse
+from io import BytesIO
+import logging
+import os
+import resource
+import time
+
+import numpy as np
+
+import geometry
+import plot_style
+import png_raster
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+# matplotlib plot styles, and 'raster' for png_raster
+STYLES = ('corrected_elevation', 'curved_sight', 'detailed_plot', 'raster')
+
+
+def synthetic_profile(random, definition, length=20000.):
+    """
+    Build a random profile, shaped like the ones of profiler.profile.
+
+    :param random: the numpy RandomState generating the terrain
+    :param definition: the number of points of the profile
+    :param length: the length of the profile in meters
+    :return: the profile data
+    """
+    distances = np.linspace(0, length, definition)
+    elevations = 200 + np.cumsum(random.normal(0, 5, definition))
+    # earth bulge, close to the overheads of geometry.distances_and_overheads
+    overheads = distances * (length - distances) / (2 * geometry.EARTH_RADIUS)
+    sights = np.linspace(elevations[0] + 10, elevations[-1] + 10, definition)
+
+    return {'distances': distances, 'elevations': elevations, 'overheads': overheads, 'sights': sights}
+
+
+def render_raster(profile_data, fd):  # pylint: disable=invalid-name
+    """
+    Render a profile with png_raster, like the plot styles.
+
+    :param profile_data: the profile data
+    :param fd: the file-like object to write the PNG to
+    :return: None
+    """
+    fd.write(png_raster.render_png(profile_data))
+
+
+def peak_memory_mb():
+    """
+    :return: the peak resident memory of the process in MB (ru_maxrss is in KB on Linux)
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def main():
+    """Main entrypoint"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--renders', type=int, default=5000, help="number of renders, defaults to 5000")
+    parser.add_argument('-s', '--style', choices=STYLES, default='corrected_elevation',
+                        help="plot style, defaults to corrected_elevation")
+    parser.add_argument('-df', '--definition', type=int, default=512,
+                        help="number of points of the profiles, defaults to 512")
+    parser.add_argument('-r', '--report', type=int, default=500, help="renders between two reports, defaults to 500")
+    args = parser.parse_args()
+
+    style = render_raster if args.style == 'raster' else getattr(plot_style, args.style)
+    random = np.random.RandomState(0)
+    profiles = [synthetic_profile(random, args.definition) for _ in range(16)]
+
+    start = last_time = time.time()
+    last_index = 0
+    for index in range(1, args.renders + 1):
+        style(profiles[index % len(profiles)], BytesIO())
+        if index % args.report == 0 or index == args.renders:
+            now = time.time()
+            LOGGER.info("%d renders, %.1f renders/s, peak memory: %.1f MB", index,
+                        (index - last_index) / (now - last_time), peak_memory_mb())
+            last_time = now
+            last_index = index
+
+    LOGGER.info("%d renders in %.1f s, %.1f renders/s", args.renders, time.time() - start,
+                args.renders / (time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
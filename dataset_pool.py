@@ -0,0 +1,73 @@
+"""
+Pool of DEM dataset handles shared between the worker threads of the web server.
+
+GDAL dataset handles must not be used by several threads at once, each worker checks a handle out of the pool for the
+duration of a request and checks it back in afterwards, so that concurrent requests read the DEM in parallel with
+their own handle.
+"""
+
+import contextlib
+import logging
+import os
+import Queue
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+DEFAULT_POOL_SIZE = 10  # default value of cherrypy server.thread_pool
+# errors of the reads of the DEM, after which a handle is reopened
+BROKEN_ERRORS = (RuntimeError, EnvironmentError)
+
+
+class DatasetPool(object):
+    """
+    Fixed-size pool of dataset handles, opened lazily.
+
+    A handle whose use raised an I/O error (GDAL raises RuntimeError when its exceptions are enabled) is considered
+    broken, it is closed and a new one is opened on the next checkout. Other exceptions, like requests for points out
+    of the DEM, keep the handle in the pool.
+    """
+
+    def __init__(self, opener, size=DEFAULT_POOL_SIZE, broken_errors=BROKEN_ERRORS):
+        """
+        :param opener: the function opening a new handle, called without arguments
+        :param size: the number of handles, should be the number of worker threads
+        :param broken_errors: the exception types discarding the handle they are raised with, defaults to BROKEN_ERRORS
+        """
+        self.opener = opener
+        self.size = size
+        self.broken_errors = broken_errors
+        self._handles = Queue.Queue()
+        for _ in range(size):
+            self._handles.put(None)
+
+    def open(self):
+        """
+        Open a new handle.
+
+        :return: the handle
+        """
+        data_source = self.opener()
+        if data_source is None:
+            raise Exception("Unable to open the DEM")
+
+        return data_source
+
+    @contextlib.contextmanager
+    def checkout(self, timeout=None):
+        """
+        Check a handle out of the pool, for the duration of a with block, waiting for one to be available.
+
+        :param timeout: the maximum number of seconds to wait for a handle, defaults to None (no limit)
+        :return: the context manager providing the handle, raises Queue.Empty if the timeout expires
+        """
+        data_source = self._handles.get(timeout=timeout)
+        try:
+            if data_source is None:
+                data_source = self.open()
+            yield data_source
+        except self.broken_errors:
+            LOGGER.warning("discarding a dataset handle after an error, it will be reopened")
+            data_source = None
+            raise
+        finally:
+            self._handles.put(data_source)
@@ -0,0 +1,310 @@
+"""
+Catalog of DEM tiles stored in a directory, used as a single elevation data source.
+
+The extents of the tiles are indexed once when the catalog is created (from the file name for SRTM .hgt tiles),
+tiles are then opened lazily and only a bounded number of them are kept open.
+
+A DEMCatalog can be used in place of a GDAL dataset with geods.read_ds_value_from_wgs84 and profiler.profile.
+"""
+
+import collections
+import functools
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+from osgeo import gdal
+from gdalconst import GA_ReadOnly
+
+import geods
+import hgt
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+TILE_EXTENSIONS = ('.hgt', '.tif', '.tiff')
+DEFAULT_MAX_OPEN_TILES = 16
+
+# 'auto' reads .hgt files with the native reader (see hgt.py) and any other file with GDAL
+BACKENDS = ('auto', 'gdal', 'hgt')
+
+
+def open_gdal(filename):
+    """
+    Open a DEM file with GDAL in read only mode.
+
+    :param filename: the DEM file location
+    :return: the GDAL dataset
+    """
+    return gdal.Open(filename, GA_ReadOnly)
+
+
+def open_file(filename, backend='auto'):
+    """
+    Open a DEM file with the given backend.
+
+    :param filename: the DEM file location
+    :param backend: one of BACKENDS, defaults to 'auto'
+    :return: the dataset, a hgt.HGTDataSource or a GDAL dataset
+    """
+    if backend == 'hgt' or (backend == 'auto' and hgt.is_hgt_filename(filename)):
+        return hgt.HGTDataSource(filename)
+
+    return open_gdal(filename)
+
+
+def hgt_extent(filename):
+    """
+    Compute the WGS 84 extent of a SRTM .hgt tile from its name and size, without opening it.
+
+    Pixels of .hgt files are centered on the grid nodes, so the extent overlaps the 1x1 degree cell by half a pixel.
+
+    :param filename: the .hgt file location, ex: '/path/to/N43E001.hgt'
+    :return: the extent as (min_lat, min_long, max_lat, max_long) or None if the name is not a valid .hgt name
+    """
+    if not hgt.is_hgt_filename(filename):
+        return None
+
+    origin_x, pixel_size, _, origin_y, _, _ = hgt.hgt_geo_transform(filename)
+    extent_size = hgt.hgt_size(filename) * pixel_size
+
+    return origin_y - extent_size, origin_x, origin_y, origin_x + extent_size
+
+
+def dataset_extent(data_source, edge_points=8):
+    """
+    Compute the WGS 84 bounding box of a dataset by transforming points along the edges of its raster.
+
+    :param data_source: the dataset
+    :param edge_points: the number of points transformed on each edge
+    :return: the extent as (min_lat, min_long, max_lat, max_long)
+    """
+    transform = data_source.GetGeoTransform()
+    steps = np.linspace(0, 1, edge_points)
+    zeros = np.zeros_like(steps)
+    ones = np.ones_like(steps)
+    pixel_x = np.concatenate([steps, ones, steps, zeros]) * data_source.RasterXSize
+    pixel_y = np.concatenate([zeros, steps, ones, steps]) * data_source.RasterYSize
+    ref_x = transform[0] + pixel_x * transform[1] + pixel_y * transform[2]
+    ref_y = transform[3] + pixel_x * transform[4] + pixel_y * transform[5]
+    transformer = geods.get_wgs84_transformer(data_source.GetProjectionRef())
+    lats, longs = transformer.inverse_transform_points(ref_x, ref_y)
+
+    return lats.min(), longs.min(), lats.max(), longs.max()
+
+
+def scan_tiles(directory, opener=open_file):
+    """
+    List the DEM tiles of a directory with their WGS 84 extent.
+
+    :param directory: the directory to scan
+    :param opener: the function used to open the tiles whose extent can't be determined from their name
+    :return: the list of (filename, extent) couples, extents being (min_lat, min_long, max_lat, max_long)
+    """
+    tiles = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(TILE_EXTENSIONS):
+            continue
+        filename = os.path.join(directory, name)
+        extent = hgt_extent(filename)
+        if extent is None:
+            extent = dataset_extent(opener(filename))
+        tiles.append((filename, extent))
+    LOGGER.info("found %d DEM tiles in %s", len(tiles), directory)
+
+    return tiles
+
+
+class DEMCatalog(object):
+    """
+    Set of DEM tiles indexed by their extents and opened lazily.
+    """
+
+    def __init__(self, directory=None, tiles=None, max_open_tiles=DEFAULT_MAX_OPEN_TILES, opener=open_file):
+        """
+        :param directory: the directory containing the tiles, ignored if tiles is given
+        :param tiles: the already scanned list of tiles (see scan_tiles)
+        :param max_open_tiles: the maximum number of tiles kept open
+        :param opener: the function used to open a tile from its filename
+        """
+        self.tiles = tiles if tiles is not None else scan_tiles(directory, opener)
+        self.max_open_tiles = max_open_tiles
+        self.opener = opener
+        self._open_tiles = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        # spatial index: 1x1 degree cell (floored lat, floored long) -> indexes of the tiles intersecting it
+        self.index = collections.defaultdict(list)
+        for tile_index, (_, (min_lat, min_long, max_lat, max_long)) in enumerate(self.tiles):
+            for cell_lat in range(int(math.floor(min_lat)), int(math.floor(max_lat)) + 1):
+                for cell_long in range(int(math.floor(min_long)), int(math.floor(max_long)) + 1):
+                    self.index[(cell_lat, cell_long)].append(tile_index)
+
+    def clone(self):
+        """
+        Return a new catalog sharing the tiles of this one but with its own open tiles.
+
+        :return: the new catalog
+        """
+        return DEMCatalog(tiles=self.tiles, max_open_tiles=self.max_open_tiles, opener=self.opener)
+
+    def get_data_source(self, tile_index):
+        """
+        Return the dataset of a tile, opening it if needed and closing the least recently used one if too many are
+        open.
+
+        :param tile_index: the index of the tile
+        :return: the dataset
+        """
+        with self._lock:
+            data_source = self._open_tiles.pop(tile_index, None)
+            if data_source is None:
+                LOGGER.debug("opening DEM tile: %s", self.tiles[tile_index][0])
+                data_source = self.opener(self.tiles[tile_index][0])
+                while len(self._open_tiles) >= self.max_open_tiles:
+                    self._open_tiles.popitem(last=False)
+            self._open_tiles[tile_index] = data_source
+
+        return data_source
+
+    def data_source_at(self, wgs84_lat, wgs84_long):
+        """
+        Return the dataset of the tile containing the specified WGS 84 (GPS) coordinates.
+
+        :param wgs84_lat: the WGS 84 latitude
+        :param wgs84_long: the WGS 84 longitude
+        :return: the dataset
+        """
+        for tile_index in self.candidate_tiles(np.array([wgs84_lat]), np.array([wgs84_long])):
+            data_source = self.get_data_source(tile_index)
+            if geods.raster_contains(data_source, wgs84_lat, wgs84_long):
+                return data_source
+
+        raise geods.OutOfExtentError("No DEM tile contains: %f, %f" % (wgs84_lat, wgs84_long))
+
+    def candidate_tiles(self, wgs84_lat, wgs84_long):
+        """
+        Return the tiles that may contain some of the given coordinates, according to the spatial index.
+
+        :param wgs84_lat: the numpy array of WGS 84 latitudes
+        :param wgs84_long: the numpy array of WGS 84 longitudes
+        :return: the sorted list of tile indexes
+        """
+        cells = set(zip(np.floor(wgs84_lat).astype(int).tolist(), np.floor(wgs84_long).astype(int).tolist()))
+        tile_indexes = set()
+        for cell in cells:
+            tile_indexes.update(self.index.get(cell, ()))
+
+        return sorted(tile_indexes)
+
+    def read_value_from_wgs84(self, wgs84_lat, wgs84_long, interpolation=geods.NEAREST):
+        """
+        Read the values at the specified WGS 84 (GPS) coordinates.
+
+        The coordinates are split between the tiles containing them and read in bulk tile by tile, the interpolation
+        neighbours out of a tile being read in the adjacent tiles (see read_tile_interpolated_data). Like a single
+        dataset, coordinates outside of every tile raise a geods.OutOfExtentError.
+
+        :param wgs84_lat: the WGS 84 latitude
+        :param wgs84_long: the WGS 84 longitude
+        :param interpolation: one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :return: the values as a float numpy array
+        """
+        values, pending = self.read_covered_values(wgs84_lat, wgs84_long, interpolation)
+        if pending.any():
+            raise geods.OutOfExtentError("%d coordinates are not covered by any DEM tile" % np.count_nonzero(pending))
+
+        return values
+
+    def read_covered_values(self, wgs84_lat, wgs84_long, interpolation=geods.NEAREST):
+        """
+        Read the values at the specified WGS 84 (GPS) coordinates covered by the tiles.
+
+        :param wgs84_lat: the WGS 84 latitude
+        :param wgs84_long: the WGS 84 longitude
+        :param interpolation: one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :return: the values as a float numpy array, with NaN for the coordinates outside of every tile, and the boolean
+                 numpy array of these coordinates
+        """
+        shape = np.shape(wgs84_lat)
+        lats = np.ravel(wgs84_lat).astype(float)
+        longs = np.ravel(wgs84_long).astype(float)
+        values = np.full(lats.shape, np.nan)
+        pending = np.ones(lats.shape, dtype=bool)
+
+        for tile_index in self.candidate_tiles(lats, longs):
+            min_lat, min_long, max_lat, max_long = self.tiles[tile_index][1]
+            indexes = np.flatnonzero(pending & (lats >= min_lat) & (lats <= max_lat) & (longs >= min_long) &
+                                     (longs <= max_long))
+            if indexes.size == 0:
+                continue
+
+            data_source = self.get_data_source(tile_index)
+            # the extent is only a bounding box, keep the coordinates really inside the raster
+            indexes = indexes[geods.raster_contains(data_source, lats[indexes], longs[indexes])]
+            if indexes.size == 0:
+                continue
+
+            if interpolation == geods.NEAREST:
+                values[indexes] = geods.read_ds_value_from_wgs84(data_source, lats[indexes], longs[indexes])
+            else:
+                values[indexes] = self.read_tile_interpolated_data(data_source, lats[indexes], longs[indexes],
+                                                                   interpolation)
+            pending[indexes] = False
+
+        return values.reshape(shape), pending.reshape(shape)
+
+    def read_tile_interpolated_data(self, data_source, wgs84_lat, wgs84_long, interpolation):
+        """
+        Read interpolated values in a tile, like geods.read_ds_interpolated_data but the neighbours out of the tile
+        being read in the adjacent tiles, so that there is no seam along the borders of the tiles. Only the neighbours
+        out of every tile are replaced by the nearest pixel of the edge.
+
+        :param data_source: the dataset of the tile containing the coordinates
+        :param wgs84_lat: the numpy array of WGS 84 latitudes
+        :param wgs84_long: the numpy array of WGS 84 longitudes
+        :param interpolation: geods.BILINEAR or geods.BICUBIC
+        :return: the interpolated values as floats
+        """
+        transform = data_source.GetGeoTransform()
+        projected_x, projected_y = geods.transform_from_wgs84(data_source.GetProjectionRef(), wgs84_lat, wgs84_long)
+        pixel_x, pixel_y = geods.compute_pixel_coordinates(transform, projected_x, projected_y)
+        offset_x, offset_y, weights_x, weights_y = geods.interpolation_neighbourhoods(pixel_x, pixel_y, interpolation)
+
+        clipped_x = np.clip(offset_x, 0, data_source.RasterXSize - 1)
+        clipped_y = np.clip(offset_y, 0, data_source.RasterYSize - 1)
+        data = geods.read_ds_data(data_source, clipped_x, clipped_y).astype(float)
+
+        outside = (clipped_x != offset_x) | (clipped_y != offset_y)
+        if outside.any():
+            # WGS 84 coordinates of the centers of the neighbours out of the tile
+            center_x = offset_x[outside] + 0.5
+            center_y = offset_y[outside] + 0.5
+            transformer = geods.get_wgs84_transformer(data_source.GetProjectionRef())
+            lats, longs = transformer.inverse_transform_points(
+                transform[0] + center_x * transform[1] + center_y * transform[2],
+                transform[3] + center_x * transform[4] + center_y * transform[5])
+            neighbours, uncovered = self.read_covered_values(lats, longs)
+            data[outside] = np.where(uncovered, data[outside], neighbours)
+
+        return geods.interpolate(data, weights_x, weights_y)
+
+
+def open_dem(location, backend='auto', max_open_tiles=DEFAULT_MAX_OPEN_TILES, opener=None):
+    """
+    Open a DEM location, either a single file or a directory of tiles.
+
+    :param location: the DEM file or directory location
+    :param backend: the backend used to open DEM files (one of BACKENDS), defaults to 'auto'
+    :param max_open_tiles: the maximum number of tiles kept open when location is a directory
+    :param opener: the function used to open a DEM file, overrides backend
+    :return: the data source, a DEMCatalog for a directory
+    """
+    if opener is None:
+        opener = functools.partial(open_file, backend=backend)
+
+    if os.path.isdir(location):
+        return DEMCatalog(location, max_open_tiles=max_open_tiles, opener=opener)
+
+    return opener(location)
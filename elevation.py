@@ -10,8 +10,8 @@ import logging
 import os
 
 from osgeo import gdal
-from gdalconst import GA_ReadOnly
 
+import dem_catalog
 import geods
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -25,12 +25,16 @@ def main():
     config = ConfigParser.ConfigParser()
     config.read('config.ini')
     config_dem_location = config.get('dem', 'location')
+    config_dem_backend = config.get('dem', 'backend')
 
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument('lat', type=float, help="latitude, ex: 43.561725")
     parser.add_argument('long', type=float, help="longitude, ex: 1.444796")
-    parser.add_argument('-d', '--dem', help="DEM file location, ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'",
+    parser.add_argument('-d', '--dem', help="DEM file or DEM tiles directory location, "
+                                            "ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'",
                         default=config_dem_location)
+    parser.add_argument('-b', '--backend', choices=dem_catalog.BACKENDS, default=config_dem_backend,
+                        help="DEM reader, 'auto' reads .hgt files natively and other files with GDAL")
     args = parser.parse_args()
 
     LOGGER.debug("requesting elevation for wgs84 lat: %f, long: %f using the following DEM: %s", args.lat, args.long,
@@ -39,7 +43,7 @@ def main():
     # register all of the drivers
     gdal.AllRegister()
     # open the image
-    data_source = gdal.Open(args.dem, GA_ReadOnly)
+    data_source = dem_catalog.open_dem(args.dem, args.backend)
 
     # get the value
     value = geods.read_ds_value_from_wgs84(data_source, args.lat, args.long)
@@ -12,13 +12,116 @@ Especially:
 
 import logging
 import os
+import threading
 
 import numpy as np
 from osgeo import osr
 
+import metrics
+
 LOGGER = logging.getLogger(os.path.basename(__file__))
 
 
+class OutOfExtentError(Exception):
+    """
+    Raised for coordinates out of the extent of the DEM or without elevation data, an error of the request rather than
+    of the DEM.
+    """
+
+
+class WGS84Transformer(object):
+    """
+    Transforms WGS 84 (GPS) coordinates to a given coordinate system (WKT), whole arrays at once.
+
+    The transformation is skipped entirely when the coordinate system is already WGS 84.
+    """
+
+    def __init__(self, projection_ref):
+        """
+        :param projection_ref: the target coordinate system supplied in Well Known Text (WKT) format
+        """
+        # get the coordinate system of the projection ref
+        ref_cs = osr.SpatialReference()
+        ref_cs.ImportFromWkt(projection_ref)
+
+        # get the coordinate system of WGS 84/ESPG:4326/'GPS'
+        wgs84_cs = osr.SpatialReference()
+        wgs84_cs.ImportFromEPSG(4326)
+
+        # GDAL >= 3 honors the authority axis order (lat, long for EPSG:4326), keep the (x, y) = (long, lat) order
+        for spatial_ref in (ref_cs, wgs84_cs):
+            if hasattr(spatial_ref, 'SetAxisMappingStrategy'):
+                spatial_ref.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+        self.is_identity = bool(ref_cs.IsSame(wgs84_cs))
+        if self.is_identity:
+            self.transform = None
+            self.inverse_transform = None
+        else:
+            # create transform objects to convert between coordinate systems
+            self.transform = osr.CoordinateTransformation(wgs84_cs, ref_cs)
+            self.inverse_transform = osr.CoordinateTransformation(ref_cs, wgs84_cs)
+
+    def transform_points(self, wgs84_lat, wgs84_long):
+        """
+        Transforms the given WGS 84 coordinates, scalars or numpy arrays of any shape.
+
+        :param wgs84_lat: the WGS 84 latitude
+        :param wgs84_long: the WGS 84 longitude
+        :return: the couple of transformed coordinates (x, y)
+        """
+        if self.is_identity:
+            return np.asarray(wgs84_long, dtype=float), np.asarray(wgs84_lat, dtype=float)
+
+        shape = np.shape(wgs84_lat)
+        points = np.column_stack((np.ravel(wgs84_long), np.ravel(wgs84_lat)))
+        # do the transformation/projection from WGS 84 to the projection ref in a single call
+        ref_points = np.asarray(self.transform.TransformPoints(points.tolist()))
+
+        return ref_points[:, 0].reshape(shape), ref_points[:, 1].reshape(shape)
+
+    def inverse_transform_points(self, ref_x, ref_y):
+        """
+        Transforms coordinates of the target coordinate system back to WGS 84, scalars or numpy arrays of any shape.
+
+        :param ref_x: the x-coordinate in the target coordinate system
+        :param ref_y: the y-coordinate in the target coordinate system
+        :return: the couple of WGS 84 coordinates (lat, long)
+        """
+        if self.is_identity:
+            return np.asarray(ref_y, dtype=float), np.asarray(ref_x, dtype=float)
+
+        shape = np.shape(ref_x)
+        points = np.column_stack((np.ravel(ref_x), np.ravel(ref_y)))
+        wgs84_points = np.asarray(self.inverse_transform.TransformPoints(points.tolist()))
+
+        return wgs84_points[:, 1].reshape(shape), wgs84_points[:, 0].reshape(shape)
+
+
+# transformers are cached per thread as the GDAL transformation objects are not thread safe
+_TRANSFORMERS = threading.local()
+
+
+def get_wgs84_transformer(projection_ref):
+    """
+    Return the WGS84Transformer for the given coordinate system, creating it on first use.
+
+    :param projection_ref: the coordinate system supplied in Well Known Text (WKT) format
+    :return: the cached transformer
+    """
+    transformers = getattr(_TRANSFORMERS, 'cache', None)
+    if transformers is None:
+        transformers = _TRANSFORMERS.cache = {}
+
+    transformer = transformers.get(projection_ref)
+    if transformer is None:
+        transformer = transformers[projection_ref] = WGS84Transformer(projection_ref)
+        LOGGER.debug("created transformer, identity: %s", transformer.is_identity)
+
+    return transformer
+
+
+@metrics.timed_stage('transform')
 def transform_from_wgs84(projection_ref, wgs84_lat, wgs84_long):
     """
     Transforms WGS 84 (GPS) coordinates to the specified coordinate system (WKT).
@@ -30,22 +133,7 @@ def transform_from_wgs84(projection_ref, wgs84_lat, wgs84_long):
     :param wgs84_long: the WGS 84 longitude
     :return: the couple of transformed coordinates (x, y)
     """
-    # get the coordinate system of the projection ref
-    ref_cs = osr.SpatialReference()
-    ref_cs.ImportFromWkt(projection_ref)
-
-    # get the coordinate system of WGS 84/ESPG:4326/'GPS'
-    wgs84_cs = osr.SpatialReference()
-    wgs84_cs.ImportFromEPSG(4326)
-
-    # create a transform object to convert between coordinate systems
-    transform = osr.CoordinateTransformation(wgs84_cs, ref_cs)
-
-    vectorized_transform = np.vectorize(transform.TransformPoint)
-    # do the transformation/projection from WGS 84 to the projection ref
-    ref_point = vectorized_transform(wgs84_long, wgs84_lat)
-
-    return ref_point[0], ref_point[1]
+    return get_wgs84_transformer(projection_ref).transform_points(wgs84_lat, wgs84_long)
 
 
 def compute_offset(transform, ds_x, ds_y):
@@ -74,41 +162,263 @@ def compute_offset(transform, ds_x, ds_y):
     pixel_width = transform[1]
     pixel_height = transform[5]
 
-    # do the inverse geo transform, flooring to the int
-    # TODO better approximation than flooring to the int ?
+    # do the inverse geo transform, flooring to the int (see read_ds_interpolated_data for better approximations)
     offset_x = np.floor_divide(ds_x - origin_x, pixel_width).astype(int)
     offset_y = np.floor_divide(ds_y - origin_y, pixel_height).astype(int)
 
     return offset_x, offset_y
 
 
+def compute_pixel_coordinates(transform, ds_x, ds_y):
+    """
+    Compute the fractional pixel coordinates based on the projected coordinates and the transformation.
+
+    Unlike compute_offset, the coordinates are not floored and are relative to the pixel centers: (0, 0) is the center
+    of the first pixel and (0.5, 0.5) is the corner shared by the four first pixels.
+
+    :param transform: the transformation obtained from Dataset::GetGeoTransform.
+    :param ds_x: the projected x-coordinate
+    :param ds_y: the projected y-coordinate
+    :return: the couple of fractional pixel coordinates (x, y)
+    """
+    if transform is None:
+        raise Exception("Can only handle 'Affine GeoTransforms'")
+
+    pixel_x = (ds_x - transform[0]) / transform[1] - 0.5
+    pixel_y = (ds_y - transform[3]) / transform[5] - 0.5
+
+    return pixel_x, pixel_y
+
+
+NEAREST = 'nearest'
+BILINEAR = 'bilinear'
+BICUBIC = 'bicubic'
+INTERPOLATIONS = (NEAREST, BILINEAR, BICUBIC)
+
+
+def linear_weights(fraction):
+    """
+    Return the weights of the 2 neighbours (at offsets 0 and 1) for a linear interpolation.
+
+    :param fraction: the position between the neighbours, from 0 to 1
+    :return: the weights as an array having an extra last dimension of size 2
+    """
+    return np.concatenate([weight[..., np.newaxis] for weight in (1 - fraction, fraction)], axis=-1)
+
+
+def cubic_weights(fraction):
+    """
+    Return the weights of the 4 neighbours (at offsets -1, 0, 1 and 2) for a cubic convolution interpolation.
+
+    It uses the Catmull-Rom spline (cubic convolution kernel with a = -0.5), as the GDAL 'cubic' resampling.
+
+    :param fraction: the position between the neighbours at offsets 0 and 1, from 0 to 1
+    :return: the weights as an array having an extra last dimension of size 4
+    """
+    fraction2 = fraction * fraction
+    fraction3 = fraction2 * fraction
+    weights = ((-fraction3 + 2 * fraction2 - fraction) / 2,
+               (3 * fraction3 - 5 * fraction2 + 2) / 2,
+               (-3 * fraction3 + 4 * fraction2 + fraction) / 2,
+               (fraction3 - fraction2) / 2)
+    return np.concatenate([weight[..., np.newaxis] for weight in weights], axis=-1)
+
+
+def interpolation_neighbourhoods(pixel_x, pixel_y, interpolation=BILINEAR):
+    """
+    Compute the neighbourhoods (2x2 for bilinear, 4x4 for bicubic) of fractional pixel coordinates and their weights.
+
+    :param pixel_x: the fractional x pixel coordinate (see compute_pixel_coordinates)
+    :param pixel_y: the fractional y pixel coordinate (see compute_pixel_coordinates)
+    :param interpolation: BILINEAR or BICUBIC, defaults to BILINEAR
+    :return: the x and y offsets of the neighbours, with 2 extra dimensions: rows (y) then columns (x), not limited
+             to the raster, and the weights along x and y (see interpolate)
+    """
+    floor_x = np.floor(pixel_x)
+    floor_y = np.floor(pixel_y)
+    if interpolation == BILINEAR:
+        neighbours = np.arange(2)
+        weights_x = linear_weights(pixel_x - floor_x)
+        weights_y = linear_weights(pixel_y - floor_y)
+    elif interpolation == BICUBIC:
+        neighbours = np.arange(-1, 3)
+        weights_x = cubic_weights(pixel_x - floor_x)
+        weights_y = cubic_weights(pixel_y - floor_y)
+    else:
+        raise Exception("Unknown interpolation: %s" % interpolation)
+
+    # offsets of the neighbourhoods, with 2 extra dimensions: rows (y) then columns (x)
+    offset_x = floor_x.astype(int)[..., np.newaxis, np.newaxis] + neighbours
+    offset_y = floor_y.astype(int)[..., np.newaxis, np.newaxis] + neighbours[:, np.newaxis]
+    offset_x, offset_y = np.broadcast_arrays(offset_x, offset_y)
+
+    return offset_x, offset_y, weights_x, weights_y
+
+
+def interpolate(data, weights_x, weights_y):
+    """
+    :param data: the values of the neighbourhoods (see interpolation_neighbourhoods)
+    :param weights_x: the weights along x
+    :param weights_y: the weights along y
+    :return: the interpolated values
+    """
+    return np.sum(data * weights_y[..., :, np.newaxis] * weights_x[..., np.newaxis, :], axis=(-2, -1))
+
+
+@metrics.timed_stage('interpolate')
+def read_ds_interpolated_data(data_source, pixel_x, pixel_y, interpolation=BILINEAR):
+    """
+    Read interpolated data from the given data source.
+
+    The neighbourhoods (2x2 for bilinear, 4x4 for bicubic) of all the coordinates are gathered in a single read, the
+    neighbours outside of the raster are replaced by the nearest pixel of the edge.
+
+    :param data_source: the data source to read data from
+    :param pixel_x: the fractional x pixel coordinate (see compute_pixel_coordinates)
+    :param pixel_y: the fractional y pixel coordinate (see compute_pixel_coordinates)
+    :param interpolation: BILINEAR or BICUBIC, defaults to BILINEAR
+    :return: the interpolated values as floats
+    """
+    offset_x, offset_y, weights_x, weights_y = interpolation_neighbourhoods(pixel_x, pixel_y, interpolation)
+    data = read_ds_data(data_source, np.clip(offset_x, 0, data_source.RasterXSize - 1),
+                        np.clip(offset_y, 0, data_source.RasterYSize - 1))
+
+    return interpolate(data, weights_x, weights_y)
+
+
+def mask_no_data(data, no_data):
+    """
+    Replace the "NoData" values of an array with NaN.
+
+    :param data: the numpy array of values read from a band
+    :param no_data: the no data value of the band, None if it has none
+    :return: the values as a float numpy array with NaN for "NoData", or the unchanged array if the band has no no data
+             value
+    """
+    if no_data is None:
+        return data
+
+    return np.where(data == no_data, np.nan, data)
+
+
+def read_band_array(band, offset_x, offset_y, width, height):
+    """
+    Read a window of a band, GDAL returning None instead of raising when its exceptions are not enabled.
+
+    :param band: the band to read data from
+    :param offset_x: the x offset of the window
+    :param offset_y: the y offset of the window
+    :param width: the width of the window
+    :param height: the height of the window
+    :return: the numpy array of values, raises an IOError if the read fails
+    """
+    window = band.ReadAsArray(offset_x, offset_y, width, height)
+    if window is None:
+        raise IOError("Unable to read the DEM window at %d, %d" % (offset_x, offset_y))
+
+    return window
+
+
+def check_band_extent(band, min_x, min_y, max_x, max_y):
+    """
+    Check that offsets are inside a band.
+
+    :param band: the band
+    :param min_x: the minimum x offset
+    :param min_y: the minimum y offset
+    :param max_x: the maximum x offset
+    :param max_y: the maximum y offset
+    :return: None, raises an OutOfExtentError if some offsets are out of the band
+    """
+    if min_x < 0 or min_y < 0 or max_x >= band.XSize or max_y >= band.YSize:
+        raise OutOfExtentError("Offsets out of the raster extent")
+
+
 def read_band_data(band, no_data, offset_x, offset_y):
     """
-    Read a single value from a band, replacing "NoData" with None
+    Read a single value from a band, replacing "NoData" with NaN
     :param band: the band to read data from
     :param no_data: the no data value for this band
     :param offset_x: the x offset to read data
     :param offset_y: the y offset to read data
     :return: the value
     """
-    value = band.ReadAsArray(offset_x, offset_y, 1, 1)[0, 0]
+    check_band_extent(band, offset_x, offset_y, offset_x, offset_y)
+    value = read_band_array(band, offset_x, offset_y, 1, 1)[0, 0]
 
-    if value is not no_data:
-        return value
-    else:
-        return None
+    if no_data is not None and value == no_data:
+        return np.nan
+
+    return value
 
 
-vectorized_read_band_data = np.vectorize(read_band_data, excluded=('band', 'no_data'))
+# maximum number of pixels read at once when sampling an array of offsets, bigger reads are split into strips
+MAX_WINDOW_PIXELS = 4 * 1024 * 1024
 
 
+def read_band_window_data(band, offset_x, offset_y, max_window_pixels=MAX_WINDOW_PIXELS):
+    """
+    Read the values at the given offsets from a band using windowed reads instead of one read per value.
+
+    The window covering all the offsets is read at once, then values are picked with numpy fancy indexing.
+    If the window is bigger than max_window_pixels, it is split into horizontal strips aligned on the band blocks,
+    each strip being read over the x-range of the offsets it contains.
+
+    :param band: the band to read data from
+    :param offset_x: the numpy array of x offsets to read data
+    :param offset_y: the numpy array of y offsets to read data
+    :param max_window_pixels: the maximum number of pixels of a single read
+    :return: the numpy array of values, with the same shape as the offsets
+    """
+    shape = np.shape(offset_x)
+    offset_x = np.ravel(offset_x).astype(int)
+    offset_y = np.ravel(offset_y).astype(int)
+
+    min_x, max_x = offset_x.min(), offset_x.max()
+    min_y, max_y = offset_y.min(), offset_y.max()
+    check_band_extent(band, min_x, min_y, max_x, max_y)
+
+    # read each pixel once, batches of profiles and interpolation neighbourhoods share a lot of pixels
+    unique_offsets, inverse = np.unique(offset_y * band.XSize + offset_x, return_inverse=True)
+    offset_y = unique_offsets // band.XSize
+    offset_x = unique_offsets % band.XSize
+
+    width = max_x - min_x + 1
+    height = max_y - min_y + 1
+    if width * height <= max_window_pixels:
+        window = read_band_array(band, int(min_x), int(min_y), int(width), int(height))
+        return window[offset_y - min_y, offset_x - min_x][inverse].reshape(shape)
+
+    block_height = band.GetBlockSize()[1]
+    strip_height = max(block_height, max_window_pixels // width // block_height * block_height)
+    strips = offset_y // strip_height
+    strip_indexes = np.unique(strips)
+    data = None
+    for strip in strip_indexes:
+        in_strip = strips == strip
+        strip_x = offset_x[in_strip]
+        strip_y = offset_y[in_strip]
+        strip_min_x = strip_x.min()
+        strip_min_y = strip_y.min()
+        window = read_band_array(band, int(strip_min_x), int(strip_min_y), int(strip_x.max() - strip_min_x + 1),
+                                 int(strip_y.max() - strip_min_y + 1))
+        if data is None:
+            data = np.empty(offset_x.shape, dtype=window.dtype)
+        data[in_strip] = window[strip_y - strip_min_y, strip_x - strip_min_x]
+    LOGGER.debug("read %d distinct values in %d strips", offset_x.size, len(strip_indexes))
+
+    return data[inverse].reshape(shape)
+
+
+@metrics.timed_stage('read')
 def read_ds_data(data_source, offset_x, offset_y):
     """
     Read data from the given data source.
     :param data_source:  the data source to read data from
     :param offset_x: the x offset to read data
     :param offset_y: the y offset to read data
-    :return: the value
+    :return: the value, or the numpy array of values for arrays of offsets, "NoData" being replaced with NaN (the
+             values are then floats)
     """
     band = data_source.GetRasterBand(1)  # 1-based index, data shall be in the first band
     no_data_value = band.GetNoDataValue()
@@ -117,23 +427,131 @@ def read_ds_data(data_source, offset_x, offset_y):
     if np.isscalar(offset_x) and np.isscalar(offset_y):
         data = read_band_data(band, no_data_value, offset_x, offset_y)
     else:
-        data = vectorized_read_band_data(band, no_data_value, offset_x, offset_y)
+        data = mask_no_data(read_band_window_data(band, offset_x, offset_y), no_data_value)
 
     return data
 
 
-def read_ds_value_from_wgs84(data_source, wgs84_lat, wgs84_long):
+def raster_contains(data_source, wgs84_lat, wgs84_long):
+    """
+    Check if the specified WGS 84 (GPS) coordinates are inside the raster of the dataset.
+
+    :param data_source: the dataset to check
+    :param wgs84_lat: the WGS 84 latitude
+    :param wgs84_long: the WGS 84 longitude
+    :return: True for the coordinates inside the raster, False otherwise
+    """
+    projected_x, projected_y = transform_from_wgs84(data_source.GetProjectionRef(), wgs84_lat, wgs84_long)
+    offset_x, offset_y = compute_offset(data_source.GetGeoTransform(), projected_x, projected_y)
+
+    return (offset_x >= 0) & (offset_x < data_source.RasterXSize) & (offset_y >= 0) & \
+        (offset_y < data_source.RasterYSize)
+
+
+# positions along a segment closer than this are considered as the same crossing
+CROSSING_TOLERANCE = 1e-9
+
+
+def segment_pixel_coordinates(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2):
+    """
+    Compute the pixel coordinates (with fractional parts) of the ends of segments between WGS 84 (GPS) points.
+
+    A data source providing a data_source_at method (like a dem_catalog.DEMCatalog) gives the grid to use, the one
+    at the first starting point.
+
+    :param data_source: the dataset defining the grid
+    :param wgs84_lat1: the latitudes of the starting points, a scalar or a numpy array
+    :param wgs84_long1: the longitudes of the starting points
+    :param wgs84_lat2: the latitudes of the ending points
+    :param wgs84_long2: the longitudes of the ending points
+    :return: the couple of numpy arrays (x, y) of the pixel coordinates, each one of shape (2, ...) holding the
+             coordinates of the starting points then the ones of the ending points
+    """
+    if hasattr(data_source, 'data_source_at'):
+        data_source = data_source.data_source_at(np.ravel(wgs84_lat1)[0], np.ravel(wgs84_long1)[0])
+
+    wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2 = np.broadcast_arrays(wgs84_lat1, wgs84_long1, wgs84_lat2,
+                                                                           wgs84_long2)
+    transform = data_source.GetGeoTransform()
+    projected_x, projected_y = transform_from_wgs84(data_source.GetProjectionRef(), np.array([wgs84_lat1, wgs84_lat2]),
+                                                    np.array([wgs84_long1, wgs84_long2]))
+
+    return (projected_x - transform[0]) / transform[1], (projected_y - transform[3]) / transform[5]
+
+
+def segment_pixel_lengths(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2):
+    """
+    Compute the lengths of segments between WGS 84 (GPS) points, in pixels of the dataset.
+
+    :param data_source: the dataset defining the grid, see segment_pixel_coordinates
+    :param wgs84_lat1: the latitudes of the starting points, a scalar or a numpy array
+    :param wgs84_long1: the longitudes of the starting points
+    :param wgs84_lat2: the latitudes of the ending points
+    :param wgs84_long2: the longitudes of the ending points
+    :return: the lengths, a numpy array of the shape of the coordinates
+    """
+    pixel_x, pixel_y = segment_pixel_coordinates(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+    return np.hypot(pixel_x[1] - pixel_x[0], pixel_y[1] - pixel_y[0])
+
+
+def grid_crossings(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2):
+    """
+    Compute where the segment between two WGS 84 (GPS) points enters each pixel of the dataset it crosses.
+
+    The traversal is a vectorized supercover: the positions of the crossings of the vertical and horizontal pixel
+    edges are computed at once then merged, each crossed pixel is entered exactly once.
+    The segment is considered straight in the dataset coordinate system, which is exact for a geographic dataset and
+    a close approximation for short segments in a projected one.
+
+    A data source providing a data_source_at method (like a dem_catalog.DEMCatalog) gives the grid to use, the one
+    at the starting point.
+
+    :param data_source: the dataset defining the grid
+    :param wgs84_lat1: the latitude of the starting point
+    :param wgs84_long1: the longitude of the starting point
+    :param wgs84_lat2: the latitude of the ending point
+    :param wgs84_long2: the longitude of the ending point
+    :return: the sorted numpy array of positions along the segment (0 at the start, 1 at the end) at which pixels are
+             entered, starting with 0
+    """
+    # pixel edges are at integer positions
+    edges_x, edges_y = segment_pixel_coordinates(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+
+    positions = [np.zeros(1)]
+    for start, end in (edges_x, edges_y):
+        if start != end:
+            edges = np.arange(np.ceil(min(start, end)), np.floor(max(start, end)) + 1)
+            positions.append((edges - start) / (end - start))
+    positions = np.unique(np.concatenate(positions))
+    # crossing a pixel corner gives two nearly identical positions, keep only one of them
+    positions = positions[np.append(True, np.diff(positions) > CROSSING_TOLERANCE)]
+
+    return positions[positions < 1 - CROSSING_TOLERANCE]
+
+
+def read_ds_value_from_wgs84(data_source, wgs84_lat, wgs84_long, interpolation=NEAREST):
     """
     Read the ds value at the specified WGS 84 (GPS) coordinates.
 
+    The data source can also be any object providing its own read_value_from_wgs84 method (like a
+    dem_catalog.DEMCatalog), the read is then delegated to it.
+
     :param data_source: the dataset to read the value in
     :param wgs84_lat: the WGS 84 latitude
     :param wgs84_long: the WGS 84 longitude
-    :return: the value or None if the specified coordinate is a "no data"
+    :param interpolation: one of INTERPOLATIONS, defaults to NEAREST (the value of the pixel containing the point)
+    :return: the value, NaN if the specified coordinate is a "no data" (see mask_no_data)
     """
+    if hasattr(data_source, 'read_value_from_wgs84'):
+        return data_source.read_value_from_wgs84(wgs84_lat, wgs84_long, interpolation)
+
     projected_x, projected_y = transform_from_wgs84(data_source.GetProjectionRef(), wgs84_lat, wgs84_long)
     LOGGER.debug("projected x: %f, projected y: %f", projected_x, projected_y)
 
+    if interpolation != NEAREST:
+        pixel_x, pixel_y = compute_pixel_coordinates(data_source.GetGeoTransform(), projected_x, projected_y)
+        return read_ds_interpolated_data(data_source, pixel_x, pixel_y, interpolation)
+
     offset_x, offset_y = compute_offset(data_source.GetGeoTransform(), projected_x, projected_y)
     LOGGER.debug("offset x: %d, offset y: %d", offset_x, offset_y)
 
@@ -2,6 +2,8 @@
 Collection of geometrical functions.
 """
 
+from collections import namedtuple
+
 import numpy as np
 
 
@@ -54,6 +56,21 @@ POLAR_RADIUS = 6356752.3
 EARTH_RADIUS = float(quadratic_mean(EQUATORIAL_RADIUS, POLAR_RADIUS))
 
 
+def initial_bearing(rad_lat1, rad_long1, rad_lat2, rad_long2):
+    """
+        Return the initial bearing (azimuth) of the great circle path from the first point to the second point.
+
+        :param rad_lat1: the latitude of the first point in radians
+        :param rad_long1: the longitude of the first point in radians
+        :param rad_lat2: the latitude of the second point in radians
+        :param rad_long2: the longitude of the second point in radians
+        :return: the bearing in radians, clockwise from the north, between -pi and pi
+    """
+    delta_long = rad_long2 - rad_long1
+    return np.arctan2(np.sin(delta_long) * np.cos(rad_lat2),
+                      np.cos(rad_lat1) * np.sin(rad_lat2) - np.sin(rad_lat1) * np.cos(rad_lat2) * np.cos(delta_long))
+
+
 def distance_between_wgs84_coordinates(wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2):
     """
         Compute the great circle distance between the to specified points.
@@ -80,3 +97,93 @@ def overhead_height(angle, radius):
         :return: the overhead height
     """
     return 2 * radius * np.sin(angle / 2) ** 2
+
+
+# terms of a segment shared by all its points, see segment_terms
+SegmentTerms = namedtuple('SegmentTerms', ['rad_lat1', 'rad_long1', 'cos_lat1', 'half_angle', 'max_overhead', 'radius'])
+
+
+def segment_terms(rad_lat1, rad_long1, rad_lat2, rad_long2, radius=EARTH_RADIUS):
+    """
+        Precompute the terms of segments used by distances_and_overheads, once per segment instead of once per point.
+
+        :param rad_lat1: the latitude of the starting point in radians, a scalar or a numpy array for many segments
+        :param rad_long1: the longitude of the starting point in radians
+        :param rad_lat2: the latitude of the ending point in radians
+        :param rad_long2: the longitude of the ending point in radians
+        :param radius: the radius of the sphere, defaults to EARTH_RADIUS
+        :return: the SegmentTerms
+    """
+    half_angle = half_central_angle(rad_lat1, rad_long1, rad_lat2, rad_long2)
+    return SegmentTerms(rad_lat1, rad_long1, np.cos(rad_lat1), half_angle, overhead_height(half_angle, radius), radius)
+
+
+def distances_and_overheads(terms, rad_latitudes, rad_longitudes, distances=None, overheads=None):
+    """
+        Compute the great circle distances from the starting point of a segment and the overhead heights induced by the
+        earth curvature (see overhead_height) of points of the segment, in a single pass.
+
+        The Haversine formula and the overheads are evaluated in place in the output arrays, without any temporary
+        array. The longitudes are read first, so the overheads array can hold them on input.
+
+        :param terms: the SegmentTerms of the segment, see segment_terms
+        :param rad_latitudes: the latitudes of the points in radians, a numpy array
+        :param rad_longitudes: the longitudes of the points in radians
+        :param distances: the float numpy array to store the distances in, defaults to None (a new array)
+        :param overheads: the float numpy array to store the overheads in, defaults to None (a new array)
+        :return: the couple of distances and overheads numpy arrays
+    """
+    shape = np.broadcast(rad_latitudes, rad_longitudes).shape
+    if distances is None:
+        distances = np.empty(shape)
+    if overheads is None:
+        overheads = np.empty(shape)
+
+    # haversine of the central angles: sin((dlong) / 2) ** 2 * cos(lat1) * cos(lat) + sin((dlat) / 2) ** 2
+    np.subtract(rad_longitudes, terms.rad_long1, out=distances)
+    np.multiply(distances, 0.5, out=distances)
+    np.sin(distances, out=distances)
+    np.square(distances, out=distances)
+    np.multiply(distances, terms.cos_lat1, out=distances)
+    np.cos(rad_latitudes, out=overheads)
+    np.multiply(distances, overheads, out=distances)
+    np.subtract(rad_latitudes, terms.rad_lat1, out=overheads)
+    np.multiply(overheads, 0.5, out=overheads)
+    np.sin(overheads, out=overheads)
+    np.square(overheads, out=overheads)
+    np.add(distances, overheads, out=distances)
+    # half of the central angles
+    np.sqrt(distances, out=distances)
+    np.arcsin(distances, out=distances)
+
+    # overheads: max_overhead - overhead_height(half_angle - angle)
+    np.multiply(distances, -2., out=overheads)
+    np.add(overheads, terms.half_angle, out=overheads)
+    np.multiply(overheads, 0.5, out=overheads)
+    np.sin(overheads, out=overheads)
+    np.square(overheads, out=overheads)
+    np.multiply(overheads, -2 * terms.radius, out=overheads)
+    np.add(overheads, terms.max_overhead, out=overheads)
+
+    np.multiply(distances, 2 * terms.radius, out=distances)
+    return distances, overheads
+
+
+SPEED_OF_LIGHT = 299792458.0
+
+
+def fresnel_radius(distance, total_distance, frequency, zone=1):
+    """
+        Computes the radius of a Fresnel zone at a point between the two ends of a radio link.
+
+        :param distance: the distance of the point from the first end
+        :param total_distance: the distance between the two ends
+        :param frequency: the frequency of the link in Hz
+        :param zone: the Fresnel zone number, defaults to 1
+        :return: the radius
+    """
+    wavelength = SPEED_OF_LIGHT / frequency
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radius = np.sqrt(zone * wavelength * distance * (total_distance - distance) / total_distance)
+    # the zone is empty when both ends are the same point
+    return np.where(total_distance > 0, radius, 0.)
@@ -0,0 +1,166 @@
+"""
+Native reader for SRTM .hgt tiles, bypassing GDAL.
+
+A .hgt file is a square grid of big-endian signed 16 bits integers, covering 1x1 degree (plus half a pixel on each
+side) in WGS 84, its georeferencing is derived from its name (ex: N43E001.hgt).
+
+The file is memory mapped, reads are views of the mapped grid, so several processes reading the same tile share the
+page cache instead of keeping their own copy.
+
+HGTDataSource and HGTBand implement the subset of the GDAL dataset and band interfaces used by geods.
+"""
+
+import math
+import os
+import re
+
+import numpy as np
+
+HGT_FILENAME = re.compile(r'^([NS])(\d{2})([EW])(\d{3})\.hgt$', re.IGNORECASE)
+HGT_DTYPE = np.dtype('>i2')
+HGT_NO_DATA = -32768.0
+GDT_INT16 = 3  # value of gdalconst.GDT_Int16
+
+WGS84_WKT = ('GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],'
+             'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+             'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]')
+
+
+def is_hgt_filename(filename):
+    """
+    Checks if the given file name follows the SRTM .hgt naming convention.
+
+    :param filename: the file location
+    :return: True if it is a .hgt file name, False otherwise
+    """
+    return HGT_FILENAME.match(os.path.basename(filename)) is not None
+
+
+def hgt_origin(filename):
+    """
+    Return the coordinates of the south west corner of a .hgt tile, from its name.
+
+    :param filename: the .hgt file location, ex: '/path/to/N43E001.hgt'
+    :return: the couple (lat, long) of the south west grid node
+    """
+    match = HGT_FILENAME.match(os.path.basename(filename))
+    if match is None:
+        raise Exception("Not a .hgt file name: %s" % filename)
+
+    south = int(match.group(2)) * (-1 if match.group(1).upper() == 'S' else 1)
+    west = int(match.group(4)) * (-1 if match.group(3).upper() == 'W' else 1)
+
+    return south, west
+
+
+def hgt_size(filename):
+    """
+    Return the number of rows (and columns) of a .hgt tile, from its file size (1201 for SRTM3, 3601 for SRTM1).
+
+    :param filename: the .hgt file location
+    :return: the size of the grid
+    """
+    return int(round(math.sqrt(os.path.getsize(filename) / HGT_DTYPE.itemsize)))
+
+
+def hgt_geo_transform(filename):
+    """
+    Return the GDAL-like affine transformation of a .hgt tile.
+
+    Pixels are centered on the grid nodes, so the origin is half a pixel outside of the 1x1 degree cell.
+
+    :param filename: the .hgt file location
+    :return: the transformation (origin_x, pixel_width, 0, origin_y, 0, pixel_height)
+    """
+    south, west = hgt_origin(filename)
+    pixel_size = 1. / (hgt_size(filename) - 1)
+
+    return west - pixel_size / 2, pixel_size, 0, south + 1 + pixel_size / 2, 0, -pixel_size
+
+
+class HGTBand(object):
+    """
+    Band of a memory mapped .hgt tile.
+    """
+
+    def __init__(self, data):
+        """
+        :param data: the memory mapped grid
+        """
+        self.data = data
+        self.YSize, self.XSize = data.shape  # pylint: disable=invalid-name
+        self.DataType = GDT_INT16  # pylint: disable=invalid-name
+
+    def GetNoDataValue(self):  # pylint: disable=invalid-name, no-self-use
+        """
+        :return: the no data value of SRTM tiles
+        """
+        return HGT_NO_DATA
+
+    def GetBlockSize(self):  # pylint: disable=invalid-name
+        """
+        :return: the whole grid as [width, height], there is no block to align reads on
+        """
+        return [self.XSize, self.YSize]
+
+    def ReadAsArray(self, xoff, yoff, win_xsize, win_ysize):  # pylint: disable=invalid-name
+        """
+        Read a window of the grid.
+
+        :param xoff: the x offset of the window
+        :param yoff: the y offset of the window
+        :param win_xsize: the width of the window
+        :param win_ysize: the height of the window
+        :return: the window, as a view of the memory mapped grid (no copy is made), raises a RuntimeError like GDAL
+                 (with its exceptions enabled) if the window is not inside the grid
+        """
+        if xoff < 0 or yoff < 0 or win_xsize < 1 or win_ysize < 1 or xoff + win_xsize > self.XSize or \
+                yoff + win_ysize > self.YSize:
+            raise RuntimeError("Access window out of range in RasterIO(): %d,%d,%dx%d on a %dx%d raster" %
+                               (xoff, yoff, win_xsize, win_ysize, self.XSize, self.YSize))
+
+        return self.data[yoff:yoff + win_ysize, xoff:xoff + win_xsize]
+
+
+class HGTDataSource(object):
+    """
+    Dataset of a memory mapped .hgt tile.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: the .hgt file location, ex: '/path/to/N43E001.hgt'
+        """
+        self.filename = filename
+        self.geo_transform = hgt_geo_transform(filename)
+        size = hgt_size(filename)
+        self.band = HGTBand(np.memmap(filename, dtype=HGT_DTYPE, mode='r', shape=(size, size)))
+        self.RasterXSize = self.RasterYSize = size  # pylint: disable=invalid-name
+
+    def GetProjectionRef(self):  # pylint: disable=invalid-name, no-self-use
+        """
+        :return: the WKT of WGS 84
+        """
+        return WGS84_WKT
+
+    def GetGeoTransform(self):  # pylint: disable=invalid-name
+        """
+        :return: the affine transformation derived from the file name
+        """
+        return self.geo_transform
+
+    def GetDescription(self):  # pylint: disable=invalid-name
+        """
+        :return: the file location
+        """
+        return self.filename
+
+    def GetRasterBand(self, index):  # pylint: disable=invalid-name
+        """
+        :param index: the 1-based band index, .hgt tiles only have one band
+        :return: the band
+        """
+        if index != 1:
+            raise Exception(".hgt tiles only have one band")
+
+        return self.band
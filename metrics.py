@@ -0,0 +1,300 @@
+"""
+Lightweight metrics of the profile pipeline: counters and latency histograms, exposed in the Prometheus text format.
+
+The stages of geods, profiler and profile_format are timed with the timed context manager (or the timed_stage and
+timed_iterator decorators) into the STAGE_SECONDS histogram of the global REGISTRY. Stages nest: the 'profile' stage
+includes the 'transform', 'read' and 'geometry' ones. An observation is a clock read, a bisection in the buckets and
+an increment under a lock, cheap enough to stay enabled in production.
+"""
+
+import bisect
+import collections
+import contextlib
+import functools
+import threading
+import timeit
+
+# prefix of the names of the exposed metrics
+NAMESPACE = 'yunoseeme'
+# upper bounds of the latency buckets in seconds, from 100 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+# keys of the collected statistics exposed as counters, the other ones are gauges
+COUNTER_KEYS = ('hits', 'misses', 'evictions')
+
+
+def format_labels(labels):
+    """
+    :param labels: the sorted tuple of (name, value) couples
+    :return: the labels in the Prometheus text format, ex: '{stage="read"}', or '' without labels
+    """
+    if not labels:
+        return ''
+
+    return '{%s}' % ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                             for name, value in labels)
+
+
+def format_value(value):
+    """
+    :param value: the value of a sample
+    :return: the value in the Prometheus text format
+    """
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value))
+
+
+class Counter(object):
+    """
+    Thread safe counter, one value per set of labels.
+    """
+
+    metric_type = 'counter'
+
+    def __init__(self, name, help_text):
+        """
+        :param name: the name of the metric
+        :param help_text: the description of the metric
+        """
+        self.name = name
+        self.help_text = help_text
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Increment the counter.
+
+        :param amount: the increment, defaults to 1
+        :param labels: the labels of the value, ex: endpoint='json'
+        :return: None
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self):
+        """
+        :return: the list of (name, labels, value) samples
+        """
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(object):
+    """
+    Thread safe histogram of durations, one series of buckets per set of labels.
+    """
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """
+        :param name: the name of the metric
+        :param help_text: the description of the metric
+        :param buckets: the sorted upper bounds of the buckets, defaults to DEFAULT_BUCKETS
+        """
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # per set of labels: the counts of the buckets (plus +Inf), the sum and the count of the observations
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Record an observation.
+
+        :param value: the observed value, ex: a duration in seconds
+        :param labels: the labels of the series, ex: stage='read'
+        :return: None
+        """
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0., 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        """
+        :return: the list of (name, labels, value) samples, buckets being cumulative
+        """
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in sorted(self._series.items())]
+
+        samples = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((self.name + '_bucket', key + (('le', format_value(bound)),), cumulative))
+            samples.append((self.name + '_sum', key, total))
+            samples.append((self.name + '_count', key, count))
+
+        return samples
+
+
+class Registry(object):
+    """
+    Collection of metrics and of collectors of statistics (like the ones of the caches), exposed together.
+    """
+
+    def __init__(self, namespace=NAMESPACE):
+        """
+        :param namespace: the prefix of the names of the metrics
+        """
+        self.namespace = namespace
+        self._metrics = collections.OrderedDict()
+        self._collectors = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, help_text, *args):
+        """
+        Return the metric of the given name, creating it on first use.
+        """
+        name = '%s_%s' % (self.namespace, name)
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, help_text, *args)
+            elif not isinstance(metric, metric_class):
+                raise Exception("Metric %s is already registered as a %s" % (name, metric.metric_type))
+
+        return metric
+
+    def counter(self, name, help_text):
+        """
+        :param name: the name of the counter, without the namespace
+        :param help_text: the description of the counter
+        :return: the Counter
+        """
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """
+        :param name: the name of the histogram, without the namespace
+        :param help_text: the description of the histogram
+        :param buckets: the sorted upper bounds of the buckets, defaults to DEFAULT_BUCKETS
+        :return: the Histogram
+        """
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def register_collector(self, name, collect):
+        """
+        Register a function returning statistics, exposed as '<namespace>_<name>_<key>' metrics: the 'hits', 'misses'
+        and 'evictions' keys as counters, the other ones as gauges, plus the hit ratio when there are hits and misses.
+
+        :param name: the name of the statistics, ex: 'tile_cache'
+        :param collect: the function returning a dict of numbers, ex: tile_cache.TileCache.stats
+        :return: None
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def expose(self):
+        """
+        :return: the metrics in the Prometheus text format
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        lines = []
+        for metric in metrics:
+            lines.append('# HELP %s %s' % (metric.name, metric.help_text))
+            lines.append('# TYPE %s %s' % (metric.name, metric.metric_type))
+            lines.extend('%s%s %s' % (name, format_labels(labels), format_value(value))
+                         for name, labels, value in metric.samples())
+
+        for collector_name, collect in collectors:
+            stats = collect()
+            if 'hits' in stats and 'misses' in stats:
+                lookups = stats['hits'] + stats['misses']
+                stats['hit_ratio'] = float(stats['hits']) / lookups if lookups else 0.
+            for key, value in sorted(stats.items()):
+                metric_type = 'counter' if key in COUNTER_KEYS else 'gauge'
+                name = '%s_%s_%s%s' % (self.namespace, collector_name, key, '_total' if key in COUNTER_KEYS else '')
+                lines.append('# TYPE %s %s' % (name, metric_type))
+                lines.append('%s %s' % (name, format_value(value)))
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('stage_duration_seconds', "Duration of the stages of the profile pipeline")
+
+
+@contextlib.contextmanager
+def timed(stage, histogram=STAGE_SECONDS):
+    """
+    Context manager recording the duration of its block, even when it raises.
+
+    :param stage: the name of the stage, the 'stage' label of the observation, ex: 'read'
+    :param histogram: the histogram to record the duration in, defaults to STAGE_SECONDS
+    """
+    start = timeit.default_timer()
+    try:
+        yield
+    finally:
+        histogram.observe(timeit.default_timer() - start, stage=stage)
+
+
+def timed_stage(stage, histogram=STAGE_SECONDS):
+    """
+    Decorator recording the duration of the calls of a function, see timed.
+
+    :param stage: the name of the stage
+    :param histogram: the histogram to record the durations in, defaults to STAGE_SECONDS
+    :return: the decorator
+    """
+    def decorator(function):
+        """Wrap the function"""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            """Time the call"""
+            start = timeit.default_timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(timeit.default_timer() - start, stage=stage)
+        return wrapper
+    return decorator
+
+
+def timed_iterator(stage, histogram=STAGE_SECONDS):
+    """
+    Decorator recording the time spent producing the items of the iterators returned by a function (like a
+    generator streaming a response), excluding the time spent by the consumer between the items. The duration is
+    recorded once the iterator is exhausted or closed.
+
+    :param stage: the name of the stage
+    :param histogram: the histogram to record the durations in, defaults to STAGE_SECONDS
+    :return: the decorator
+    """
+    def decorator(function):
+        """Wrap the function"""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            """Time the production of the items"""
+            start = timeit.default_timer()
+            iterator = iter(function(*args, **kwargs))
+            elapsed = timeit.default_timer() - start
+            try:
+                while True:
+                    start = timeit.default_timer()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += timeit.default_timer() - start
+                    yield item
+            finally:
+                histogram.observe(elapsed, stage=stage)
+        return wrapper
+    return decorator
@@ -4,13 +4,17 @@ Plot styles available to draw from PNGProfileFormat
  * detailed_plot: a detailed view of the profile
  * corrected_elevation: show the terrain with curvature correction and a straight line of sight
  * curved_sight: show the terrain without curvature correction and a curved line of sight
+
+Figures are drawn with the object oriented API of matplotlib (no pyplot global state): each style draws on a
+ProfileRenderer, built once per thread and reused, only its data artists being updated between two renders.
+matplotlib is only imported when the first renderer is built, so that the scaling helpers can be used without it (see
+png_raster.py).
 """
 
 import math
-import matplotlib
-matplotlib.use('Cairo')
+import threading
+
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 def manual_linear_scaled_range(data):
@@ -20,8 +24,9 @@ def manual_linear_scaled_range(data):
     :param data: the data to look the scale for
     :return: the min and max of the scale
     """
-    data_min = np.amin(data)
-    data_max = np.amax(data)
+    # NaN are holes of the DEM
+    data_min = np.nanmin(data)
+    data_max = np.nanmax(data)
 
     log_diff = math.log10(data_max - data_min)
     step = 10 ** math.floor(log_diff)
@@ -32,14 +37,157 @@ def manual_linear_scaled_range(data):
     return scaled_min, scaled_max
 
 
+def fresnel_zone_bottom(profile_data, y_sight):
+    """
+    Return the bottom of the first Fresnel zone around the given line of sight, if the profile has one.
+
+    :param profile_data: the profile data, with a 'fresnel_radii' key if the Fresnel zone was computed
+    :param y_sight: the line of sight as drawn on the plot
+    :return: the bottom of the Fresnel zone or an empty array
+    """
+    if 'fresnel_radii' not in profile_data:
+        return np.empty(0)
+
+    return y_sight - profile_data['fresnel_radii']
+
+
+def fill_polygons(x, y_top, y_bottom):  # pylint: disable=invalid-name
+    """
+    Return the polygons filling the area between two curves, the points where a curve is NaN (holes of the DEM) are
+    left empty, splitting the area in several polygons.
+
+    :param x: the x coordinates of the curves
+    :param y_top: the y coordinates of the first curve
+    :param y_bottom: the y coordinates of the second curve
+    :return: the list of (N, 2) numpy arrays of the vertices of the polygons
+    """
+    valid = ~(np.isnan(y_top) | np.isnan(y_bottom))
+    # bounds of the runs of consecutive valid points
+    bounds = np.flatnonzero(np.diff(np.concatenate([[0], valid.astype(int), [0]])))
+
+    return [np.concatenate([np.column_stack([x[start:stop], y_top[start:stop]]),
+                            np.column_stack([x[start:stop][::-1], y_bottom[start:stop][::-1]])])
+            for start, stop in zip(bounds[::2], bounds[1::2])]
+
+
+class ProfileRenderer(object):
+    """
+    Figure drawing profiles, built once and reused across renders.
+
+    The axes, the styling and the spines are set up when the renderer is created, a render only updates the data of
+    the sight line, the Fresnel zone line, the filled areas and the annotation.
+    A renderer must not be used by several threads at once, see get_renderer.
+    """
+
+    def __init__(self, fills, annotate=False, xunits=None):
+        """
+        :param fills: the list of the keyword arguments (facecolor, linewidth...) of the filled areas, from the top one
+        :param annotate: draw an annotation arrow, defaults to False
+        :param xunits: the units of the x axis given to the sight line and the filled areas, defaults to None
+        """
+        from matplotlib.backends.backend_cairo import FigureCanvasCairo
+        from matplotlib.figure import Figure
+
+        self.figure = Figure()
+        FigureCanvasCairo(self.figure)
+        # setting dpi with figure.set_dpi() seem to be useless, the dpi really used is the one in savefig()
+        self.figure.set_size_inches(10, 3.5)
+        sub_plt = self.axes = self.figure.add_subplot(111)
+
+        units = {} if xunits is None else dict(xunits=xunits)
+        self.sight = sub_plt.plot([], [], 'g-', label='Sight', linewidth=0.5, **units)[0]
+        self.fresnel = sub_plt.plot([], [], 'g--', label='Fresnel zone', linewidth=0.5)[0]
+        self.fills = [sub_plt.fill_between([0, 1], [0, 0], [0, 0], **dict(fill, **units)) for fill in fills]
+        self.annotation = None
+        if annotate:
+            self.annotation = sub_plt.annotate("", xy=(0, 0), xytext=(-20, 30), textcoords='offset points',
+                                               arrowprops=dict(arrowstyle="simple", fc="0.3", ec="none"))
+
+        # Style
+        sub_plt.set_title("Elevation (m) vs. Distance (km)")
+
+        sub_plt.spines["top"].set_visible(False)
+        sub_plt.spines["bottom"].set_visible(False)
+        sub_plt.spines["right"].set_visible(False)
+        sub_plt.spines["left"].set_visible(False)
+
+        sub_plt.tick_params(axis='both', which='both', bottom=True, top=False,
+                            labelbottom=True, left=False, right=False, labelleft=True)
+
+        sub_plt.grid(axis='y')
+
+    def render(self, x, y_sight, y_fresnel, fills, y_range, filename,  # pylint: disable=invalid-name
+               file_format='png', annotation=None):
+        """
+        Draw a profile and save the figure.
+
+        :param x: the distances of the points
+        :param y_sight: the line of sight
+        :param y_fresnel: the bottom of the Fresnel zone, an empty array to hide it
+        :param fills: the list of (y_top, y_bottom) couples delimiting the filled areas
+        :param y_range: the (y_min, y_max) limits of the y axis
+        :param filename: a string or a fd to write the figure in
+        :param file_format: the format given to the Figure.savefig function, default is 'png'
+        :param annotation: the (text, (x, y)) of the annotation, if the renderer has one
+        :return: None
+        """
+        self.sight.set_data(x, y_sight)
+        if y_fresnel.size:
+            self.fresnel.set_data(x, y_fresnel)
+        else:
+            self.fresnel.set_data([], [])
+        for collection, (y_top, y_bottom) in zip(self.fills, fills):
+            collection.set_verts(fill_polygons(x, y_top, y_bottom))
+        if annotation is not None:
+            self.annotation.set_text(annotation[0])
+            self.annotation.xy = annotation[1]
+
+        # Fix limits
+        self.axes.set_xlim(min(x), max(x))
+        self.axes.set_ylim(*y_range)
+
+        # Format and save
+        self.figure.savefig(filename, bbox_inches='tight', dpi=80, format=file_format)
+
+
+_RENDERERS = threading.local()
+
+
+def get_renderer(name, fills, annotate=False, xunits=None):
+    """
+    Return the renderer of a style for the current thread, creating it on first use.
+
+    :param name: the name of the style
+    :param fills: the keyword arguments of the filled areas (see ProfileRenderer)
+    :param annotate: draw an annotation arrow, defaults to False
+    :param xunits: the units of the x axis (see ProfileRenderer), defaults to None
+    :return: the ProfileRenderer
+    """
+    renderer = getattr(_RENDERERS, name, None)
+    if renderer is None:
+        renderer = ProfileRenderer(fills, annotate, xunits)
+        setattr(_RENDERERS, name, renderer)
+
+    return renderer
+
+
+DETAILED_PLOT_FILLS = [dict(linewidth=0, facecolor=(0.7, 0.7, 0.7)),
+                       dict(linewidth=0, facecolor=(0.85, 0.85, 0.7)),
+                       dict(linewidth=0, facecolor=(0.85, 0.85, 0.7))]
+CORRECTED_ELEVATION_FILLS = [dict(linewidth=0, facecolor=(0.7, 0.7, 0.7)),
+                             dict(linewidth=0, facecolor=(0.85, 0.85, 0.7))]
+CURVED_SIGHT_FILLS = [dict(label='Elevation', linewidth=0.5, facecolor=(0.7, 0.7, 0.7), edgecolor=(0, 0, 0, 0))]
+
+
 def detailed_plot(profile_data, filename, file_format='png'):
     # Prepare data
     x = profile_data['distances'] / 1000  # pylint: disable=invalid-name
     y_elev = profile_data['elevations']
     y_elev_plus_correction = profile_data['elevations'] + profile_data['overheads']
     y_sight = profile_data['sights']
+    y_fresnel = fresnel_zone_bottom(profile_data, y_sight)
 
-    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev_plus_correction, y_sight]))
+    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev_plus_correction, y_sight, y_fresnel]))
     floor = np.full_like(x, y_min)
 
     floor_plus_correction = floor + profile_data['overheads']
@@ -47,42 +195,11 @@ def detailed_plot(profile_data, filename, file_format='png'):
     mid_x = x[int(len(x) / 2)]
     max_correction = max(profile_data['overheads'])
 
-    # Prepare plot
-    fig = plt.figure()
-    sub_plt = fig.add_subplot(111)
-
     # Plot
-    sub_plt.plot(x, y_sight, 'g-', label='Sight', linewidth=0.5, xunits=1000.0)
-
-    sub_plt.fill_between(x, y_elev, floor_plus_correction, linewidth=0, facecolor=(0.7, 0.7, 0.7), xunits=1000.0)
-    sub_plt.fill_between(x, y_elev_plus_correction, y_elev, linewidth=0, facecolor=(0.85, 0.85, 0.7), xunits=1000.0)
-    sub_plt.fill_between(x, floor_plus_correction, floor, linewidth=0, facecolor=(0.85, 0.85, 0.7), xunits=1000.0)
-
-    sub_plt.annotate("Max correction: %.2fm" % max_correction, xy=(mid_x, max_correction + y_min),
-                     xytext=(-20, 30), textcoords='offset points',
-                     arrowprops=dict(arrowstyle="simple", fc="0.3", ec="none"))
-
-    # Fix limits
-    sub_plt.set_xlim(min(x), max(x))
-    sub_plt.set_ylim(y_min, y_max)
-
-    # Style
-    sub_plt.set_title("Elevation (m) vs. Distance (km)")
-
-    sub_plt.spines["top"].set_visible(False)
-    sub_plt.spines["bottom"].set_visible(False)
-    sub_plt.spines["right"].set_visible(False)
-    sub_plt.spines["left"].set_visible(False)
-
-    sub_plt.tick_params(axis='both', which='both', bottom='on', top='off',
-                        labelbottom='on', left='off', right='off', labelleft='on')
-
-    sub_plt.grid(axis='y')
-
-    # Format and save
-    # setting dpi with figure.set_dpi() seem to be useless, the dpi really used is the one in savefig()
-    fig.set_size_inches(10, 3.5)
-    fig.savefig(filename, bbox_inches='tight', dpi=80, format=file_format)
+    renderer = get_renderer('detailed_plot', DETAILED_PLOT_FILLS, annotate=True, xunits=1000.0)
+    renderer.render(x, y_sight, y_fresnel, [(y_elev, floor_plus_correction), (y_elev_plus_correction, y_elev),
+                                            (floor_plus_correction, floor)], (y_min, y_max), filename, file_format,
+                    annotation=("Max correction: %.2fm" % max_correction, (mid_x, max_correction + y_min)))
 
 
 def corrected_elevation(profile_data, filename, file_format='png'):
@@ -98,42 +215,16 @@ def corrected_elevation(profile_data, filename, file_format='png'):
     x = profile_data['distances'] / 1000  # pylint: disable=invalid-name
     y_elev_plus_correction = profile_data['elevations'] + profile_data['overheads']
     y_sight = profile_data['sights']
+    y_fresnel = fresnel_zone_bottom(profile_data, y_sight)
 
-    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev_plus_correction, y_sight]))
+    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev_plus_correction, y_sight, y_fresnel]))
     floor = np.full_like(x, y_min)
     floor_plus_correction = floor + profile_data['overheads']
 
-    # Prepare plot
-    fig = plt.figure()
-    sub_plt = fig.add_subplot(111)
-
     # Plot
-    sub_plt.plot(x, y_sight, 'g-', label='Sight', linewidth=0.5)
-
-    sub_plt.fill_between(x, y_elev_plus_correction, floor_plus_correction, linewidth=0, facecolor=(0.7, 0.7, 0.7))
-    sub_plt.fill_between(x, floor_plus_correction, floor, linewidth=0, facecolor=(0.85, 0.85, 0.7))
-
-    # Fix limits
-    sub_plt.set_xlim(min(x), max(x))
-    sub_plt.set_ylim(y_min, y_max)
-
-    # Style
-    sub_plt.set_title("Elevation (m) vs. Distance (km)")
-
-    sub_plt.spines["top"].set_visible(False)
-    sub_plt.spines["bottom"].set_visible(False)
-    sub_plt.spines["right"].set_visible(False)
-    sub_plt.spines["left"].set_visible(False)
-
-    sub_plt.tick_params(axis='both', which='both', bottom='on', top='off',
-                        labelbottom='on', left='off', right='off', labelleft='on')
-
-    sub_plt.grid(axis='y')
-
-    # Format and save
-    # setting dpi with figure.set_dpi() seem to be useless, the dpi really used is the one in savefig()
-    fig.set_size_inches(10, 3.5)
-    fig.savefig(filename, bbox_inches='tight', dpi=80, format=file_format)
+    renderer = get_renderer('corrected_elevation', CORRECTED_ELEVATION_FILLS)
+    renderer.render(x, y_sight, y_fresnel, [(y_elev_plus_correction, floor_plus_correction),
+                                            (floor_plus_correction, floor)], (y_min, y_max), filename, file_format)
 
 
 def curved_sight(profile_data, filename, file_format='png'):
@@ -141,38 +232,11 @@ def curved_sight(profile_data, filename, file_format='png'):
     x = profile_data['distances'] / 1000  # pylint: disable=invalid-name
     y_elev = profile_data['elevations']
     y_sight_minus_correction = profile_data['sights'] - profile_data['overheads']
+    y_fresnel = fresnel_zone_bottom(profile_data, y_sight_minus_correction)
 
-    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev, y_sight_minus_correction]))
+    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev, y_sight_minus_correction, y_fresnel]))
     floor = np.full_like(x, y_min)
 
-    # Prepare plot
-    fig = plt.figure()
-    sub_plt = fig.add_subplot(111)
-
     # Plot
-    sub_plt.plot(x, y_sight_minus_correction, 'g-', label='Sight', linewidth=0.5)
-
-    sub_plt.fill_between(x, y_elev, floor, label='Elevation', linewidth=0.5,
-                         facecolor=(0.7, 0.7, 0.7), edgecolor=(0, 0, 0, 0))
-
-    # Fix limits
-    sub_plt.set_xlim(min(x), max(x))
-    sub_plt.set_ylim(y_min, y_max)
-
-    # Style
-    sub_plt.set_title("Elevation (m) vs. Distance (km)")
-
-    sub_plt.spines["top"].set_visible(False)
-    sub_plt.spines["bottom"].set_visible(False)
-    sub_plt.spines["right"].set_visible(False)
-    sub_plt.spines["left"].set_visible(False)
-
-    sub_plt.tick_params(axis='both', which='both', bottom='on', top='off',
-                        labelbottom='on', left='off', right='off', labelleft='on')
-
-    sub_plt.grid(axis='y')
-
-    # Format and save
-    # setting dpi with figure.set_dpi() seem to be useless, the dpi really used is the one in savefig()
-    fig.set_size_inches(10, 3.5)
-    fig.savefig(filename, bbox_inches='tight', dpi=80, format=file_format)
+    renderer = get_renderer('curved_sight', CURVED_SIGHT_FILLS)
+    renderer.render(x, y_sight_minus_correction, y_fresnel, [(y_elev, floor)], (y_min, y_max), filename, file_format)
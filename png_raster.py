@@ -0,0 +1,238 @@
+"""
+Lightweight PNG renderer of profiles, without matplotlib.
+
+The corrected elevation plot (see plot_style.corrected_elevation) is rasterized directly into a numpy RGBA buffer:
+terrain and earth bulge fills, horizontal grid, line of sight, Fresnel zone and the tick labels (drawn with a small
+bitmap font), the buffer is then encoded to PNG with zlib.
+Unlike the matplotlib styles, there is no title ("Elevation (m) vs. Distance (km)") nor axis labels: the bitmap font
+only has digits, '.' and '-'.
+It renders a 512 points profile about 6 times faster than matplotlib with the Agg backend (about 14 ms instead of
+90 ms, see benchmark_render.py -s raster), for thumbnails and high volume traffic. This is short of an order of
+magnitude, the zlib compression and the fills now take most of the time.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+from plot_style import fresnel_zone_bottom, manual_linear_scaled_range
+
+# 10x3.5 inches at 80 dpi, like the matplotlib styles
+DEFAULT_WIDTH = 800
+DEFAULT_HEIGHT = 280
+
+# colors of the matplotlib styles
+BACKGROUND = (255, 255, 255, 255)
+TERRAIN = (179, 179, 179, 255)
+BULGE = (217, 217, 179, 255)
+GRID = (176, 176, 176, 255)
+SIGHT = (0, 128, 0, 255)
+TEXT = (0, 0, 0, 255)
+
+# margins of the plot area in pixels: left, top, right, bottom
+MARGINS = (44, 10, 14, 24)
+# length of the dashes (and of the gaps) of the Fresnel zone line in pixels
+DASH_LENGTH = 4
+# scale of the 3x5 pixels font
+FONT_SCALE = 2
+TICK_STEPS = (1, 2, 2.5, 5, 10)
+
+GLYPHS = {
+    '0': ('111', '101', '101', '101', '111'),
+    '1': ('010', '110', '010', '010', '111'),
+    '2': ('111', '001', '111', '100', '111'),
+    '3': ('111', '001', '111', '001', '111'),
+    '4': ('101', '101', '111', '001', '001'),
+    '5': ('111', '100', '111', '001', '111'),
+    '6': ('111', '100', '111', '101', '111'),
+    '7': ('111', '001', '010', '010', '010'),
+    '8': ('111', '101', '111', '101', '111'),
+    '9': ('111', '101', '111', '001', '111'),
+    '.': ('000', '000', '000', '000', '010'),
+    '-': ('000', '000', '111', '000', '000'),
+}
+
+
+def encode_png(image, level=6):
+    """
+    Encode an image to PNG.
+
+    :param image: the image as a numpy array of uint8 of shape (height, width, 4) for RGBA or (height, width, 3) for RGB
+    :param level: the zlib compression level
+    :return: the PNG image as a string
+    """
+    height, width, channels = image.shape
+    # every scanline starts with its filter type, 0 (none)
+    scanlines = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, -1)
+
+    def chunk(chunk_type, data):
+        """Build a PNG chunk"""
+        return struct.pack('>I', len(data)) + chunk_type + data + \
+            struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6 if channels == 4 else 2, 0, 0, 0)
+    return '\x89PNG\r\n\x1a\n' + chunk('IHDR', header) + chunk('IDAT', zlib.compress(scanlines.tostring(), level)) + \
+        chunk('IEND', '')
+
+
+def compute_ticks(data_min, data_max, max_ticks=9):
+    """
+    Compute round tick values, like matplotlib does.
+
+    :param data_min: the lower limit of the axis
+    :param data_max: the upper limit of the axis
+    :param max_ticks: the maximum number of ticks
+    :return: the numpy array of tick values and their step
+    """
+    magnitude = 10 ** np.floor(np.log10((data_max - data_min) / max_ticks)) if data_max > data_min else 1.
+    for step in TICK_STEPS:
+        step *= magnitude
+        first = np.ceil(data_min / step - 1e-9) * step
+        if int(np.floor((data_max - first) / step + 1e-9)) + 1 <= max_ticks:
+            break
+
+    return first + step * np.arange(int(np.floor((data_max - first) / step + 1e-9)) + 1), step
+
+
+def format_tick(value, step):
+    """
+    Format a tick label with as many decimals as the tick step needs.
+
+    :param value: the tick value
+    :param step: the step between two ticks
+    :return: the label
+    """
+    decimals = 0
+    while decimals < 6 and abs(step * 10 ** decimals - round(step * 10 ** decimals)) > 1e-9:
+        decimals += 1
+
+    return '%.*f' % (decimals, value)
+
+
+def draw_text(image, text, x, y, color=TEXT, align='left'):  # pylint: disable=invalid-name, too-many-arguments
+    """
+    Draw a text with the bitmap font, characters without glyph are left blank.
+
+    :param image: the image to draw on
+    :param text: the text
+    :param x: the x position of the text, according to align
+    :param y: the y position of the vertical center of the text
+    :param color: the color of the text
+    :param align: 'left', 'center' or 'right'
+    :return: None
+    """
+    char_width = 4 * FONT_SCALE
+    text_width = len(text) * char_width - FONT_SCALE
+    left = x - {'left': 0, 'center': text_width // 2, 'right': text_width}[align]
+    top = y - 5 * FONT_SCALE // 2
+    for index, char in enumerate(text):
+        glyph = GLYPHS.get(char)
+        if glyph is None:
+            continue
+        mask = np.array([[pixel == '1' for pixel in row] for row in glyph])
+        mask = np.kron(mask, np.ones((FONT_SCALE, FONT_SCALE), dtype=bool))
+        char_left = left + index * char_width
+        # clip the glyph to the image
+        rows = slice(max(top, 0), min(top + mask.shape[0], image.shape[0]))
+        cols = slice(max(char_left, 0), min(char_left + mask.shape[1], image.shape[1]))
+        mask = mask[rows.start - top:rows.stop - top, cols.start - char_left:cols.stop - char_left]
+        image[rows, cols][mask] = color
+
+
+def draw_polyline(area, x, y, x_range, y_range, color,  # pylint: disable=invalid-name, too-many-arguments
+                  dash_length=None):
+    """
+    Draw a 1 pixel wide polyline on a plot area, column by column.
+
+    :param area: the plot area, a view of the image
+    :param x: the x data of the polyline
+    :param y: the y data of the polyline
+    :param x_range: the (min, max) x data limits of the area
+    :param y_range: the (min, max) y data limits of the area
+    :param color: the color of the line
+    :param dash_length: the length of the dashes in pixels, defaults to None (solid line)
+    :return: None
+    """
+    height, width = area.shape[:2]
+    # rows of the line at the borders of the columns
+    borders = x_range[0] + np.arange(width + 1) * (x_range[1] - x_range[0]) / float(width)
+    rows = (y_range[1] - np.interp(borders, x, y)) * height / (y_range[1] - y_range[0])
+    lowest = np.floor(np.minimum(rows[:-1], rows[1:]))
+    highest = np.maximum(np.floor(np.maximum(rows[:-1], rows[1:]) - 1e-9), lowest)
+    pixel_rows = np.arange(height)[:, np.newaxis]
+    mask = (pixel_rows >= lowest) & (pixel_rows <= highest)
+    if dash_length is not None:
+        mask &= (np.arange(width) // dash_length) % 2 == 0
+    area[mask] = color
+
+
+def render_corrected_elevation(profile_data, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """
+    Rasterize the corrected elevation plot of a profile.
+
+    :param profile_data: the profile data, having 'distances', 'elevations', 'overheads' and 'sights' keys, and
+                         'fresnel_radii' to draw the Fresnel zone
+    :param width: the width of the image in pixels
+    :param height: the height of the image in pixels
+    :return: the image as a numpy array of uint8 of shape (height, width, 4)
+    """
+    # Prepare data, like plot_style.corrected_elevation
+    x = profile_data['distances'] / 1000  # pylint: disable=invalid-name
+    y_elev_plus_correction = profile_data['elevations'] + profile_data['overheads']
+    y_sight = profile_data['sights']
+    y_fresnel = fresnel_zone_bottom(profile_data, y_sight)
+
+    y_min, y_max = manual_linear_scaled_range(np.concatenate([y_elev_plus_correction, y_sight, y_fresnel]))
+    x_min, x_max = x.min(), x.max()
+    floor_plus_correction = y_min + profile_data['overheads']
+
+    image = np.empty((height, width, 4), dtype=np.uint8)
+    image[:] = BACKGROUND
+    left, top, right, bottom = MARGINS
+    area = image[top:height - bottom, left:width - right]
+    area_height, area_width = area.shape[:2]
+
+    # Fills, sampled at the center of the columns and rows
+    columns = x_min + (np.arange(area_width) + 0.5) * (x_max - x_min) / area_width
+    rows = (y_max - (np.arange(area_height) + 0.5) * (y_max - y_min) / area_height)[:, np.newaxis]
+    terrain_top = np.interp(columns, x, y_elev_plus_correction)
+    bulge_top = np.interp(columns, x, floor_plus_correction)
+    # columns over holes of the DEM (NaN) are left empty
+    with np.errstate(invalid='ignore'):
+        area[rows <= bulge_top] = BULGE
+        area[(rows > bulge_top) & (rows <= terrain_top)] = TERRAIN
+
+    # Grid and y tick labels
+    y_ticks, y_step = compute_ticks(y_min, y_max)
+    for tick in y_ticks:
+        row = int(round((y_max - tick) * (area_height - 1) / (y_max - y_min)))
+        area[row, :] = GRID
+        draw_text(image, format_tick(tick, y_step), left - 6, top + row, align='right')
+
+    # Lines
+    draw_polyline(area, x, y_sight, (x_min, x_max), (y_min, y_max), SIGHT)
+    if y_fresnel.size:
+        draw_polyline(area, x, y_fresnel, (x_min, x_max), (y_min, y_max), SIGHT, DASH_LENGTH)
+
+    # x ticks and labels
+    x_ticks, x_step = compute_ticks(x_min, x_max)
+    for tick in x_ticks:
+        column = left + int(round((tick - x_min) * (area_width - 1) / (x_max - x_min)))
+        image[height - bottom:height - bottom + 4, column] = TEXT
+        draw_text(image, format_tick(tick, x_step), column, height - bottom + 12, align='center')
+
+    return image
+
+
+def render_png(profile_data, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """
+    Render the corrected elevation plot of a profile to PNG.
+
+    :param profile_data: the profile data
+    :param width: the width of the image in pixels
+    :param height: the height of the image in pixels
+    :return: the PNG image as a string
+    """
+    return encode_png(render_corrected_elevation(profile_data, width, height))
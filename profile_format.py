@@ -4,15 +4,19 @@ Especially:
 
  * generate JSON output
  * generate PNG output
+ * generate a compact binary output, read back with read_binary_profile
 """
 
 from abc import ABCMeta, abstractmethod
 from io import BytesIO
 import json
+import struct
 
 import numpy as np
 
+import metrics
 import plot_style
+import png_raster
 
 
 class NumpyEncoder(json.JSONEncoder):
@@ -21,9 +25,12 @@ class NumpyEncoder(json.JSONEncoder):
     """
     def default(self, obj):
         """
-        if input object is a ndarray it will be converted into an array by calling ndarray.tolist
+        if input object is a ndarray it will be converted into an array by calling ndarray.tolist, NaN and infinite
+        values (holes of the DEM) being converted to None
         """
         if isinstance(obj, np.ndarray):
+            if obj.dtype.kind == 'f' and not np.isfinite(obj).all():
+                return np.where(np.isfinite(obj), obj, None).tolist()
             return obj.tolist()
 
         return json.JSONEncoder.default(self, obj)
@@ -113,15 +120,85 @@ class ProfileFormat(object):  # pylint: disable=no-init
         return self.write_to_filename(profile_data, filename_or_obj)
 
 
+# number of decimals of the values written in JSON: 1e-6 degree for coordinates, 0.1 meter for elevations
+JSON_PRECISIONS = {
+    'latitudes': 6,
+    'longitudes': 6,
+    'positions': 6,
+    'distances': 1,
+    'elevations': 1,
+    'sights': 1,
+    'overheads': 2,
+    'fresnel_radii': 2,
+    'fresnel_clearances': 2
+}
+JSON_DEFAULT_PRECISION = 6
+# number of values formatted at once and written as a chunk
+JSON_CHUNK_SIZE = 4096
+
+
+def format_json_values(values, decimals):
+    """
+    Format numbers as a comma separated JSON list content, in bulk, NaN and infinite values being written as null.
+
+    :param values: the 1-D numpy array of numbers
+    :param decimals: the number of decimals to write
+    :return: the formatted values
+    """
+    number_format = '%%.%df' % decimals
+    finite = np.isfinite(values)
+    if finite.all():
+        return ','.join([number_format] * len(values)) % tuple(values.tolist())
+
+    return ','.join([number_format % value if is_finite else 'null'
+                     for value, is_finite in zip(values.tolist(), finite.tolist())])
+
+
 class JSONProfileFormat(ProfileFormat):
     """
-    Profile format that generates JSON
+    Profile format that generates JSON.
+
+    Arrays are formatted in bulk with a number of decimals per key and written in chunks, so that a profile can be
+    streamed to a file or to the web server response.
     """
+
+    def __init__(self, precisions=None, chunk_size=JSON_CHUNK_SIZE):
+        """
+        :param precisions: the number of decimals of the keys of the profile, overriding JSON_PRECISIONS
+        :param chunk_size: the number of values formatted at once
+        """
+        self.precisions = dict(JSON_PRECISIONS, **(precisions or {}))
+        self.chunk_size = chunk_size
+
+    @metrics.timed_iterator('json')
+    def iter_data(self, profile_data):
+        """
+        Generate the JSON output by chunks.
+
+        :param profile_data: the profile data to format
+        :return: the generator of the chunks
+        """
+        yield '{'
+        for index, key in enumerate(sorted(profile_data)):
+            values = profile_data[key]
+            yield '%s%s: ' % (', ' if index else '', json.dumps(key))
+            if not isinstance(values, np.ndarray) or values.ndim != 1:
+                yield json.dumps(values, cls=NumpyEncoder)
+                continue
+
+            decimals = self.precisions.get(key, JSON_DEFAULT_PRECISION)
+            yield '['
+            for start in range(0, len(values), self.chunk_size):
+                yield (',' if start else '') + format_json_values(values[start:start + self.chunk_size], decimals)
+            yield ']'
+        yield '}'
+
     def get_data(self, profile_data):
-        return json.dumps(profile_data, cls=NumpyEncoder)
+        return ''.join(self.iter_data(profile_data))
 
     def write_to_fd(self, profile_data, fd):
-        return json.dump(profile_data, fd, cls=NumpyEncoder)
+        for chunk in self.iter_data(profile_data):
+            fd.write(chunk)
 
 
 class PNGProfileFormat(ProfileFormat):
@@ -132,6 +209,7 @@ class PNGProfileFormat(ProfileFormat):
     def __init__(self, style=plot_style.corrected_elevation):
         self.style = style
 
+    @metrics.timed_stage('png')
     def write_to_file(self, profile_data, filename_or_obj):
         self.style(profile_data, filename_or_obj)
 
@@ -148,7 +226,143 @@ class PNGProfileFormat(ProfileFormat):
         return buf
 
 
+class RasterPNGProfileFormat(ProfileFormat):
+    """
+    Profile format that rasterizes the corrected elevation plot in a PNG output without matplotlib, see png_raster
+    """
+
+    def __init__(self, width=png_raster.DEFAULT_WIDTH, height=png_raster.DEFAULT_HEIGHT):
+        self.width = width
+        self.height = height
+
+    @metrics.timed_stage('png_raster')
+    def get_data(self, profile_data):
+        return png_raster.render_png(profile_data, self.width, self.height)
+
+    def write_to_filename(self, profile_data, filename):
+        with open(filename, 'wb') as fd:  # pylint: disable=invalid-name
+            self.write_to_fd(profile_data, fd)
+
+
+# magic bytes and version of the binary format
+BINARY_MAGIC = 'YSMP'
+BINARY_VERSION = 2
+# version 1 only had 1-D arrays, their header holding their length instead of their shape
+BINARY_VERSIONS = (1, 2)
+# arrays start at multiples of 8 bytes, so that they can be mapped without copy
+BINARY_ALIGNMENT = 8
+# little endian types of the arrays: coordinates keep their precision, other values fit in float32
+BINARY_DTYPES = {'latitudes': '<f8', 'longitudes': '<f8'}
+BINARY_DEFAULT_DTYPE = '<f4'
+
+
+def binary_dtype(name, values):
+    """
+    Choose the type of an array in the binary format, elevations made of integers (DEM values read without
+    interpolation) are stored as int16.
+
+    :param name: the name of the array
+    :param values: the numpy array
+    :return: the little endian numpy type
+    """
+    if name == 'elevations' and values.size and np.all(np.isfinite(values)) and \
+            np.all(np.mod(values, 1) == 0) and values.min() >= -32768 and values.max() <= 32767:
+        return '<i2'
+
+    return BINARY_DTYPES.get(name, BINARY_DEFAULT_DTYPE)
+
+
+def binary_padding(offset):
+    """
+    :param offset: the current offset in the output
+    :return: the padding bytes aligning the next array
+    """
+    return '\0' * (-offset % BINARY_ALIGNMENT)
+
+
+def read_binary_profile(data):
+    """
+    Read a profile written by BinaryProfileFormat, the arrays are views of the data (no copy is made).
+
+    :param data: the binary profile as a string or a buffer
+    :return: the profile data, a dict of numpy arrays
+    """
+    if data[:4] != BINARY_MAGIC:
+        raise Exception("Not a binary profile")
+
+    version, count = struct.unpack_from('<HH', data, 4)
+    if version not in BINARY_VERSIONS:
+        raise Exception("Unsupported binary profile version: %d" % version)
+
+    offset = 8
+    columns = []
+    for _ in range(count):
+        name_length, = struct.unpack_from('<B', data, offset)
+        name = str(data[offset + 1:offset + 1 + name_length])
+        offset += 1 + name_length
+        if version == 1:
+            dtype, length = struct.unpack_from('<3sI', data, offset)
+            shape = (length,)
+            offset += 7
+        else:
+            dtype, ndim = struct.unpack_from('<3sB', data, offset)
+            shape = struct.unpack_from('<%dI' % ndim, data, offset + 4)
+            offset += 4 + 4 * ndim
+        columns.append((name, np.dtype(dtype), shape))
+
+    offset += -offset % BINARY_ALIGNMENT
+    profile_data = {}
+    for name, dtype, shape in columns:
+        length = int(np.prod(shape))
+        profile_data[name] = np.frombuffer(data, dtype=dtype, count=length, offset=offset).reshape(shape)
+        offset += length * dtype.itemsize
+        offset += -offset % BINARY_ALIGNMENT
+
+    return profile_data
+
+
+class BinaryProfileFormat(ProfileFormat):
+    """
+    Profile format that generates a compact binary output: a small header followed by the columnar little endian
+    arrays of the profile.
+
+    The header is the magic 'YSMP', the version and the number of arrays (2 uint16) then for each array: the length of
+    its name (uint8), its name, its numpy type ('<f8', '<f4' or '<i2'), its number of dimensions (uint8) and its shape
+    (uint32 each), so that batches of profiles (2-D arrays) keep their shape.
+    Each array is aligned on 8 bytes, see read_binary_profile.
+    """
+
+    @metrics.timed_stage('binary')
+    def write_to_fd(self, profile_data, fd):
+        arrays = []
+        header = [BINARY_MAGIC, struct.pack('<HH', BINARY_VERSION, len(profile_data))]
+        for name in sorted(profile_data):
+            values = np.asarray(profile_data[name])
+            values = np.ascontiguousarray(values, dtype=binary_dtype(name, values))
+            arrays.append(values)
+            header.append(struct.pack('<B', len(name)) + name + struct.pack('<3sB', values.dtype.str, values.ndim) +
+                          struct.pack('<%dI' % values.ndim, *values.shape))
+
+        header = ''.join(header)
+        fd.write(header + binary_padding(len(header)))
+        for values in arrays:
+            # written from the buffer of the array, without conversion to a string
+            fd.write(buffer(values))
+            fd.write(binary_padding(values.nbytes))
+
+    def write_to_filename(self, profile_data, filename):
+        with open(filename, 'wb') as fd:  # pylint: disable=invalid-name
+            self.write_to_fd(profile_data, fd)
+
+    def get_data(self, profile_data):
+        buf = BytesIO()
+        self.write_to_fd(profile_data, buf)
+        return buf.getvalue()
+
+
 JSON = JSONProfileFormat()
+BINARY = BinaryProfileFormat()
 PNG = PNG_corrected_elevation = PNGProfileFormat()
 PNG_curved_sight = PNGProfileFormat(plot_style.curved_sight)
 PNG_detailed = PNGProfileFormat(plot_style.detailed_plot)
+PNG_raster = RasterPNGProfileFormat()
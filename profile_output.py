@@ -12,8 +12,9 @@ import os
 import sys
 
 from osgeo import gdal
-from gdalconst import GA_ReadOnly
 
+import dem_catalog
+import geods
 import profiler
 import profile_format
 
@@ -32,7 +33,10 @@ def parse_args():
     parser.add_argument('long1', type=float, help="first point longitude, ex: 1.444796")
     parser.add_argument('lat2', type=float, help="second point latitude, ex: 43.671348")
     parser.add_argument('long2', type=float, help="second point longitude, ex: 1.225619")
-    parser.add_argument('-d', '--dem', help="DEM file location, ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'")
+    parser.add_argument('-d', '--dem', help="DEM file or DEM tiles directory location, "
+                                            "ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'")
+    parser.add_argument('-b', '--backend', choices=dem_catalog.BACKENDS,
+                        help="DEM reader, 'auto' reads .hgt files natively and other files with GDAL")
     offset1_group = parser.add_mutually_exclusive_group()
     offset1_group.add_argument('-og1', '--offset-ground1', type=float, metavar='OFF1',
                                help="first point line of sight offset from the ground level, ex: 6")
@@ -43,12 +47,23 @@ def parse_args():
                                help="second point line of sight offset from the ground level, ex: 10")
     offset2_group.add_argument('-os2', '--offset-sea2', type=float, metavar='OFF2',
                                help="second point line of sight offset from the sea level, ex: 200")
-    parser.add_argument('-of', '--output-format', choices=['json', 'png'], default='json', help="output format")
+    parser.add_argument('-n', '--definition', type=profiler.parse_definition,
+                        help="number of points of the profile, 'exact' for one point per crossed DEM pixel or 'auto' "
+                             "for about one point per DEM pixel along the segment, defaults to 512")
+    parser.add_argument('-i', '--interpolation', choices=geods.INTERPOLATIONS, default=geods.NEAREST,
+                        help="elevation interpolation between the DEM pixels")
+    parser.add_argument('-fq', '--frequency', type=float,
+                        help="radio link frequency in Hz to compute its first Fresnel zone, ex: 5.8e9")
+    parser.add_argument('-fc', '--fresnel-clearance', type=float, metavar='PERCENT',
+                        help="percentage of the first Fresnel zone that must be clear, defaults to 60")
+    parser.add_argument('-of', '--output-format', choices=['json', 'png', 'binary'], default='json',
+                        help="output format, 'binary' is a compact format read by profile_format.read_binary_profile")
     output_group = parser.add_mutually_exclusive_group()
     output_group.add_argument('-f', '--filename', help="file name")
     output_group.add_argument('-s', '--stdout', action='store_true', help="redirect output to standard output")
-    parser.add_argument('-st', '--style', choices=['corrected_elevation', 'curved_sight', 'detailed'],
-                        default='corrected_elevation', help="plot style for png output format")
+    parser.add_argument('-st', '--style', choices=['corrected_elevation', 'curved_sight', 'detailed', 'raster'],
+                        default='corrected_elevation', help="plot style for png output format, 'raster' is a fast "
+                                                            "rendering of corrected_elevation without matplotlib")
     return parser.parse_args()
 
 
@@ -57,10 +72,19 @@ def main():
     config = ConfigParser.ConfigParser()
     config.read('config.ini')
     config_dem_location = config.get('dem', 'location')
+    config_dem_backend = config.get('dem', 'backend')
 
     args = parse_args()
 
     kwargs = {}
+    if args.definition is not None:
+        kwargs['definition'] = args.definition
+
+    if args.frequency is not None:
+        kwargs['frequency'] = args.frequency
+        if args.fresnel_clearance is not None:
+            kwargs['fresnel_clearance'] = args.fresnel_clearance
+
     if args.offset_sea1 is not None:
         kwargs['height1'] = args.offset_sea1
         kwargs['above_ground1'] = False
@@ -84,19 +108,25 @@ def main():
     gdal.AllRegister()
     # open the DEM
     dem_location = args.dem or config_dem_location
-    data_source = gdal.Open(dem_location, GA_ReadOnly)
+    data_source = dem_catalog.open_dem(dem_location, args.backend or config_dem_backend)
 
-    profile_data = profiler.profile(data_source, args.lat1, args.long1, args.lat2, args.long2, **kwargs)
+    profile_data = profiler.profile(data_source, args.lat1, args.long1, args.lat2, args.long2,
+                                    interpolation=args.interpolation, **kwargs)
 
     if args.output_format == 'png':
         if args.style == 'detailed':
             output_format = profile_format.PNG_detailed
         elif args.style == 'curved_sight':
             output_format = profile_format.PNG_curved_sight
+        elif args.style == 'raster':
+            output_format = profile_format.PNG_raster
         else:
             output_format = profile_format.PNG
 
         default_filename = "profile.png"
+    elif args.output_format == 'binary':
+        output_format = profile_format.BINARY
+        default_filename = "profile.bin"
     else:
         output_format = profile_format.JSON
         default_filename = "profile.json"
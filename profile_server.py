@@ -7,29 +7,293 @@ See profiler.py and profile_output.py for generation details.
 
 import argparse
 import ConfigParser
+import contextlib
+import csv
+import functools
+import itertools
+import json
 import logging
 import os
+import re
+import time
 
 import cherrypy
 from osgeo import gdal
-from gdalconst import GA_ReadOnly
 
+import dataset_pool
+import dem_catalog
+import geods
+import hgt
+import metrics
 import profiler
-from profile_format import JSON, PNG
+import render_pool
+from profile_format import BINARY, JSON, PNG, PNG_raster, NumpyEncoder
+import response_cache
+import tile_cache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 LOGGER = logging.getLogger(os.path.basename(__file__))
 
+REQUEST_SECONDS = metrics.REGISTRY.histogram('request_duration_seconds', "Duration of the requests by endpoint")
+REQUESTS = metrics.REGISTRY.counter('requests_total', "Number of requests by endpoint and status")
+# endpoints labelling the request metrics, the other paths are counted as 'other'
+ENDPOINTS = ('json', 'png', 'binary', 'los', 'multipoint', 'batch', 'metrics')
+
+
+def record_request(start):
+    """
+    Record the duration and the status of the current request.
+
+    :param start: the time the request started at
+    :return: None
+    """
+    endpoint = cherrypy.request.path_info.rstrip('/').rsplit('/', 1)[-1]
+    if endpoint not in ENDPOINTS:
+        endpoint = 'other'
+    REQUEST_SECONDS.observe(time.time() - start, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=str(cherrypy.response.status).split(' ', 1)[0])
+
+
+def start_request():
+    """
+    Start timing the current request, it is recorded once its response is sent (streamed ones included).
+
+    :return: None
+    """
+    cherrypy.request.hooks.attach('on_end_request', record_request, start=time.time())
+
+
+cherrypy.tools.metrics = cherrypy.Tool('on_start_resource', start_request)
+
+
+# number of bytes of the request bodies read at once by iter_json_list
+JSON_READ_SIZE = 65536
+WHITESPACES = re.compile(r'\s*')
+
+
+def iter_json_list(fd, read_size=JSON_READ_SIZE):
+    """
+    Parse a JSON list incrementally, only a chunk of the document and the item being parsed are held in memory.
+
+    :param fd: the file-like object of the JSON document
+    :param read_size: the number of bytes read at once, defaults to JSON_READ_SIZE
+    :return: the generator of the items of the list, raising a ValueError when the document is not a valid JSON list
+    """
+    decoder = json.JSONDecoder()
+    buf, position, eof = '', 0, False
+    # what is expected next: the opening bracket, the first item (or the closing bracket), an item or a separator
+    expected = '['
+    while True:
+        position = WHITESPACES.match(buf, position).end()
+        if position == len(buf):
+            if eof:
+                raise ValueError("Unexpected end of the JSON list")
+            chunk = fd.read(read_size)
+            buf, position, eof = buf[position:] + chunk, 0, not chunk
+            continue
+
+        char = buf[position]
+        if expected in ('[', ',') or (expected == 'first' and char == ']'):
+            if char not in {'[': '[', ',': ',]', 'first': ']'}[expected]:
+                raise ValueError("Invalid JSON list, expected %r at %r" % (expected, buf[position:position + 16]))
+            position += 1
+            if char == ']':
+                return
+            expected = 'first' if char == '[' else 'item'
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buf, position)
+        except ValueError:
+            if eof:
+                raise
+            end = len(buf)
+        # an item not followed by a separator may be incomplete (ex: a number), it is parsed again with the next chunk
+        following = WHITESPACES.match(buf, end).end()
+        if not eof and (following == len(buf) or buf[following] not in ',]'):
+            chunk = fd.read(read_size)
+            buf, position, eof = buf[position:] + chunk, 0, not chunk
+            continue
+
+        position = end
+        expected = ','
+        yield item
+
+
+def iter_json_lines(lines):
+    """
+    Parse newline delimited JSON, one item per line, blank lines being skipped.
+
+    :param lines: the iterable of lines, ex: a file-like object
+    :return: the generator of the items, raising a ValueError on an invalid line
+    """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def profile_kwargs(og1=None, os1=None, og2=None, os2=None, definition=None, interpolation=None, frequency=None,
+                   fresnel_clearance=None):
+    """
+    Check the profile request parameters and convert them to profiler.profile keyword arguments.
+
+    :param og1: line of sight offset from the ground level of the first point
+    :param os1: line of sight offset from the sea level of the first point
+    :param og2: line of sight offset from the ground level of the second point
+    :param os2: line of sight offset from the sea level of the second point
+    :param definition: number of points of the profile, 'exact' or 'auto'
+    :param interpolation: elevation interpolation, one of geods.INTERPOLATIONS
+    :param frequency: frequency of the radio link in Hz, to compute the first Fresnel zone
+    :param fresnel_clearance: percentage of the first Fresnel zone that must be clear
+    :return: the keyword arguments, raises a cherrypy.HTTPError for invalid parameters
+    """
+    if og1 is not None and os1 is not None:
+        raise cherrypy.HTTPError(400, "Incompatible parameters 'og1' and 'os1'")
+
+    if og2 is not None and os2 is not None:
+        raise cherrypy.HTTPError(400, "Incompatible parameters 'og2' and 'os2'")
+
+    if interpolation is not None and interpolation not in geods.INTERPOLATIONS:
+        raise cherrypy.HTTPError(400, "Invalid parameter 'interpolation', must be one of: %s" %
+                                 ", ".join(geods.INTERPOLATIONS))
+
+    kwargs = {}
+    if definition is not None:
+        try:
+            kwargs['definition'] = profiler.parse_definition(definition)
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid parameter 'definition', must be an integer >= 2, 'exact' or 'auto'")
+
+    if interpolation is not None:
+        kwargs['interpolation'] = interpolation
+
+    for name, value in (('frequency', frequency), ('fresnel_clearance', fresnel_clearance)):
+        if value is not None:
+            try:
+                kwargs[name] = float(value)
+            except ValueError:
+                raise cherrypy.HTTPError(400, "Invalid parameter '%s', must be a number" % name)
+
+    for height, above_ground, offsets in (('height1', 'above_ground1', (('os1', os1), ('og1', og1))),
+                                          ('height2', 'above_ground2', (('os2', os2), ('og2', og2)))):
+        for name, value in offsets:
+            if value is not None:
+                try:
+                    kwargs[height] = float(value)
+                except ValueError:
+                    raise cherrypy.HTTPError(400, "Invalid parameter '%s', must be a number" % name)
+                kwargs[above_ground] = name.startswith('og')
+                break
+
+    return kwargs
+
 
 class Profile(object):
     """Profile service"""
 
-    def __init__(self, data_source):
-        self.data_source = data_source
+    _cp_config = {'tools.metrics.on': True}
+
+    def __init__(self, pool, cache=None, precision=response_cache.DEFAULT_PRECISION, png_format=PNG):
+        """
+        :param pool: the dataset_pool.DatasetPool of the DEM handles
+        :param cache: the response_cache.ResponseCache of the responses, defaults to None (no cache)
+        :param precision: the number of decimals the requested coordinates are rounded to
+        :param png_format: the profile format of the PNG responses, defaults to profile_format.PNG (rendered in the
+                           server threads)
+        """
+        self.pool = pool
+        self.cache = cache
+        self.precision = precision
+        self.png_format = png_format
+        if cache is not None:
+            metrics.REGISTRY.register_collector('response_cache', cache.stats)
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """
+        Check a DEM handle out of the pool (see dataset_pool.DatasetPool.checkout), requests for points out of the DEM
+        or without elevation data being answered with 400 Bad Request.
+
+        :return: the context manager providing the handle
+        """
+        try:
+            with self.pool.checkout() as data_source:
+                yield data_source
+        except geods.OutOfExtentError as error:
+            raise cherrypy.HTTPError(400, str(error))
+
+    def parse_coordinates(self, *coordinates):
+        """
+        Parse the requested coordinates. When responses are cached, they are rounded so that requests for nearly the
+        same points share their cached response, which is computed from the rounded coordinates.
+
+        :param coordinates: the coordinates, as numbers or strings
+        :return: the list of coordinates, rounded if responses are cached
+        """
+        try:
+            if self.cache is None:
+                return [float(coordinate) for coordinate in coordinates]
+            return [response_cache.quantize(coordinate, self.precision) for coordinate in coordinates]
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid coordinates, must be numbers")
+
+    def serve_cached(self, key, compute, stream=None):
+        """
+        Serve a response from the cache, computing it on a miss, with its ETag.
+        A request whose If-None-Match header matches the ETag is answered with 304 Not Modified.
+
+        With a stream function, a miss is streamed by chunks as they are computed instead, without ETag (the headers
+        are sent before the body), and cached once all the chunks are sent.
+
+        :param key: the key of the request (see response_cache.make_key)
+        :param compute: the function computing the response, returning the couple (content type, body)
+        :param stream: the function computing the response by chunks, returning the couple (content type, iterable of
+                       chunks), defaults to None (misses are computed as a whole)
+        :return: the body of the response
+        """
+        response = self.cache.get(key) if self.cache is not None else None
+        if response is None and stream is not None:
+            content_type, chunks = stream()
+            cherrypy.response.headers['Content-Type'] = content_type
+            cherrypy.response.stream = True
+            return chunks if self.cache is None else self.cache_chunks(key, content_type, chunks)
+
+        if response is None:
+            content_type, body = compute()
+            if self.cache is not None:
+                response = self.cache.put(key, content_type, body)
+            else:
+                response = response_cache.CachedResponse(response_cache.compute_etag(body), content_type, body, None)
+
+        cherrypy.response.headers['Content-Type'] = response.content_type
+        cherrypy.response.headers['ETag'] = response.etag
+        if_none_match = cherrypy.request.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or
+                              response.etag in [etag.strip() for etag in if_none_match.split(',')]):
+            raise cherrypy.HTTPRedirect([], 304)
+
+        return response.body
+
+    def cache_chunks(self, key, content_type, chunks):
+        """
+        Stream the chunks of a response, caching the response once they are all sent.
+
+        :param key: the key of the request (see response_cache.make_key)
+        :param content_type: the content type of the response
+        :param chunks: the iterable of the chunks of the body
+        :return: the generator of the chunks
+        """
+        body = []
+        for chunk in chunks:
+            body.append(chunk)
+            yield chunk
+
+        self.cache.put(key, content_type, ''.join(body))
 
     def serve_profile(self, lat1, long1, lat2, long2, content_type='application/json', profile_format=JSON,
-                      og1=None, os1=None, og2=None, os2=None):
+                      og1=None, os1=None, og2=None, os2=None, definition=None, interpolation=None, frequency=None,
+                      fresnel_clearance=None):
         """
         Generate and format a profile for the given parameters.
 
@@ -43,33 +307,32 @@ class Profile(object):
         :param os1: line of sight offset from the sea level of the first point
         :param og2: line of sight offset from the ground level of the second point
         :param os2: line of sight offset from the sea level of the second point
+        :param definition: number of points of the profile, 'exact' or 'auto', defaults to 512
+        :param interpolation: elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :param frequency: frequency of the radio link in Hz, to compute the first Fresnel zone
+        :param fresnel_clearance: percentage of the first Fresnel zone that must be clear, defaults to 60
         :return: the formatted elevation profile between the two points
         """
-        if og1 is not None and os1 is not None:
-            raise cherrypy.HTTPError(400, "Incompatible parameters 'og1' and 'os1'")
+        kwargs = profile_kwargs(og1, os1, og2, os2, definition, interpolation, frequency, fresnel_clearance)
+        coordinates = self.parse_coordinates(lat1, long1, lat2, long2)
 
-        if og2 is not None and os2 is not None:
-            raise cherrypy.HTTPError(400, "Incompatible parameters 'og2' and 'os2'")
+        def compute():
+            """Compute and format the profile"""
+            with self.checkout() as data_source:
+                elevations = profiler.profile(data_source, *coordinates, **kwargs)
+            data = profile_format.get_data(elevations)
+            # binary formats return a file-like object
+            return content_type, data.getvalue() if hasattr(data, 'getvalue') else data
 
-        kwargs = {}
-        if os1 is not None:
-            kwargs['height1'] = os1
-            kwargs['above_ground1'] = False
-        elif og1 is not None:
-            kwargs['height1'] = og1
-            kwargs['above_ground1'] = True
+        def stream():
+            """Compute the profile, formatted by chunks"""
+            with self.checkout() as data_source:
+                elevations = profiler.profile(data_source, *coordinates, **kwargs)
+            return content_type, profile_format.iter_data(elevations)
 
-        if os2 is not None:
-            kwargs['height2'] = os2
-            kwargs['above_ground2'] = False
-        elif og2 is not None:
-            kwargs['height2'] = og2
-            kwargs['above_ground2'] = True
-
-        elevations = profiler.profile(self.data_source, float(lat1), float(long1), float(lat2), float(long2), **kwargs)
-
-        cherrypy.response.headers['Content-Type'] = content_type
-        return profile_format.get_data(elevations)
+        # formats generating their output by chunks (JSON) are streamed
+        return self.serve_cached(response_cache.make_key(content_type, profile_format, *coordinates, **kwargs),
+                                 compute, stream if hasattr(profile_format, 'iter_data') else None)
 
     @cherrypy.expose
     def index(self):  # pylint: disable=no-self-use
@@ -81,7 +344,19 @@ class Profile(object):
         raise cherrypy.HTTPRedirect("/profile/json", 301)
 
     @cherrypy.expose
-    def json(self, lat1, long1, lat2, long2, og1=None, os1=None, og2=None, os2=None):
+    def metrics(self):  # pylint: disable=no-self-use
+        """
+        Metrics mapping that outputs the durations of the requests and of the stages of the profiles, the request
+        counters and the cache statistics in the Prometheus text format.
+
+        :return: the metrics
+        """
+        cherrypy.response.headers['Content-Type'] = 'text/plain; version=0.0.4'
+        return metrics.REGISTRY.expose()
+
+    @cherrypy.expose
+    def json(self, lat1, long1, lat2, long2, og1=None, os1=None, og2=None, os2=None, definition=None,
+             interpolation=None, frequency=None, fresnel_clearance=None):
         """
         JSON mapping that outputs the elevations.
 
@@ -93,12 +368,19 @@ class Profile(object):
         :param os1: line of sight offset from the sea level of the first point
         :param og2: line of sight offset from the ground level of the second point
         :param os2: line of sight offset from the sea level of the second point
+        :param definition: number of points of the profile, 'exact' or 'auto', defaults to 512
+        :param interpolation: elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :param frequency: frequency of the radio link in Hz, to compute the first Fresnel zone
+        :param fresnel_clearance: percentage of the first Fresnel zone that must be clear, defaults to 60
         :return: the list of elevations between the two points
         """
-        return self.serve_profile(lat1, long1, lat2, long2, og1=og1, os1=os1, og2=og2, os2=os2)
+        return self.serve_profile(lat1, long1, lat2, long2, og1=og1, os1=os1, og2=og2, os2=os2,
+                                  definition=definition, interpolation=interpolation, frequency=frequency,
+                                  fresnel_clearance=fresnel_clearance)
 
     @cherrypy.expose
-    def png(self, lat1, long1, lat2, long2, og1=None, os1=None, og2=None, os2=None):
+    def png(self, lat1, long1, lat2, long2, og1=None, os1=None, og2=None, os2=None, definition=None,
+            interpolation=None, frequency=None, fresnel_clearance=None, style='plot'):
         """
         PNG mapping that outputs a png image of the profile
 
@@ -110,10 +392,208 @@ class Profile(object):
         :param os1: line of sight offset from the sea level of the first point
         :param og2: line of sight offset from the ground level of the second point
         :param os2: line of sight offset from the sea level of the second point
+        :param definition: number of points of the profile, 'exact' or 'auto', defaults to 512
+        :param interpolation: elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :param frequency: frequency of the radio link in Hz, to compute the first Fresnel zone
+        :param fresnel_clearance: percentage of the first Fresnel zone that must be clear, defaults to 60
+        :param style: 'plot' (default) to draw the picture with matplotlib, 'raster' for a faster rendering without it
         :return: the picture of the requested profile
         """
-        return self.serve_profile(lat1, long1, lat2, long2, content_type='image/png', profile_format=PNG,
-                                  og1=og1, os1=os1, og2=og2, os2=os2)
+        if style not in ('plot', 'raster'):
+            raise cherrypy.HTTPError(400, "Invalid parameter 'style', must be 'plot' or 'raster'")
+
+        png_format = PNG_raster if style == 'raster' else self.png_format
+        return self.serve_profile(lat1, long1, lat2, long2, content_type='image/png', profile_format=png_format,
+                                  og1=og1, os1=os1, og2=og2, os2=os2, definition=definition,
+                                  interpolation=interpolation, frequency=frequency,
+                                  fresnel_clearance=fresnel_clearance)
+
+    @cherrypy.expose
+    def binary(self, lat1, long1, lat2, long2, og1=None, os1=None, og2=None, os2=None, definition=None,
+               interpolation=None, frequency=None, fresnel_clearance=None):
+        """
+        Binary mapping that outputs the profile in the compact binary format (see profile_format.read_binary_profile).
+
+        :param lat1: latitude of the first point
+        :param long1: longitude of the first point
+        :param lat2: latitude of the second point
+        :param long2: longitude of the second point
+        :param og1: line of sight offset from the ground level of the first point
+        :param os1: line of sight offset from the sea level of the first point
+        :param og2: line of sight offset from the ground level of the second point
+        :param os2: line of sight offset from the sea level of the second point
+        :param definition: number of points of the profile, 'exact' or 'auto', defaults to 512
+        :param interpolation: elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :param frequency: frequency of the radio link in Hz, to compute the first Fresnel zone
+        :param fresnel_clearance: percentage of the first Fresnel zone that must be clear, defaults to 60
+        :return: the binary profile between the two points
+        """
+        return self.serve_profile(lat1, long1, lat2, long2, content_type='application/octet-stream',
+                                  profile_format=BINARY, og1=og1, os1=os1, og2=og2, os2=os2, definition=definition,
+                                  interpolation=interpolation, frequency=frequency,
+                                  fresnel_clearance=fresnel_clearance)
+
+    @cherrypy.expose
+    def los(self, lat1, long1, lat2, long2, og1=None, os1=None, og2=None, os2=None, definition=None,
+            interpolation=None, frequency=None, fresnel_clearance=None, early_exit='true'):
+        """
+        Line of sight mapping that outputs a compact JSON verdict instead of the whole profile.
+
+        :param lat1: latitude of the first point
+        :param long1: longitude of the first point
+        :param lat2: latitude of the second point
+        :param long2: longitude of the second point
+        :param og1: line of sight offset from the ground level of the first point
+        :param os1: line of sight offset from the sea level of the first point
+        :param og2: line of sight offset from the ground level of the second point
+        :param os2: line of sight offset from the sea level of the second point
+        :param definition: number of points of the profile, 'exact' or 'auto', defaults to 512
+        :param interpolation: elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+        :param frequency: frequency of the radio link in Hz, to compute the first Fresnel zone
+        :param fresnel_clearance: percentage of the first Fresnel zone that must be clear, defaults to 60
+        :param early_exit: 'true' (default) to stop at the first obstruction found, 'false' to find the worst one
+        :return: the visibility, the minimum clearance and the location of the worst point
+        """
+        if early_exit not in ('true', 'false'):
+            raise cherrypy.HTTPError(400, "Invalid parameter 'early_exit', must be 'true' or 'false'")
+
+        kwargs = profile_kwargs(og1, os1, og2, os2, definition, interpolation, frequency, fresnel_clearance)
+        kwargs['early_exit'] = early_exit == 'true'
+        coordinates = self.parse_coordinates(lat1, long1, lat2, long2)
+
+        def compute():
+            """Compute the verdict"""
+            with self.checkout() as data_source:
+                verdict = profiler.line_of_sight(data_source, *coordinates, **kwargs)
+            return 'application/json', json.dumps(verdict)
+
+        return self.serve_cached(response_cache.make_key('los', *coordinates, **kwargs), compute)
+
+    @cherrypy.expose
+    @cherrypy.tools.json_in()
+    def multipoint(self):
+        """
+        Point to multipoint mapping that outputs the line of sight verdicts between one origin and many targets.
+
+        The request body is a JSON object with the following keys: 'lat' and 'long' of the origin, 'og' or 'os' its
+        offset from the ground or the sea level, 'targets' the list of [lat, long] couples, 'target_og' or 'target_os'
+        the offset of the targets, and the optional 'definition', 'interpolation', 'frequency' and 'fresnel_clearance'
+        (see json).
+
+        :return: the lists of verdicts, minimum clearances, distances, azimuths and obstruction distances, in the
+                 order of the targets
+        """
+        if cherrypy.request.method != 'POST':
+            raise cherrypy.HTTPError(405, "Only POST requests are allowed")
+
+        body = cherrypy.request.json
+        try:
+            origin_lat = float(body['lat'])
+            origin_long = float(body['long'])
+            target_lats = [float(target[0]) for target in body['targets']]
+            target_longs = [float(target[1]) for target in body['targets']]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise cherrypy.HTTPError(400, "Missing or invalid 'lat', 'long' or 'targets'")
+
+        kwargs = profile_kwargs(body.get('og'), body.get('os'), body.get('target_og'), body.get('target_os'),
+                                body.get('definition'), body.get('interpolation'), body.get('frequency'),
+                                body.get('fresnel_clearance'))
+        if kwargs.get('definition') == profiler.EXACT:
+            raise cherrypy.HTTPError(400, "Invalid parameter 'definition', 'exact' is not supported")
+
+        with self.checkout() as data_source:
+            verdicts = profiler.point_to_multipoint(data_source, origin_lat, origin_long, target_lats, target_longs,
+                                                    **kwargs)
+
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return json.dumps(verdicts, cls=NumpyEncoder)
+
+    @cherrypy.expose
+    def batch(self):
+        """
+        Batch mapping that computes the profiles of a list of segments and streams them as newline delimited JSON.
+
+        The request body is either a JSON list of objects (Content-Type: application/json), newline delimited JSON
+        objects (Content-Type: application/x-ndjson) or a CSV document with a header line (Content-Type: text/csv),
+        each object or row being a segment with the parameters of json: 'lat1', 'long1', 'lat2', 'long2' and the
+        optional offsets and profile options.
+
+        The body is spooled to a temporary file then its segments are parsed one at a time as the profiles are
+        streamed, so that the memory used does not depend on the size of the batch. An invalid body found after the
+        first segment ends the response with an error line.
+
+        :return: the generator of the JSON lines, one per segment in the order of the request, either
+                 {"index": i, "profile": {...}} or {"index": i, "error": "..."}
+        """
+        if cherrypy.request.method != 'POST':
+            raise cherrypy.HTTPError(405, "Only POST requests are allowed")
+
+        # the body is not read from the socket while the response is streamed: clients sending their whole request
+        # before reading the response would block once the socket buffers are full
+        body = cherrypy.request.body.read_into_file()
+        body.seek(0)
+        content_type = cherrypy.request.headers.get('Content-Type', '').split(';')[0].strip()
+        if content_type == 'text/csv':
+            segments = csv.DictReader(body)
+        else:
+            segments = iter_json_lines(body) if content_type == 'application/x-ndjson' else iter_json_list(body)
+            try:
+                segments = itertools.chain([next(segments)], segments)
+            except StopIteration:
+                segments = []
+            except ValueError:
+                raise cherrypy.HTTPError(400, "Invalid JSON body, it must be a list of segments")
+
+        cherrypy.response.headers['Content-Type'] = 'application/x-ndjson'
+        return self.stream_profiles(segments)
+
+    # the lines are sent as soon as they are computed instead of being buffered
+    batch._cp_config = {'response.stream': True}
+
+    def stream_profiles(self, segments):
+        """
+        Compute the profiles of segments one at a time, a DEM handle being only checked out for each profile.
+
+        :param segments: the iterable of segments, dicts of the parameters of json
+        :return: the generator of the JSON lines
+        """
+        segments = iter(segments)
+        for index in itertools.count():
+            try:
+                segment = next(segments)
+            except StopIteration:
+                return
+            except (ValueError, csv.Error) as exception:
+                yield json.dumps({'index': index, 'error': "Invalid body: %s" % exception}) + '\n'
+                return
+
+            error = profile_data = None
+            try:
+                params = dict((name, value) for name, value in segment.items() if value not in (None, ''))
+                coordinates = [float(params[name]) for name in ('lat1', 'long1', 'lat2', 'long2')]
+            except (AttributeError, KeyError, TypeError, ValueError):
+                error = "Missing or invalid 'lat1', 'long1', 'lat2' or 'long2'"
+            else:
+                try:
+                    kwargs = profile_kwargs(*[params.get(name) for name in ('og1', 'os1', 'og2', 'os2', 'definition',
+                                                                             'interpolation', 'frequency',
+                                                                             'fresnel_clearance')])
+                    with self.checkout() as data_source:
+                        profile_data = profiler.profile(data_source, *coordinates, **kwargs)
+                except cherrypy.HTTPError as http_error:
+                    error = http_error.args[-1]
+                except Exception as exception:  # pylint: disable=broad-except
+                    LOGGER.warning("batch segment %d failed: %s", index, exception)
+                    error = str(exception)
+
+            if profile_data is None:
+                yield json.dumps({'index': index, 'error': error}) + '\n'
+                continue
+
+            yield '{"index": %d, "profile": ' % index
+            for chunk in JSON.iter_data(profile_data):
+                yield chunk
+            yield '}\n'
 
 
 def main():
@@ -121,9 +601,27 @@ def main():
     config = ConfigParser.ConfigParser()
     config.read('config.ini')
     config_dem_location = config.get('dem', 'location')
+    config_dem_backend = config.get('dem', 'backend')
+    config_tile_cache_mb = config.getfloat('cache', 'tile_cache_mb')
+    config_thread_pool = config.getint('server', 'thread_pool')
+    config_response_cache_size = config.getint('cache', 'response_cache_size')
+    config_response_cache_ttl = config.getfloat('cache', 'response_cache_ttl')
+    config_coordinate_precision = config.getint('cache', 'coordinate_precision')
+    config_render_processes = config.getint('server', 'render_processes')
 
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('-d', '--dem', help="DEM file location, ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'")
+    parser.add_argument('-d', '--dem', help="DEM file or DEM tiles directory location, "
+                                            "ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'")
+    parser.add_argument('-b', '--backend', choices=dem_catalog.BACKENDS, default=config_dem_backend,
+                        help="DEM reader, 'auto' reads .hgt files natively and other files with GDAL")
+    parser.add_argument('-tc', '--tile-cache', type=float, metavar='MB', default=config_tile_cache_mb,
+                        help="memory budget of the DEM tile cache in MB, 0 to disable it, ex: 64")
+    parser.add_argument('-rc', '--response-cache', type=int, metavar='SIZE', default=config_response_cache_size,
+                        help="maximum number of cached responses, 0 to disable the cache, ex: 256")
+    parser.add_argument('-t', '--threads', type=int, default=config_thread_pool,
+                        help="number of worker threads, each one reading the DEM with its own handle, ex: 10")
+    parser.add_argument('-rp', '--render-processes', type=int, metavar='COUNT', default=config_render_processes,
+                        help="number of processes rendering the PNG profiles, 0 to render them in the server threads")
     args = parser.parse_args()
 
     LOGGER.debug("using the following DEM: %s", args.dem)
@@ -132,9 +630,39 @@ def main():
     gdal.AllRegister()
     # open the image
     dem_location = args.dem or config_dem_location
-    data_source = gdal.Open(dem_location, GA_ReadOnly)
+    cache = tile_cache.TileCache(args.tile_cache) if args.tile_cache > 0 else None
+    if cache is not None:
+        metrics.REGISTRY.register_collector('tile_cache', cache.stats)
+
+    def open_file(filename):
+        """Open a DEM file, GDAL datasets read through the tile cache (memory mapped .hgt tiles need no cache)"""
+        data_source = dem_catalog.open_file(filename, args.backend)
+        if cache is not None and not isinstance(data_source, hgt.HGTDataSource):
+            data_source = tile_cache.CachedDataSource(data_source, cache)
+        return data_source
+
+    if os.path.isdir(dem_location):
+        # the tiles are only scanned once, each handle opens its own tiles
+        opener = dem_catalog.open_dem(dem_location, opener=open_file).clone
+    else:
+        opener = functools.partial(open_file, dem_location)
+    # one handle per worker thread, GDAL handles can't be shared between threads
+    pool = dataset_pool.DatasetPool(opener, args.threads)
+
+    responses = None
+    if args.response_cache > 0:
+        responses = response_cache.ResponseCache(args.response_cache, config_response_cache_ttl)
+
+    png_format = PNG
+    if args.render_processes > 0:
+        # started before the server threads, the processes are forked
+        renderers = render_pool.RenderPool(args.render_processes)
+        cherrypy.engine.subscribe('stop', renderers.close)
+        # the same plot style as the rendering in the server threads
+        png_format = render_pool.PooledPNGProfileFormat(renderers, PNG.style.__name__)
 
-    cherrypy.quickstart(Profile(data_source), '/profile')
+    cherrypy.config.update({'server.thread_pool': args.threads})
+    cherrypy.quickstart(Profile(pool, responses, config_coordinate_precision, png_format), '/profile')
 
 
 if __name__ == '__main__':
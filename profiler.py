@@ -10,17 +10,16 @@ The profile consists in a list of points equally distributed with their:
   * overhead of the curvature of the earth
 """
 
-import math
-
 import numpy as np
 
 import geods
 import geometry
+import metrics
 
 
 def compute_curved_earth_correction(wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, latitudes, longitudes):
     """
-    Compute the curved earth correction with the given parameters.
+    Compute the curved earth correction with the given parameters, see geometry.distances_and_overheads.
 
     :param wgs84_lat1: the latitude of the starting point
     :param wgs84_long1: the longitude of the starting point
@@ -28,22 +27,121 @@ def compute_curved_earth_correction(wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_l
     :param wgs84_long2: the longitude of the ending point
     :param latitudes: latitudes of the points to compute the correction at
     :param longitudes: longitudes of the points to compute the correction at
-    :return:
+    :return: the corrections (overheads) in meters
     """
-    half_central_angle = geometry.half_central_angle(math.radians(wgs84_lat1), math.radians(wgs84_long1),
-                                                     math.radians(wgs84_lat2), math.radians(wgs84_long2))
-    max_overhead = geometry.overhead_height(half_central_angle, geometry.EARTH_RADIUS)
-    angles = geometry.central_angle(np.deg2rad(wgs84_lat1), np.deg2rad(wgs84_long1), np.deg2rad(latitudes),
-                                             np.deg2rad(longitudes))
-    return max_overhead - geometry.overhead_height(half_central_angle - angles, geometry.EARTH_RADIUS)
+    terms = geometry.segment_terms(np.deg2rad(wgs84_lat1), np.deg2rad(wgs84_long1), np.deg2rad(wgs84_lat2),
+                                   np.deg2rad(wgs84_long2))
+    _, overheads = geometry.distances_and_overheads(terms, np.deg2rad(latitudes), np.deg2rad(longitudes))
+
+    return overheads
+
+
+@metrics.timed_stage('geometry')
+def compute_geometry(wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, latitudes, longitudes, positions,
+                     start_sights, end_sights, out=None):
+    """
+    Compute the distances, the curved earth corrections and the line of sight heights of the points of profiles in a
+    single pass, see geometry.distances_and_overheads, the terms of the end points being computed once per segment.
+
+    :param wgs84_lat1: the latitude of the starting point, or a column of latitudes for many profiles
+    :param wgs84_long1: the longitude of the starting point
+    :param wgs84_lat2: the latitude of the ending point
+    :param wgs84_long2: the longitude of the ending point
+    :param latitudes: latitudes of the points of the profiles
+    :param longitudes: longitudes of the points of the profiles
+    :param positions: positions of the points along the segments, from 0 to 1
+    :param start_sights: the line of sight height at the starting point
+    :param end_sights: the line of sight height at the ending point
+    :param out: a profile data whose 'distances', 'overheads' and 'sights' arrays are filled when they have the shape
+                of latitudes, defaults to None (new arrays)
+    :return: the distances, overheads and sights arrays and the total distances of the segments
+    """
+    shape = np.shape(latitudes)
+    distances, overheads, sights = [
+        out[key] if out is not None and key in out and out[key].shape == shape else np.empty(shape)
+        for key in ('distances', 'overheads', 'sights')]
+
+    terms = geometry.segment_terms(np.deg2rad(wgs84_lat1), np.deg2rad(wgs84_long1), np.deg2rad(wgs84_lat2),
+                                   np.deg2rad(wgs84_long2))
+    # the coordinates in radians are held by the output arrays not computed yet
+    geometry.distances_and_overheads(terms, np.deg2rad(latitudes, out=sights), np.deg2rad(longitudes, out=overheads),
+                                     distances, overheads)
+    np.multiply(positions, end_sights - start_sights, out=sights)
+    np.add(sights, start_sights, out=sights)
+
+    return distances, overheads, sights, 2 * terms.radius * terms.half_angle
+
+
+# default percentage of the first Fresnel zone that must be free of obstruction
+FRESNEL_CLEARANCE = 60.
+
+
+def compute_clearances(elevations, overheads, sights):
+    """
+    Compute the clearances between the line of sight and the ground corrected by the curvature of the earth.
+
+    :param elevations: the elevations of the points
+    :param overheads: the curved earth corrections of the points
+    :param sights: the line of sight heights of the points
+    :return: the clearances, negative where the ground obstructs the line of sight
+    """
+    return sights - (elevations + overheads)
+
+
+# sampling mode where every DEM pixel crossed by the segment is sampled once (see geods.grid_crossings)
+EXACT = 'exact'
+
+
+# sampling mode where the number of points is chosen from the length of the segment in DEM pixels
+AUTO = 'auto'
+# bounds of the number of points of the AUTO definition
+AUTO_MIN_DEFINITION = 32
+AUTO_MAX_DEFINITION = 4096
+
+
+def parse_definition(value):
+    """
+    Parse a profile definition given as a string.
+
+    :param value: the number of points to sample, 'exact' or 'auto'
+    :return: the definition as an int, EXACT or AUTO
+    """
+    if value in (EXACT, AUTO):
+        return value
+
+    definition = int(value)
+    if definition < 2:
+        raise ValueError("definition must be at least 2, got: %d" % definition)
+
+    return definition
+
+
+def auto_definition(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, min_definition=AUTO_MIN_DEFINITION,
+                    max_definition=AUTO_MAX_DEFINITION):
+    """
+    Compute the AUTO definition of segments: about one point per DEM pixel along the longest segment, bounded so that
+    short links still get a smooth profile and long ones a predictable cost.
+
+    :param data_source: the data_source to read elevation data from, giving the pixel size
+    :param wgs84_lat1: the latitudes of the starting points, a scalar or a numpy array
+    :param wgs84_long1: the longitudes of the starting points
+    :param wgs84_lat2: the latitudes of the ending points
+    :param wgs84_long2: the longitudes of the ending points
+    :param min_definition: the minimum number of points, defaults to AUTO_MIN_DEFINITION
+    :param max_definition: the maximum number of points, defaults to AUTO_MAX_DEFINITION
+    :return: the number of points
+    """
+    pixels = np.max(geods.segment_pixel_lengths(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2))
+    return int(min(max(np.ceil(pixels) + 1, min_definition), max_definition))
 
 
 # TODO add radius correction based on the latitude, see: http://en.wikipedia.org/wiki/Earth_radius#Geocentric_radius
-# TODO currently only 'sampling', to be 'exact' a full path should be performed on the actual dataset
 # TODO rasterize a polyline:
 # see: http://gis.stackexchange.com/questions/97306/rasterizing-polyline-data-with-qgis-gdal-custom-line-width
+@metrics.timed_stage('profile')
 def profile(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, height1=0, height2=0, above_ground1=True,
-            above_ground2=True, definition=512):
+            above_ground2=True, definition=512, interpolation=geods.NEAREST, frequency=None,
+            fresnel_clearance=FRESNEL_CLEARANCE):
     """
     Generates a profile with the given parameters and elevation data source.
 
@@ -58,23 +156,311 @@ def profile(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, heigh
                           defaults to True
     :param above_ground2: is sight height fir the ending point above the ground (True) or above the sea (False),
                           defaults to True
-    :param definition: the number of points to sample including the starting point and the ending point
+    :param definition: the number of points to sample including the starting point and the ending point, EXACT to
+                       get one point per crossed DEM pixel, located where the segment enters it, or AUTO to choose it
+                       from the length of the segment (see auto_definition)
+    :param interpolation: the elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST, it is
+                          ignored in EXACT mode where elevations are the ones of the crossed pixels
+    :param frequency: the frequency of the radio link in Hz, to compute its first Fresnel zone, defaults to None (no
+                      Fresnel zone)
+    :param fresnel_clearance: the percentage of the first Fresnel zone radius that must be clear, defaults to
+                              FRESNEL_CLEARANCE
     :return: the profile data composed of numpy arrays for latitudes, longitudes, sights, elevations, distances and
-             overheads (correction of the rounded earth profile)
+             overheads (correction of the rounded earth profile), plus fresnel_radii and fresnel_clearances (margins
+             between the ground and the required clearance, negative when obstructed) if frequency is given
     """
+    if definition == AUTO:
+        definition = auto_definition(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+
     profile_data = {}
-    profile_data['latitudes'] = latitudes = np.linspace(wgs84_lat1, wgs84_lat2, definition)
-    profile_data['longitudes'] = longitudes = np.linspace(wgs84_long1, wgs84_long2, definition)
-    profile_data['elevations'] = geods.read_ds_value_from_wgs84(data_source, latitudes, longitudes)
+    if definition == EXACT:
+        positions = geods.grid_crossings(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+        # the elevation of a crossed pixel is read in the middle of the part of the segment inside it
+        middles = (positions + np.append(positions[1:], 1)) / 2
+        profile_data['latitudes'] = latitudes = wgs84_lat1 + positions * (wgs84_lat2 - wgs84_lat1)
+        profile_data['longitudes'] = longitudes = wgs84_long1 + positions * (wgs84_long2 - wgs84_long1)
+        middle_latitudes = wgs84_lat1 + middles * (wgs84_lat2 - wgs84_lat1)
+        middle_longitudes = wgs84_long1 + middles * (wgs84_long2 - wgs84_long1)
+        profile_data['elevations'] = geods.read_ds_value_from_wgs84(data_source, middle_latitudes, middle_longitudes)
+    else:
+        positions = np.linspace(0, 1, definition)
+        profile_data['latitudes'] = latitudes = np.linspace(wgs84_lat1, wgs84_lat2, definition)
+        profile_data['longitudes'] = longitudes = np.linspace(wgs84_long1, wgs84_long2, definition)
+        profile_data['elevations'] = geods.read_ds_value_from_wgs84(data_source, latitudes, longitudes, interpolation)
     start_sight = float(height1)
     if above_ground1:
         start_sight += float(profile_data['elevations'][0])
     end_sight = float(height2)
     if above_ground2:
         end_sight += float(profile_data['elevations'][-1])
-    profile_data['sights'] = np.linspace(start_sight, end_sight, definition)
-    profile_data['distances'] = geometry.distance_between_wgs84_coordinates(wgs84_lat1, wgs84_long1, latitudes,
-                                                                            longitudes)
-    profile_data['overheads'] = compute_curved_earth_correction(wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2,
-                                                                latitudes, longitudes)
+    profile_data['distances'], profile_data['overheads'], profile_data['sights'], total_distance = compute_geometry(
+        wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, latitudes, longitudes, positions, start_sight, end_sight)
+    if frequency is not None:
+        profile_data['fresnel_radii'] = geometry.fresnel_radius(profile_data['distances'], total_distance,
+                                                                float(frequency))
+        profile_data['fresnel_clearances'] = compute_clearances(profile_data['elevations'], profile_data['overheads'],
+                                                                profile_data['sights']) - \
+            profile_data['fresnel_radii'] * (float(fresnel_clearance) / 100)
     return profile_data
+
+
+@metrics.timed_stage('profile_many')
+def profile_many(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, height1=0, height2=0,
+                 above_ground1=True, above_ground2=True, definition=512, interpolation=geods.NEAREST, out=None):
+    """
+    Generates the profiles of many segments at once, as 2-D numpy arrays (one row per segment).
+
+    All the points are transformed in a single call and their elevations are read in a single deduplicated gather,
+    the geometry is computed on the whole batch, so the cost per profile is much lower than with profile.
+
+    Parameters are the same as profile, except that the segment parameters (points, heights and above ground flags)
+    are arrays of the same length (or scalars, shared by all the segments).
+
+    :param data_source: the data_source to read elevation data from
+    :param wgs84_lat1: the latitudes of the starting points
+    :param wgs84_long1: the longitudes of the starting points
+    :param wgs84_lat2: the latitudes of the ending points
+    :param wgs84_long2: the longitudes of the ending points
+    :param height1: the sight heights for the starting points, defaults to 0
+    :param height2: the sight heights for the ending points, defaults to 0
+    :param above_ground1: are sight heights for the starting points above the ground (True) or above the sea (False),
+                          defaults to True
+    :param above_ground2: are sight heights for the ending points above the ground (True) or above the sea (False),
+                          defaults to True
+    :param definition: the number of points to sample including the starting point and the ending point, or AUTO to
+                       choose it from the length of the longest segment, EXACT is not supported
+    :param interpolation: the elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+    :param out: the profile data returned by a previous call, whose arrays are reused (overwritten) when the number of
+                segments and the definition are the same, defaults to None
+    :return: the profile data composed of 2-D numpy arrays of shape (number of segments, definition) for latitudes,
+             longitudes, sights, elevations, distances and overheads
+    """
+    if definition == EXACT:
+        raise Exception("EXACT definition is not supported for batches of profiles")
+
+    if definition == AUTO:
+        definition = auto_definition(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+
+    # segment parameters as columns, to broadcast along the rows of the profiles
+    lat1, long1, lat2, long2, height1, height2 = [
+        column[:, np.newaxis].astype(float)
+        for column in np.broadcast_arrays(*np.atleast_1d(wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, height1,
+                                                         height2))]
+    above_ground1 = np.asarray(above_ground1, dtype=bool)
+    above_ground2 = np.asarray(above_ground2, dtype=bool)
+
+    shape = (len(lat1), definition)
+    latitudes, longitudes = [
+        out[key] if out is not None and key in out and out[key].shape == shape else np.empty(shape)
+        for key in ('latitudes', 'longitudes')]
+
+    # same computation as numpy.linspace, row by row
+    steps = np.arange(definition, dtype=float)
+    profile_data = {}
+    profile_data['latitudes'] = np.multiply(steps, (lat2 - lat1) / (definition - 1), out=latitudes)
+    profile_data['longitudes'] = np.multiply(steps, (long2 - long1) / (definition - 1), out=longitudes)
+    latitudes += lat1
+    longitudes += long1
+    latitudes[:, -1] = lat2[:, 0]
+    longitudes[:, -1] = long2[:, 0]
+    profile_data['elevations'] = elevations = geods.read_ds_value_from_wgs84(data_source, latitudes, longitudes,
+                                                                             interpolation)
+    start_sights = height1 + np.where(above_ground1, elevations[:, 0], 0)[:, np.newaxis]
+    end_sights = height2 + np.where(above_ground2, elevations[:, -1], 0)[:, np.newaxis]
+    profile_data['distances'], profile_data['overheads'], profile_data['sights'], _ = compute_geometry(
+        lat1, long1, lat2, long2, latitudes, longitudes, np.linspace(0, 1, definition), start_sights, end_sights, out)
+    return profile_data
+
+
+# default number of points evaluated at once by line_of_sight
+LOS_CHUNK_SIZE = 64
+
+
+@metrics.timed_stage('line_of_sight')
+def line_of_sight(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, height1=0, height2=0,
+                  above_ground1=True, above_ground2=True, definition=512, interpolation=geods.NEAREST,
+                  chunk_size=LOS_CHUNK_SIZE, early_exit=True, frequency=None, fresnel_clearance=FRESNEL_CLEARANCE):
+    """
+    Checks if there is a line of sight between two points and finds the worst obstruction (or the minimum clearance).
+
+    Points are evaluated by chunks, starting from the middle of the segment where the curvature of the earth is the
+    highest, and the evaluation stops at the first chunk having an obstruction when early_exit is True.
+    In that case, the clearance and location returned are the ones of the worst point among the evaluated ones.
+    Points without elevation data (holes of the DEM) are ignored.
+
+    :param data_source: the data_source to read elevation data from
+    :param wgs84_lat1: the latitude of the starting point
+    :param wgs84_long1: the longitude of the starting point
+    :param wgs84_lat2: the latitude of the ending point
+    :param wgs84_long2: the longitude of the ending point
+    :param height1: the sight height for the starting point, defaults to 0
+    :param height2: the sight height for the ending point, defaults to 0
+    :param above_ground1: is sight height for the starting point above the ground (True) or above the sea (False),
+                          defaults to True
+    :param above_ground2: is sight height for the ending point above the ground (True) or above the sea (False),
+                          defaults to True
+    :param definition: the number of points to sample including the starting point and the ending point, EXACT or
+                       AUTO
+    :param interpolation: the elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+    :param chunk_size: the number of points evaluated at once, defaults to LOS_CHUNK_SIZE, None for a single chunk
+    :param early_exit: stop at the first chunk having an obstruction, defaults to True
+    :param frequency: the frequency of the radio link in Hz, when given the clearances are computed against the
+                      required part of the first Fresnel zone instead of the line of sight, defaults to None
+    :param fresnel_clearance: the percentage of the first Fresnel zone radius that must be clear, defaults to
+                              FRESNEL_CLEARANCE
+    :return: a dict with the 'visible' verdict, the minimum 'clearance' (negative if the line of sight is obstructed)
+             and the 'latitude', 'longitude' and 'distance' (from the starting point) of the worst point
+    """
+    if definition == AUTO:
+        definition = auto_definition(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+
+    if definition == EXACT:
+        positions = geods.grid_crossings(data_source, wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2)
+        sample_positions = (positions + np.append(positions[1:], 1)) / 2
+        interpolation = geods.NEAREST
+    else:
+        positions = sample_positions = np.linspace(0, 1, definition)
+
+    end_elevations = geods.read_ds_value_from_wgs84(data_source, np.array([wgs84_lat1, wgs84_lat2]),
+                                                    np.array([wgs84_long1, wgs84_long2]), interpolation)
+    start_sight = float(height1)
+    if above_ground1:
+        start_sight += float(end_elevations[0])
+    end_sight = float(height2)
+    if above_ground2:
+        end_sight += float(end_elevations[-1])
+    if np.isnan(start_sight) or np.isnan(end_sight):
+        raise geods.OutOfExtentError("No elevation data at the end points of the line of sight")
+
+    # the end points are not evaluated, the middle ones first
+    indexes = np.arange(1, len(positions) - 1)
+    indexes = indexes[np.argsort(np.abs(positions[indexes] - 0.5), kind='mergesort')]
+    chunk_size = chunk_size or max(len(indexes), 1)
+
+    worst_clearance = np.inf
+    worst_position = 0.5
+    for start in range(0, len(indexes), chunk_size):
+        chunk = indexes[start:start + chunk_size]
+        latitudes = wgs84_lat1 + positions[chunk] * (wgs84_lat2 - wgs84_lat1)
+        longitudes = wgs84_long1 + positions[chunk] * (wgs84_long2 - wgs84_long1)
+        elevations = geods.read_ds_value_from_wgs84(data_source,
+                                                    wgs84_lat1 + sample_positions[chunk] * (wgs84_lat2 - wgs84_lat1),
+                                                    wgs84_long1 + sample_positions[chunk] * (wgs84_long2 - wgs84_long1),
+                                                    interpolation)
+        distances, overheads, sights, total_distance = compute_geometry(
+            wgs84_lat1, wgs84_long1, wgs84_lat2, wgs84_long2, latitudes, longitudes, positions[chunk], start_sight,
+            end_sight)
+        clearances = compute_clearances(elevations, overheads, sights)
+        if frequency is not None:
+            clearances -= geometry.fresnel_radius(distances, total_distance, float(frequency)) * \
+                (float(fresnel_clearance) / 100)
+
+        # points without elevation data (NaN) can't be obstructions
+        clearances[np.isnan(clearances)] = np.inf
+        worst = np.argmin(clearances)
+        if clearances[worst] < worst_clearance:
+            worst_clearance = float(clearances[worst])
+            worst_position = positions[chunk[worst]]
+
+        if early_exit and worst_clearance < 0:
+            break
+
+    worst_latitude = wgs84_lat1 + worst_position * (wgs84_lat2 - wgs84_lat1)
+    worst_longitude = wgs84_long1 + worst_position * (wgs84_long2 - wgs84_long1)
+    return {
+        'visible': bool(worst_clearance >= 0),
+        'clearance': worst_clearance if np.isfinite(worst_clearance) else None,
+        'latitude': float(worst_latitude),
+        'longitude': float(worst_longitude),
+        'distance': float(geometry.distance_between_wgs84_coordinates(wgs84_lat1, wgs84_long1, worst_latitude,
+                                                                      worst_longitude))
+    }
+
+
+# default number of targets evaluated at once by point_to_multipoint
+P2MP_BATCH_SIZE = 256
+
+
+@metrics.timed_stage('point_to_multipoint')
+def point_to_multipoint(data_source, wgs84_lat, wgs84_long, target_lats, target_longs, height1=0, height2=0,
+                        above_ground1=True, above_ground2=True, definition=512, interpolation=geods.NEAREST,
+                        frequency=None, fresnel_clearance=FRESNEL_CLEARANCE, batch_size=P2MP_BATCH_SIZE):
+    """
+    Checks the line of sight between one origin and many targets.
+
+    The origin elevation and sight are computed once, the targets are ordered by azimuth from the origin so that the
+    profiles of a batch are close to each other and share most of their DEM reads, each batch being computed at once
+    with profile_many.
+
+    :param data_source: the data_source to read elevation data from
+    :param wgs84_lat: the latitude of the origin
+    :param wgs84_long: the longitude of the origin
+    :param target_lats: the latitudes of the targets
+    :param target_longs: the longitudes of the targets
+    :param height1: the sight height for the origin, defaults to 0
+    :param height2: the sight heights for the targets, a scalar or an array, defaults to 0
+    :param above_ground1: is sight height for the origin above the ground (True) or above the sea (False),
+                          defaults to True
+    :param above_ground2: are sight heights for the targets above the ground (True) or above the sea (False),
+                          defaults to True
+    :param definition: the number of points to sample in each profile, or AUTO (chosen per batch of targets), EXACT is
+                       not supported
+    :param interpolation: the elevation interpolation, one of geods.INTERPOLATIONS, defaults to geods.NEAREST
+    :param frequency: the frequency of the radio links in Hz, when given the clearances are computed against the
+                      required part of the first Fresnel zone, defaults to None
+    :param fresnel_clearance: the percentage of the first Fresnel zone radius that must be clear, defaults to
+                              FRESNEL_CLEARANCE
+    :param batch_size: the number of targets evaluated at once, defaults to P2MP_BATCH_SIZE
+    :return: a dict of numpy arrays, in the order of the targets: 'visible' verdicts, minimum 'clearances', 'distances'
+             from the origin, 'azimuths' (in degrees, clockwise from the north) and 'obstruction_distances' (distance
+             of the worst point from the origin), targets without elevation data are not visible with NaN clearances
+             and obstruction distances
+    """
+    target_lats, target_longs, height2, above_ground2 = np.broadcast_arrays(
+        *np.atleast_1d(target_lats, target_longs, height2, np.asarray(above_ground2, dtype=bool)))
+    target_lats = target_lats.astype(float)
+    target_longs = target_longs.astype(float)
+
+    start_sight = float(height1)
+    if above_ground1:
+        start_sight += float(geods.read_ds_value_from_wgs84(data_source, wgs84_lat, wgs84_long, interpolation))
+    if np.isnan(start_sight):
+        raise geods.OutOfExtentError("No elevation data at the origin")
+
+    azimuths = np.rad2deg(geometry.initial_bearing(np.deg2rad(wgs84_lat), np.deg2rad(wgs84_long),
+                                                   np.deg2rad(target_lats), np.deg2rad(target_longs))) % 360
+    result = {
+        'visible': np.zeros(target_lats.shape, dtype=bool),
+        'clearances': np.zeros(target_lats.shape),
+        'distances': np.zeros(target_lats.shape),
+        'azimuths': azimuths,
+        'obstruction_distances': np.zeros(target_lats.shape)
+    }
+    order = np.argsort(azimuths, kind='mergesort')
+    profiles = None
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        # the arrays of the previous batch are reused
+        profiles = profile_many(data_source, wgs84_lat, wgs84_long, target_lats[batch], target_longs[batch],
+                                height1=start_sight, height2=height2[batch], above_ground1=False,
+                                above_ground2=above_ground2[batch], definition=definition,
+                                interpolation=interpolation, out=profiles)
+        distances = profiles['distances']
+        # the end points are not evaluated
+        clearances = compute_clearances(profiles['elevations'], profiles['overheads'], profiles['sights'])[:, 1:-1]
+        if frequency is not None:
+            clearances -= geometry.fresnel_radius(distances[:, 1:-1], distances[:, -1:], float(frequency)) * \
+                (float(fresnel_clearance) / 100)
+
+        # points without elevation data (NaN) can't be obstructions
+        clearances[np.isnan(clearances)] = np.inf
+        worst = np.argmin(clearances, axis=1)
+        rows = np.arange(len(batch))
+        # targets without elevation data have no verdict
+        unknown = np.isnan(profiles['sights'][:, -1])
+        result['clearances'][batch] = np.where(unknown, np.nan, clearances[rows, worst])
+        result['visible'][batch] = ~unknown & (clearances[rows, worst] >= 0)
+        result['distances'][batch] = distances[:, -1]
+        result['obstruction_distances'][batch] = np.where(unknown, np.nan, distances[rows, worst + 1])
+
+    return result
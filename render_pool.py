@@ -0,0 +1,152 @@
+"""
+Pool of worker processes rendering the PNG profiles, so that the CPU-bound matplotlib rendering of the web server is
+spread over several cores instead of being serialized by the GIL of the server threads.
+
+Each worker imports matplotlib and renders a small profile when it starts, so that the font cache and the backend are
+ready for the first request. Profiles are sent to the workers as raw float32 buffers instead of pickled arrays.
+"""
+
+from io import BytesIO
+import logging
+import multiprocessing
+import os
+import signal
+
+import numpy as np
+
+import metrics
+import plot_style
+from profile_format import ProfileFormat
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+# maximum number of seconds to wait for a rendering
+RENDER_TIMEOUT = 60
+# names of the plot_style functions the workers can render
+STYLES = ('corrected_elevation', 'curved_sight', 'detailed_plot')
+
+
+def pack_profile(profile_data):
+    """
+    Convert the arrays of a profile to compact float32 buffers, precise enough to be plotted.
+
+    :param profile_data: the profile data, a dict of numpy arrays
+    :return: the dict of (shape, buffer) couples
+    """
+    return dict((key, (np.shape(values), np.asarray(values, dtype=np.float32).tostring()))
+                for key, values in profile_data.items())
+
+
+def unpack_profile(packed_data):
+    """
+    Convert the buffers of a packed profile back to arrays.
+
+    :param packed_data: the profile data packed by pack_profile
+    :return: the profile data, a dict of numpy float32 arrays
+    """
+    return dict((key, np.frombuffer(buf, dtype=np.float32).reshape(shape))
+                for key, (shape, buf) in packed_data.items())
+
+
+def render(style_name, profile_data):
+    """
+    Render a profile to PNG.
+
+    :param style_name: the name of the plot_style function drawing the profile, ex: 'corrected_elevation'
+    :param profile_data: the profile data
+    :return: the PNG image as a string
+    """
+    buf = BytesIO()
+    getattr(plot_style, style_name)(profile_data, buf)
+    return buf.getvalue()
+
+
+def render_packed(style_name, packed_data):
+    """
+    Render a packed profile to PNG, in a worker process.
+
+    :param style_name: the name of the plot_style function drawing the profile
+    :param packed_data: the profile data packed by pack_profile
+    :return: the PNG image as a string
+    """
+    return render(style_name, unpack_profile(packed_data))
+
+
+def init_worker():
+    """
+    Initialize a worker process: interruptions are left to the server process and matplotlib is warmed up.
+
+    :return: None
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    distances = np.linspace(0, 10000, 16)
+    render('corrected_elevation', {
+        'distances': distances,
+        'elevations': 100 + 10 * np.sin(distances / 1000),
+        'overheads': np.zeros_like(distances),
+        'sights': np.linspace(120, 110, 16),
+        'latitudes': np.linspace(43.5, 43.6, 16),
+        'longitudes': np.linspace(1.5, 1.6, 16)
+    })
+
+
+class RenderPool(object):
+    """
+    Pool of processes rendering PNG profiles.
+    """
+
+    def __init__(self, processes=None):
+        """
+        :param processes: the number of worker processes, defaults to None (the number of cores)
+        """
+        self.pool = multiprocessing.Pool(processes, initializer=init_worker)
+        LOGGER.info("started %d rendering processes", processes or multiprocessing.cpu_count())
+
+    def render(self, style_name, profile_data, timeout=RENDER_TIMEOUT):
+        """
+        Render a profile to PNG in a worker process, waiting for the result.
+
+        :param style_name: the name of the plot_style function drawing the profile
+        :param profile_data: the profile data
+        :param timeout: the maximum number of seconds to wait for the rendering
+        :return: the PNG image as a string
+        """
+        return self.pool.apply_async(render_packed, (style_name, pack_profile(profile_data))).get(timeout)
+
+    def close(self):
+        """
+        Stop the worker processes.
+
+        :return: None
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+
+class PooledPNGProfileFormat(ProfileFormat):
+    """
+    Profile format that plots a graph in a PNG output, rendered by a RenderPool.
+    """
+
+    def __init__(self, render_pool, style_name='corrected_elevation'):
+        """
+        :param render_pool: the RenderPool rendering the images
+        :param style_name: the name of the plot_style function drawing the profile, one of STYLES, defaults to
+                           'corrected_elevation'
+        """
+        if style_name not in STYLES:
+            raise Exception("Unknown plot style: %s, must be one of: %s" % (style_name, ', '.join(STYLES)))
+
+        self.render_pool = render_pool
+        self.style_name = style_name
+
+    @metrics.timed_stage('png')
+    def get_data(self, profile_data):
+        return self.render_pool.render(self.style_name, profile_data)
+
+    def write_to_fd(self, profile_data, fd):
+        fd.write(self.get_data(profile_data))
+
+    def write_to_filename(self, profile_data, filename):
+        with open(filename, 'wb') as fd:  # pylint: disable=invalid-name
+            self.write_to_fd(profile_data, fd)
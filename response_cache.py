@@ -0,0 +1,119 @@
+"""
+Cache of the web server responses, so that repeated requests (the front-end polling the same links) are not computed
+and rendered again.
+
+Requests are identified by their normalized parameters: coordinates are quantized to a fixed number of decimals, so
+that requests for nearly the same points share the same response. Every response carries an ETag computed from its
+body, to answer conditional requests (If-None-Match) with 304 Not Modified.
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import threading
+import time
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 300
+# 5 decimals of degree are about 1 meter
+DEFAULT_PRECISION = 5
+
+CachedResponse = collections.namedtuple('CachedResponse', ['etag', 'content_type', 'body', 'expires'])
+
+
+def quantize(value, precision=DEFAULT_PRECISION):
+    """
+    Round a coordinate to the given number of decimals.
+
+    :param value: the coordinate, a number or a string
+    :param precision: the number of decimals to keep
+    :return: the rounded coordinate
+    """
+    return round(float(value), precision)
+
+
+def make_key(*params, **named_params):
+    """
+    Build a cache key from request parameters, parameters that are None are ignored.
+
+    :param params: the positional parameters, ex: the endpoint and the quantized coordinates
+    :param named_params: the named parameters, ex: the offsets and the profile options
+    :return: the key
+    """
+    return params + tuple(sorted((name, value) for name, value in named_params.items() if value is not None))
+
+
+def compute_etag(body):
+    """
+    Compute the ETag of a response body.
+
+    :param body: the body as a string
+    :return: the quoted ETag
+    """
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache(object):
+    """
+    Thread safe LRU cache of responses, bounded by a number of entries, entries expiring after a time to live.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, clock=time.time):
+        """
+        :param max_entries: the maximum number of cached responses
+        :param ttl: the time to live of a response in seconds
+        :param clock: the function returning the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a cached response.
+
+        :param key: the key of the request (see make_key)
+        :return: the CachedResponse or None if it is not cached or has expired
+        """
+        with self._lock:
+            response = self._entries.pop(key, None)
+            if response is None or response.expires <= self.clock():
+                self.misses += 1
+                return None
+
+            # re-inserted as the most recently used
+            self._entries[key] = response
+            self.hits += 1
+            return response
+
+    def put(self, key, content_type, body):
+        """
+        Cache a response, evicting the least recently used one if the cache is full.
+
+        :param key: the key of the request (see make_key)
+        :param content_type: the content type of the response
+        :param body: the body of the response as a string
+        :return: the CachedResponse
+        """
+        response = CachedResponse(compute_etag(body), content_type, body, self.clock() + self.ttl)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = response
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return response
+
+    def stats(self):
+        """
+        :return: the cache statistics as a dict: hits, misses and entries
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,79 @@
+"""
+    Tests for the dataset_pool module
+"""
+
+import threading
+
+import pytest
+
+import dataset_pool
+
+
+def test_checkout_reuses_handles():
+    opened = []
+
+    def opener():
+        opened.append(object())
+        return opened[-1]
+
+    pool = dataset_pool.DatasetPool(opener, size=2)
+    with pool.checkout() as first:
+        with pool.checkout() as second:
+            assert first is not second
+    with pool.checkout() as third:
+        assert third is first or third is second
+
+    assert len(opened) == 2
+
+
+def test_broken_handle_is_reopened():
+    opened = []
+
+    def opener():
+        opened.append(object())
+        return opened[-1]
+
+    pool = dataset_pool.DatasetPool(opener, size=1)
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as data_source:
+            raise RuntimeError("read error")
+
+    with pool.checkout() as reopened:
+        assert reopened is not data_source
+
+    assert len(opened) == 2
+
+
+def test_request_error_keeps_handle():
+    pool = dataset_pool.DatasetPool(object, size=1)
+    with pytest.raises(ValueError):
+        with pool.checkout() as data_source:
+            raise ValueError("out of the DEM")
+
+    with pool.checkout() as kept:
+        assert kept is data_source
+
+
+def test_concurrent_checkouts():
+    pool = dataset_pool.DatasetPool(object, size=3)
+    in_use = set()
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        for _ in range(100):
+            with pool.checkout() as data_source:
+                with lock:
+                    if id(data_source) in in_use:
+                        errors.append(data_source)
+                    in_use.add(id(data_source))
+                with lock:
+                    in_use.discard(id(data_source))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
@@ -0,0 +1,55 @@
+"""
+    Tests for the dem_catalog module
+"""
+
+import os
+
+import numpy as np
+import gdal
+import ConfigParser
+import pytest
+
+import dem_catalog
+import geods
+import hgt
+
+CONFIG = ConfigParser.ConfigParser()
+CONFIG.read('pytest.ini')
+DS_FILENAME = CONFIG.get('dem', 'location')
+DS_DIRECTORY = os.path.dirname(DS_FILENAME)
+EPSILON = 0.001
+
+
+def test_hgt_extent():
+    half_pixel = 0.5 / 1200
+    actual = dem_catalog.hgt_extent(DS_FILENAME)
+
+    assert abs(43 - half_pixel - actual[0]) <= EPSILON
+    assert abs(1 - half_pixel - actual[1]) <= EPSILON
+    assert abs(44 + half_pixel - actual[2]) <= EPSILON
+    assert abs(2 + half_pixel - actual[3]) <= EPSILON
+
+
+def test_catalog_read_value_from_wgs84():
+    gdal.AllRegister()
+    catalog = dem_catalog.open_dem(DS_DIRECTORY)
+    actual = catalog.read_value_from_wgs84(np.array([43.602091]), np.array([1.441183]))
+
+    assert len(catalog.tiles) == 1
+    assert abs(151.0 - actual[0]) <= EPSILON
+    # like a single dataset, coordinates out of the DEM are an error
+    with pytest.raises(geods.OutOfExtentError):
+        catalog.read_value_from_wgs84(np.array([43.602091, 45.5]), np.array([1.441183, 1.5]))
+
+
+def test_catalog_interpolation_across_tiles(tmpdir):
+    # 2 adjacent tiles of 11x11 nodes sharing their border, the elevation being 1000 times the longitude
+    for west in (1, 2):
+        longs = west + np.arange(11) / 10.
+        np.tile(np.round(longs * 1000), (11, 1)).astype(hgt.HGT_DTYPE).tofile(str(tmpdir.join('N43E00%d.hgt' % west)))
+    catalog = dem_catalog.open_dem(str(tmpdir))
+
+    # the point is in the first tile, its interpolation neighbours on the right are in the second one
+    for interpolation in (geods.BILINEAR, geods.BICUBIC):
+        actual = catalog.read_value_from_wgs84(np.array([43.5, 43.5]), np.array([2.03, 1.57]), interpolation)
+        assert np.allclose(actual, [2030, 1570])
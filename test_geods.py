@@ -6,8 +6,10 @@ import numpy as np
 import gdal
 from gdalconst import GA_ReadOnly
 import ConfigParser
+import pytest
 
 import geods
+import hgt
 
 CONFIG = ConfigParser.ConfigParser()
 CONFIG.read('pytest.ini')
@@ -100,6 +102,15 @@ def test_read_ds_data_np():
         assert abs(exp - act) <= EPSILON
 
 
+def test_read_ds_data_out_of_extent():
+    data_source = hgt.HGTDataSource(DS_FILENAME)
+
+    # scalar and array reads fail the same way
+    for offset_x, offset_y in ((-1, 477), (529, 1201), (np.array([529, -1]), np.array([477, 477]))):
+        with pytest.raises(geods.OutOfExtentError):
+            geods.read_ds_data(data_source, offset_x, offset_y)
+
+
 def test_read_ds_value_from_wgs84():
     expected = 151.0
     gdal.AllRegister()
@@ -107,3 +118,60 @@ def test_read_ds_value_from_wgs84():
     actual = geods.read_ds_value_from_wgs84(data_source, 43.602091, 1.441183)
 
     assert abs(expected - actual) <= EPSILON
+
+
+def test_read_band_window_data_strips():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    band = data_source.GetRasterBand(1)
+    offset_x = np.linspace(300, 400, 10, dtype=int)
+    offset_y = np.linspace(400, 300, 10, dtype=int)
+    expected = geods.read_band_window_data(band, offset_x, offset_y)
+    actual = geods.read_band_window_data(band, offset_x, offset_y, max_window_pixels=1000)
+
+    for exp, act in zip(expected, actual):
+        assert exp == act
+
+
+def test_transform_from_wgs84_identity():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    transformer = geods.get_wgs84_transformer(data_source.GetProjectionRef())
+    actual = geods.transform_from_wgs84(data_source.GetProjectionRef(), 43.602091, 1.441183)
+
+    assert transformer.is_identity
+    assert transformer is geods.get_wgs84_transformer(data_source.GetProjectionRef())
+    assert abs(1.441183 - actual[0]) <= EPSILON
+    assert abs(43.602091 - actual[1]) <= EPSILON
+
+
+def test_read_ds_value_from_wgs84_hgt():
+    expected = 151.0
+    data_source = hgt.HGTDataSource(DS_FILENAME)
+    actual = geods.read_ds_value_from_wgs84(data_source, 43.602091, 1.441183)
+
+    assert abs(expected - actual) <= EPSILON
+
+
+def test_read_ds_value_from_wgs84_interpolated():
+    data_source = hgt.HGTDataSource(DS_FILENAME)
+    # center of the pixel (529, 477)
+    center_lat, center_long = 44 - 477 / 1200., 1 + 529 / 1200.
+    # corner shared by the pixels (529, 477), (530, 477), (529, 478) and (530, 478)
+    corner_lat, corner_long = 44 - 477.5 / 1200., 1 + 529.5 / 1200.
+
+    for interpolation in geods.INTERPOLATIONS:
+        actual = geods.read_ds_value_from_wgs84(data_source, center_lat, center_long, interpolation)
+        assert abs(151.0 - actual) <= EPSILON
+
+    actual = geods.read_ds_value_from_wgs84(data_source, corner_lat, corner_long, geods.BILINEAR)
+    assert abs(155.25 - actual) <= EPSILON
+
+
+def test_mask_no_data():
+    actual = geods.mask_no_data(np.array([[12, -32768], [7, 3]], dtype=np.int16), -32768.)
+
+    assert actual.dtype.kind == 'f'
+    assert np.isnan(actual[0, 1])
+    assert np.array_equal(actual[~np.isnan(actual)], [12, 7, 3])
+    assert geods.mask_no_data(np.array([1, 2]), None).dtype.kind == 'i'
@@ -2,6 +2,8 @@
     Tests for the geometry module
 """
 
+import numpy as np
+
 import geometry
 
 EPSILON = 0.001
@@ -37,3 +39,35 @@ def test_overhead_height():
     expected = 2.731679321737121
     actual = geometry.overhead_height(0.00092629, geometry.EARTH_RADIUS)
     assert abs(expected - actual) <= EPSILON
+
+
+def test_fresnel_radius():
+    # 10 km link at 5.8 GHz, in the middle
+    expected = 11.3675
+    actual = geometry.fresnel_radius(5000., 10000., 5.8e9)
+    assert abs(expected - actual) <= EPSILON
+
+
+def test_initial_bearing():
+    # due east on the equator, then due north
+    assert abs(geometry.initial_bearing(0, 0, 0, 0.01) - 1.5707963) <= EPSILON_L
+    assert abs(geometry.initial_bearing(0.76, 0.02, 0.77, 0.02)) <= EPSILON_L
+
+
+def test_distances_and_overheads():
+    rad_lat1, rad_long1 = 0.76029552909832, 0.0252164472196439
+    rad_lat2, rad_long2 = 0.76220881138424, 0.0213910869250003
+    rad_latitudes = np.linspace(rad_lat1, rad_lat2, 5)
+    rad_longitudes = np.linspace(rad_long1, rad_long2, 5)
+    terms = geometry.segment_terms(rad_lat1, rad_long1, rad_lat2, rad_long2)
+    distances = np.empty(5)
+    overheads = np.empty(5)
+    actual = geometry.distances_and_overheads(terms, rad_latitudes, rad_longitudes, distances, overheads)
+
+    angles = geometry.central_angle(rad_lat1, rad_long1, rad_latitudes, rad_longitudes)
+    expected_overheads = geometry.overhead_height(terms.half_angle, geometry.EARTH_RADIUS) - \
+        geometry.overhead_height(terms.half_angle - angles, geometry.EARTH_RADIUS)
+    assert actual[0] is distances and actual[1] is overheads
+    assert np.allclose(distances, geometry.EARTH_RADIUS * angles, rtol=0, atol=EPSILON)
+    assert np.allclose(overheads, expected_overheads, rtol=0, atol=EPSILON)
+    assert abs(overheads[0]) <= EPSILON and abs(overheads[-1]) <= EPSILON
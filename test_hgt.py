@@ -0,0 +1,54 @@
+"""
+    Tests for the hgt module
+"""
+
+import ConfigParser
+
+import numpy as np
+import pytest
+
+import hgt
+
+CONFIG = ConfigParser.ConfigParser()
+CONFIG.read('pytest.ini')
+DS_FILENAME = CONFIG.get('dem', 'location')
+EPSILON = 0.001
+
+
+def test_hgt_origin():
+    assert hgt.hgt_origin('N43E001.hgt') == (43, 1)
+    assert hgt.hgt_origin('/path/to/s12w077.HGT') == (-12, -77)
+
+
+def test_hgt_geo_transform():
+    expected = (1 - 0.5 / 1200, 1. / 1200, 0, 44 + 0.5 / 1200, 0, -1. / 1200)
+    actual = hgt.hgt_geo_transform(DS_FILENAME)
+
+    for exp, act in zip(expected, actual):
+        assert abs(exp - act) <= EPSILON
+
+
+def test_read_as_array():
+    data_source = hgt.HGTDataSource(DS_FILENAME)
+    band = data_source.GetRasterBand(1)
+
+    assert data_source.RasterXSize == data_source.RasterYSize == 1201
+    assert band.ReadAsArray(529, 477, 1, 1)[0, 0] == 151
+
+
+def test_read_as_array_np():
+    expected = np.array([195, 182, 176, 177, 175, 160, 136, 130, 109, 113])
+    band = hgt.HGTDataSource(DS_FILENAME).GetRasterBand(1)
+    window = band.ReadAsArray(300, 300, 101, 101)
+    actual = window[np.linspace(400, 300, 10, dtype=int) - 300, np.linspace(300, 400, 10, dtype=int) - 300]
+
+    assert np.array_equal(expected, actual)
+
+
+def test_read_as_array_out_of_range():
+    band = hgt.HGTDataSource(DS_FILENAME).GetRasterBand(1)
+
+    assert band.ReadAsArray(1200, 1200, 1, 1).shape == (1, 1)
+    for window in ((-1, 0, 1, 1), (0, -1, 1, 1), (1200, 0, 2, 1), (0, 1150, 10, 100)):
+        with pytest.raises(RuntimeError):
+            band.ReadAsArray(*window)
@@ -0,0 +1,87 @@
+"""
+    Tests for the metrics module
+"""
+
+import metrics
+
+
+def test_counter():
+    counter = metrics.Counter('requests_total', "Requests")
+    counter.inc(endpoint='json')
+    counter.inc(2, endpoint='json')
+    counter.inc(endpoint='png')
+
+    assert counter.samples() == [('requests_total', (('endpoint', 'json'),), 3.),
+                                 ('requests_total', (('endpoint', 'png'),), 1.)]
+
+
+def test_histogram():
+    histogram = metrics.Histogram('seconds', "Durations", buckets=(0.1, 1.))
+    for value in (0.05, 0.1, 0.5, 2.):
+        histogram.observe(value, stage='read')
+
+    assert histogram.samples() == [
+        ('seconds_bucket', (('stage', 'read'), ('le', '0.1')), 2),
+        ('seconds_bucket', (('stage', 'read'), ('le', '1.0')), 3),
+        ('seconds_bucket', (('stage', 'read'), ('le', '+Inf')), 4),
+        ('seconds_sum', (('stage', 'read'),), 2.65),
+        ('seconds_count', (('stage', 'read'),), 4)
+    ]
+
+
+def test_expose():
+    registry = metrics.Registry('test')
+    registry.counter('requests_total', "Requests").inc(endpoint='json')
+    registry.histogram('seconds', "Durations", buckets=(1.,)).observe(0.5)
+    registry.register_collector('cache', lambda: {'hits': 3, 'misses': 1, 'entries': 2})
+
+    assert registry.expose().splitlines() == [
+        '# HELP test_requests_total Requests',
+        '# TYPE test_requests_total counter',
+        'test_requests_total{endpoint="json"} 1.0',
+        '# HELP test_seconds Durations',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{le="1.0"} 1.0',
+        'test_seconds_bucket{le="+Inf"} 1.0',
+        'test_seconds_sum 0.5',
+        'test_seconds_count 1.0',
+        '# TYPE test_cache_entries gauge',
+        'test_cache_entries 2.0',
+        '# TYPE test_cache_hit_ratio gauge',
+        'test_cache_hit_ratio 0.75',
+        '# TYPE test_cache_hits_total counter',
+        'test_cache_hits_total 3.0',
+        '# TYPE test_cache_misses_total counter',
+        'test_cache_misses_total 1.0'
+    ]
+    assert registry.counter('requests_total', "Requests") is registry.counter('requests_total', "Requests")
+
+
+def test_timed():
+    histogram = metrics.Histogram('seconds', "Durations")
+
+    with metrics.timed('block', histogram):
+        pass
+
+    @metrics.timed_stage('function', histogram)
+    def function():
+        raise ValueError()
+
+    try:
+        function()
+    except ValueError:
+        pass
+
+    @metrics.timed_iterator('iterator', histogram)
+    def iterator():
+        for value in range(3):
+            yield value
+
+    items = iterator()
+    assert next(items) == 0
+    assert ('seconds_count', (('stage', 'iterator'),), 1) not in histogram.samples()
+    assert list(items) == [1, 2]
+
+    samples = histogram.samples()
+    for stage in ('block', 'function', 'iterator'):
+        assert ('seconds_count', (('stage', stage),), 1) in samples
@@ -0,0 +1,42 @@
+"""
+    Tests for the plot_style module
+"""
+
+from io import BytesIO
+
+from matplotlib._pylab_helpers import Gcf
+import numpy as np
+
+import plot_style
+
+
+def test_renderer_reuse():
+    distances = np.linspace(0, 10000, 50)
+    profile_data = {'distances': distances, 'elevations': 200 + 20 * np.sin(distances / 1000),
+                    'overheads': distances * (10000 - distances) / (2 * 6371000), 'sights': np.linspace(230, 220, 50)}
+    first = BytesIO()
+    plot_style.corrected_elevation(profile_data, first)
+    renderer = plot_style.get_renderer('corrected_elevation', plot_style.CORRECTED_ELEVATION_FILLS)
+
+    profile_data['fresnel_radii'] = np.zeros(50)
+    plot_style.corrected_elevation(profile_data, BytesIO())
+    del profile_data['fresnel_radii']
+    second = BytesIO()
+    plot_style.corrected_elevation(profile_data, second)
+
+    assert plot_style.get_renderer('corrected_elevation', plot_style.CORRECTED_ELEVATION_FILLS) is renderer
+    assert first.getvalue() == second.getvalue()
+    # no figure is left in the pyplot global state
+    assert Gcf.get_num_fig_managers() == 0
+
+
+def test_detailed_plot_xunits():
+    distances = np.linspace(0, 10000, 50)
+    profile_data = {'distances': distances, 'elevations': 200 + 20 * np.sin(distances / 1000),
+                    'overheads': distances * (10000 - distances) / (2 * 6371000), 'sights': np.linspace(230, 220, 50)}
+    output = BytesIO()
+    plot_style.detailed_plot(profile_data, output)
+    renderer = plot_style.get_renderer('detailed_plot', plot_style.DETAILED_PLOT_FILLS)
+
+    assert renderer.axes.xaxis.get_units() == 1000.0
+    assert output.getvalue().startswith(b'\x89PNG')
@@ -0,0 +1,42 @@
+"""
+    Tests for the png_raster module
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+import png_raster
+
+
+def test_encode_png():
+    image = np.arange(2 * 3 * 4, dtype=np.uint8).reshape(2, 3, 4)
+    data = png_raster.encode_png(image)
+
+    assert data[:8] == '\x89PNG\r\n\x1a\n'
+    assert struct.unpack('>4sII', data[12:24]) == ('IHDR', 3, 2)
+    idat_length, = struct.unpack('>I', data[33:37])
+    scanlines = np.frombuffer(zlib.decompress(data[41:41 + idat_length]), dtype=np.uint8).reshape(2, 13)
+    assert np.array_equal(scanlines[:, 0], [0, 0])
+    assert np.array_equal(scanlines[:, 1:].reshape(2, 3, 4), image)
+
+
+def test_compute_ticks():
+    ticks, step = png_raster.compute_ticks(100, 300)
+    assert step == 25
+    assert np.allclose(ticks, np.arange(100, 301, 25))
+
+    assert png_raster.format_tick(2.5, 2.5) == '2.5'
+    assert png_raster.format_tick(200, 25) == '200'
+
+
+def test_render_corrected_elevation():
+    distances = np.linspace(0, 10000, 50)
+    profile_data = {'distances': distances, 'elevations': 150 + 20 * np.sin(distances / 1000),
+                    'overheads': np.zeros(50), 'sights': np.linspace(180, 185, 50)}
+    image = png_raster.render_corrected_elevation(profile_data, 400, 200)
+
+    assert image.shape == (200, 400, 4)
+    assert (image.reshape(-1, 4) == png_raster.TERRAIN).all(axis=1).any()
+    assert (image.reshape(-1, 4) == png_raster.SIGHT).all(axis=1).any()
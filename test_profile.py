@@ -6,6 +6,8 @@ import gdal
 from gdalconst import GA_ReadOnly
 import ConfigParser
 
+import numpy as np
+
 import profiler
 
 CONFIG = ConfigParser.ConfigParser()
@@ -44,3 +46,107 @@ def test_profile():
 
     for exp_d, act_d in zip(expected_sights, actual['sights']):
         assert abs(exp_d - act_d) <= EPSILON
+
+
+def test_profile_exact():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    # 36 pixels along x and 12 along y, every y pixel edge is crossed on a x pixel edge
+    actual = profiler.profile(data_source, 43.2, 1.2, 43.21, 1.23, definition=profiler.EXACT)
+
+    assert len(actual['distances']) == 37
+    assert abs(actual['elevations'][0] - 280.) <= EPSILON
+    assert all(actual['distances'][1:] > actual['distances'][:-1])
+
+
+def test_compute_curved_earth_correction():
+    latitudes = np.linspace(43.2, 43.8, 10)
+    longitudes = np.linspace(1.2, 1.8, 10)
+    expected_overheads = [0., 52.6953, 92.1818, 118.4743, 131.5879, 131.5375, 118.3384, 92.0056, 52.5544, 0.]
+
+    actual = profiler.compute_curved_earth_correction(43.2, 1.2, 43.8, 1.8, latitudes, longitudes)
+    _, overheads, _, _ = profiler.compute_geometry(43.2, 1.2, 43.8, 1.8, latitudes, longitudes,
+                                                   np.linspace(0, 1, 10), 0., 0.)
+
+    assert np.array_equal(actual, overheads)
+    assert np.allclose(actual, expected_overheads, atol=EPSILON)
+
+
+def test_parse_definition():
+    assert profiler.parse_definition('exact') == profiler.EXACT
+    assert profiler.parse_definition('auto') == profiler.AUTO
+    assert profiler.parse_definition('10') == 10
+
+
+def test_profile_auto():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    # 36 pixels along x and 12 along y: 37.95 pixels long
+    assert profiler.auto_definition(data_source, 43.2, 1.2, 43.21, 1.23) == 39
+    assert len(profiler.profile(data_source, 43.2, 1.2, 43.21, 1.23, definition=profiler.AUTO)['distances']) == 39
+    # bounded for short and long segments
+    assert profiler.auto_definition(data_source, 43.2, 1.2, 43.201, 1.2) == profiler.AUTO_MIN_DEFINITION
+    assert profiler.auto_definition(data_source, 43.2, 1.2, 43.8, 1.8, max_definition=500) == 500
+    # the longest segment of a batch gives the definition
+    actual = profiler.profile_many(data_source, 43.2, 1.2, [43.201, 43.21], [1.2, 1.23], definition=profiler.AUTO)
+    assert actual['distances'].shape == (2, 39)
+
+
+def test_profile_many():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    segments = [(43.2, 1.2, 43.8, 1.8, 5, True), (43.5, 1.1, 43.1, 1.9, 300, False)]
+    actual = profiler.profile_many(data_source, [43.2, 43.5], [1.2, 1.1], [43.8, 43.1], [1.8, 1.9], height1=[5, 300],
+                                   above_ground1=[True, False], definition=10)
+
+    for index, (lat1, long1, lat2, long2, height1, above_ground1) in enumerate(segments):
+        expected = profiler.profile(data_source, lat1, long1, lat2, long2, height1=height1,
+                                    above_ground1=above_ground1, definition=10)
+        for key in expected:
+            for exp_d, act_d in zip(expected[key], actual[key][index]):
+                assert abs(exp_d - act_d) <= EPSILON
+
+
+def test_line_of_sight():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    expected = profiler.profile(data_source, 43.2, 1.2, 43.8, 1.8, height1=10, height2=10)
+    clearances = profiler.compute_clearances(expected['elevations'], expected['overheads'], expected['sights'])[1:-1]
+    actual = profiler.line_of_sight(data_source, 43.2, 1.2, 43.8, 1.8, height1=10, height2=10, early_exit=False)
+
+    assert not actual['visible']
+    assert abs(clearances.min() - actual['clearance']) <= EPSILON
+    assert abs(expected['distances'][1:-1][clearances.argmin()] - actual['distance']) <= EPSILON
+
+    actual = profiler.line_of_sight(data_source, 43.2, 1.2, 43.8, 1.8, height1=10, height2=10)
+    assert not actual['visible']
+
+
+def test_profile_fresnel():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    actual = profiler.profile(data_source, 43.5, 1.5, 43.52, 1.53, height1=60, height2=60, definition=20,
+                              frequency=5.8e9)
+    clearances = profiler.compute_clearances(actual['elevations'], actual['overheads'], actual['sights'])
+
+    assert abs(actual['fresnel_radii'][0]) <= EPSILON
+    assert abs(actual['fresnel_radii'][-1]) <= EPSILON
+    assert all(actual['fresnel_radii'][1:-1] > 0)
+    for clearance, radius, fresnel_clearance in zip(clearances, actual['fresnel_radii'], actual['fresnel_clearances']):
+        assert abs(clearance - 0.6 * radius - fresnel_clearance) <= EPSILON
+
+
+def test_point_to_multipoint():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    targets = [(43.8, 1.8), (43.1, 1.9), (43.52, 1.53), (43.4, 1.1)]
+    actual = profiler.point_to_multipoint(data_source, 43.5, 1.5, [lat for lat, _ in targets],
+                                          [long for _, long in targets], height1=30, height2=10, definition=50,
+                                          batch_size=3)
+
+    for index, (lat, long) in enumerate(targets):
+        expected = profiler.line_of_sight(data_source, 43.5, 1.5, lat, long, height1=30, height2=10, definition=50,
+                                          early_exit=False)
+        assert actual['visible'][index] == expected['visible']
+        assert abs(actual['clearances'][index] - expected['clearance']) <= EPSILON
+        assert abs(actual['obstruction_distances'][index] - expected['distance']) <= EPSILON
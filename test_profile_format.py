@@ -0,0 +1,64 @@
+"""
+    Tests for the profile_format module
+"""
+
+import json
+
+import numpy as np
+
+import profile_format
+
+
+def test_binary_roundtrip():
+    profile_data = {
+        'distances': np.linspace(0, 82374.48654874, 10),
+        'elevations': np.array([280., 326., 228., 184., 241., 158., 224., 209., 190., 184.]),
+        'latitudes': np.linspace(43.2, 43.8, 10),
+        'longitudes': np.linspace(1.2, 1.8, 10),
+        'overheads': np.array([0., 52.6953, 92.1818, 118.4743, 131.5879, 131.5375, 118.3384, 92.0056, 52.5544, 0.]),
+        'sights': np.linspace(280., 184., 10)
+    }
+    data = profile_format.BINARY.get_data(profile_data)
+    actual = profile_format.read_binary_profile(data)
+
+    assert sorted(actual) == sorted(profile_data)
+    assert actual['elevations'].dtype == np.int16
+    assert np.array_equal(actual['latitudes'], profile_data['latitudes'])
+    for key in profile_data:
+        assert np.allclose(actual[key], profile_data[key], atol=0.01)
+
+    # interpolated elevations are not integers
+    profile_data['elevations'] = profile_data['elevations'] + 0.5
+    actual = profile_format.read_binary_profile(profile_format.BINARY.get_data(profile_data))
+    assert actual['elevations'].dtype == np.float32
+    assert np.allclose(actual['elevations'], profile_data['elevations'])
+
+
+def test_binary_roundtrip_2d():
+    # batches of profiles (see profiler.profile_many) have one row per profile
+    profile_data = {
+        'elevations': np.array([[280., 326., 228.], [184., 241., 158.]]),
+        'latitudes': np.linspace(43.2, 43.8, 6).reshape(2, 3),
+        'distances': np.array([0., 9166.70306504])
+    }
+    actual = profile_format.read_binary_profile(profile_format.BINARY.get_data(profile_data))
+
+    for key in profile_data:
+        assert actual[key].shape == profile_data[key].shape
+        assert np.allclose(actual[key], profile_data[key], atol=0.01)
+
+
+def test_json_precision():
+    profile_data = {'latitudes': np.array([43.2, 43.26666666]), 'elevations': np.array([280.04, np.nan])}
+    actual = profile_format.JSON.get_data(profile_data)
+
+    assert actual == '{"elevations": [280.0,null], "latitudes": [43.200000,43.266667]}'
+    assert json.loads(profile_format.JSONProfileFormat({'elevations': 2}, chunk_size=1).get_data(profile_data)) == \
+        {'elevations': [280.04, None], 'latitudes': [43.2, 43.266667]}
+
+
+def test_numpy_encoder_no_data():
+    actual = json.dumps({'values': np.array([1.5, np.nan]), 'indexes': np.array([1, 2])},
+                        cls=profile_format.NumpyEncoder, sort_keys=True)
+
+    assert actual == '{"indexes": [1, 2], "values": [1.5, null]}'
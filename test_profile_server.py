@@ -0,0 +1,160 @@
+"""
+    Tests for the profile_server module, the service being served in this process
+"""
+
+import ConfigParser
+import io
+import json
+import socket
+import urllib2
+
+import cherrypy
+
+import dataset_pool
+import hgt
+import profile_server
+import response_cache
+
+CONFIG = ConfigParser.ConfigParser()
+CONFIG.read('pytest.ini')
+DS_FILENAME = CONFIG.get('dem', 'location')
+BASE_URL = 'http://127.0.0.1:%d/profile/'
+# the same service, with a response cache
+CACHED_URL = 'http://127.0.0.1:%d/cached/'
+
+
+def setup_module():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    global BASE_URL, CACHED_URL  # pylint: disable=global-statement
+    BASE_URL %= port
+    CACHED_URL %= port
+    cherrypy.config.update({'server.socket_host': '127.0.0.1', 'server.socket_port': port, 'log.screen': False,
+                            'checker.on': False, 'engine.autoreload.on': False})
+    pool = dataset_pool.DatasetPool(lambda: hgt.HGTDataSource(DS_FILENAME), 2)
+    cherrypy.tree.mount(profile_server.Profile(pool), '/profile')
+    cherrypy.tree.mount(profile_server.Profile(pool, response_cache.ResponseCache()), '/cached')
+    cherrypy.engine.start()
+
+
+def teardown_module():
+    cherrypy.engine.exit()
+
+
+def post(endpoint, body, content_type):
+    return urllib2.urlopen(urllib2.Request(BASE_URL + endpoint, body, {'Content-Type': content_type}))
+
+
+def test_iter_json_list():
+    document = '[{"lat1": 43.5, "long1": 1.5}, 12, 3.5e3 , "]", [1, 2]]'
+    for read_size in (1, 3, 1024):
+        assert list(profile_server.iter_json_list(io.BytesIO(document), read_size)) == json.loads(document)
+    assert list(profile_server.iter_json_list(io.BytesIO(' [ ] '))) == []
+
+    for document in ('', '{}', '[1 2]', '[1,', '[{"lat1": 43.5}'):
+        try:
+            list(profile_server.iter_json_list(io.BytesIO(document), 2))
+        except ValueError:
+            continue
+        assert False, document
+
+
+def test_batch_large():
+    count = 2000
+    segments = [{'lat1': 43.2 + index * 0.0001, 'long1': 1.2, 'lat2': 43.8, 'long2': 1.8, 'definition': 10}
+                for index in range(count)]
+    bodies = {
+        'application/json': json.dumps(segments),
+        'application/x-ndjson': '\n'.join(json.dumps(segment) for segment in segments),
+        'text/csv': 'lat1,long1,lat2,long2,definition\n' + '\n'.join(
+            '%(lat1)s,%(long1)s,%(lat2)s,%(long2)s,%(definition)s' % segment for segment in segments)
+    }
+
+    for content_type, body in bodies.items():
+        lines = [json.loads(line) for line in post('batch', body, content_type)]
+
+        assert [line['index'] for line in lines] == range(count)
+        assert all(len(line['profile']['elevations']) == 10 for line in lines)
+        assert lines[-1]['profile']['elevations'][-1] == 184
+
+
+def test_batch_invalid_body():
+    try:
+        post('batch', '{"lat1": 43.5}', 'application/json')
+    except urllib2.HTTPError as error:
+        assert error.code == 400
+    else:
+        assert False
+
+    lines = [json.loads(line) for line in post('batch', '{"lat1": 43.2, "long1": 1.2, "lat2": 43.8, "long2": 1.8}\n'
+                                                        'not json\n', 'application/x-ndjson')]
+    assert [sorted(line) for line in lines] == [['index', 'profile'], ['error', 'index']]
+
+
+def test_out_of_extent():
+    for endpoint in ('json', 'los'):
+        try:
+            urllib2.urlopen(BASE_URL + endpoint + '?lat1=10&long1=1.5&lat2=43.6&long2=1.6')
+        except urllib2.HTTPError as error:
+            assert error.code == 400
+        else:
+            assert False, endpoint
+
+    lines = [json.loads(line) for line in post('batch', json.dumps([
+        {'lat1': 10, 'long1': 1.5, 'lat2': 43.6, 'long2': 1.6},
+        {'lat1': 43.5, 'long1': 1.5, 'lat2': 43.6, 'long2': 1.6}]), 'application/json')]
+    assert 'error' in lines[0] and 'profile' in lines[1]
+
+
+def test_invalid_coordinates():
+    try:
+        urllib2.urlopen(BASE_URL + 'json?lat1=x&long1=1.5&lat2=43.6&long2=1.6')
+    except urllib2.HTTPError as error:
+        assert error.code == 400
+    else:
+        assert False
+
+
+def test_json_streamed_then_cached():
+    url = CACHED_URL + 'json?lat1=43.2&long1=1.2&lat2=43.8&long2=1.8&definition=10'
+
+    streamed = urllib2.urlopen(url)
+    assert streamed.info().get('ETag') is None
+    body = streamed.read()
+
+    cached = urllib2.urlopen(url)
+    assert cached.info().get('ETag') == response_cache.compute_etag(body)
+    assert cached.read() == body
+
+
+def assert_not_modified(url, etag):
+    try:
+        urllib2.urlopen(urllib2.Request(url, headers={'If-None-Match': etag}))
+    except urllib2.HTTPError as error:
+        assert error.code == 304
+    else:
+        assert False, url
+
+
+def test_conditional_requests():
+    query = '?lat1=43.3&long1=1.3&lat2=43.7&long2=1.7&definition=10'
+    for endpoint in ('json', 'binary', 'png'):
+        url = CACHED_URL + endpoint + query + ('&style=raster' if endpoint == 'png' else '')
+        # a JSON miss is streamed without ETag
+        body = urllib2.urlopen(url).read()
+
+        cached = urllib2.urlopen(url)
+        etag = cached.info().get('ETag')
+        assert etag == response_cache.compute_etag(body)
+        assert cached.read() == body
+        assert_not_modified(url, etag)
+
+
+def test_coordinates_rounded_only_when_cached():
+    query = 'json?lat1=43.2000049&long1=1.2&lat2=43.8&long2=1.8&definition=10'
+
+    assert json.load(urllib2.urlopen(BASE_URL + query))['latitudes'][0] == 43.200005
+    assert json.load(urllib2.urlopen(CACHED_URL + query))['latitudes'][0] == 43.2
@@ -0,0 +1,37 @@
+"""
+    Tests for the render_pool module
+"""
+
+import numpy as np
+import pytest
+
+import render_pool
+
+
+def test_pack_profile():
+    profile_data = {'distances': np.linspace(0, 82374.48654874, 10), 'elevations': np.array([280, 326, 228, 184])}
+    actual = render_pool.unpack_profile(render_pool.pack_profile(profile_data))
+
+    assert sorted(actual) == sorted(profile_data)
+    for key in profile_data:
+        assert actual[key].shape == profile_data[key].shape
+        assert np.allclose(actual[key], profile_data[key], atol=0.01)
+
+
+def test_pooled_png_profile_format():
+    renderers = render_pool.RenderPool(1)
+    try:
+        distances = np.linspace(0, 20000, 64)
+        actual = render_pool.PooledPNGProfileFormat(renderers, 'curved_sight').get_data({
+            'distances': distances,
+            'elevations': 200 + 50 * np.sin(distances / 3000),
+            'overheads': distances * (20000 - distances) / (2 * 6371000),
+            'sights': np.linspace(260, 240, 64)
+        })
+    finally:
+        renderers.close()
+
+    assert actual.startswith('\x89PNG\r\n\x1a\n')
+
+    with pytest.raises(Exception):
+        render_pool.PooledPNGProfileFormat(renderers, 'raster')
@@ -0,0 +1,32 @@
+"""
+    Tests for the response_cache module
+"""
+
+import response_cache
+
+
+def test_make_key():
+    key1 = response_cache.make_key('los', response_cache.quantize('43.5000001'), 1.5, height1=10., definition=None)
+    key2 = response_cache.make_key('los', response_cache.quantize(43.5), 1.5, height1=10.)
+
+    assert key1 == key2
+    assert key1 != response_cache.make_key('los', 43.5, 1.5, height1=20.)
+
+
+def test_cache_lru_and_ttl():
+    now = [0.]
+    cache = response_cache.ResponseCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    first = cache.put('a', 'application/json', '[1]')
+    cache.put('b', 'application/json', '[2]')
+
+    assert cache.get('a') is first
+    assert first.etag == response_cache.compute_etag('[1]')
+
+    # 'b' is the least recently used
+    cache.put('c', 'application/json', '[3]')
+    assert cache.get('b') is None
+    assert cache.get('c').body == '[3]'
+
+    now[0] = 10.
+    assert cache.get('a') is None
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'entries': 1}
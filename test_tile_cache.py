@@ -0,0 +1,54 @@
+"""
+    Tests for the tile_cache module
+"""
+
+import numpy as np
+import gdal
+from gdalconst import GA_ReadOnly
+import ConfigParser
+
+import geods
+import tile_cache
+
+CONFIG = ConfigParser.ConfigParser()
+CONFIG.read('pytest.ini')
+DS_FILENAME = CONFIG.get('dem', 'location')
+
+
+def test_cached_band_read():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    cache = tile_cache.TileCache(tile_size=100)
+    cached_band = tile_cache.CachedDataSource(data_source, cache).GetRasterBand(1)
+    expected = data_source.GetRasterBand(1).ReadAsArray(150, 250, 230, 120)
+    actual = cached_band.ReadAsArray(150, 250, 230, 120)
+
+    assert np.array_equal(expected, actual)
+    assert cache.stats()['misses'] == 6
+    assert cache.stats()['hits'] == 0
+
+    cached_band.ReadAsArray(160, 260, 10, 10)
+    assert cache.stats()['hits'] == 1
+
+
+def test_cache_eviction():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    # 100x100 int16 tiles are 20000 bytes, only 2 fit in the budget
+    cache = tile_cache.TileCache(budget_mb=50000. / 1024 / 1024, tile_size=100)
+    cached_band = tile_cache.CachedDataSource(data_source, cache).GetRasterBand(1)
+    cached_band.ReadAsArray(0, 0, 300, 10)
+
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['tiles'] == 2
+
+
+def test_read_ds_data_cached():
+    expected = np.array([195, 182, 176, 177, 175, 160, 136, 130, 109, 113])
+    gdal.AllRegister()
+    data_source = tile_cache.CachedDataSource(gdal.Open(DS_FILENAME, GA_ReadOnly), tile_cache.TileCache())
+    actual = geods.read_ds_data(data_source, np.linspace(300, 400, 10, dtype=int),
+                                np.linspace(400, 300, 10, dtype=int))
+
+    for exp, act in zip(expected, actual):
+        assert exp == act
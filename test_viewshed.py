@@ -0,0 +1,50 @@
+"""
+    Tests for the viewshed module
+"""
+
+import gdal
+from gdalconst import GA_ReadOnly
+import ConfigParser
+
+import pytest
+
+import geods
+import hgt
+import viewshed
+
+CONFIG = ConfigParser.ConfigParser()
+CONFIG.read('pytest.ini')
+DS_FILENAME = CONFIG.get('dem', 'location')
+
+
+def test_viewshed():
+    gdal.AllRegister()
+    data_source = gdal.Open(DS_FILENAME, GA_ReadOnly)
+    visibility, geo_transform, _ = viewshed.viewshed(data_source, 43.5, 1.5, 5000, observer_height=20)
+    observer_x = int((1.5 - geo_transform[0]) / geo_transform[1])
+    observer_y = int((43.5 - geo_transform[3]) / geo_transform[5])
+
+    assert visibility.shape == (109, 151)
+    assert visibility[observer_y, observer_x] == viewshed.VISIBLE
+    assert visibility[0, 0] == viewshed.OUT_OF_RADIUS
+    # the direct neighbours of the observer are always visible
+    assert visibility[observer_y, observer_x + 1] == viewshed.VISIBLE
+    assert visibility[observer_y + 1, observer_x] == viewshed.VISIBLE
+
+
+def test_viewshed_observer_out_of_the_dem():
+    data_source = hgt.HGTDataSource(DS_FILENAME)
+    for wgs84_lat in (44.5, 42.5):
+        with pytest.raises(geods.OutOfExtentError):
+            viewshed.viewshed(data_source, wgs84_lat, 1.5, 5000)
+
+
+def test_viewshed_observer_on_the_edge():
+    data_source = hgt.HGTDataSource(DS_FILENAME)
+    visibility, geo_transform, _ = viewshed.viewshed(data_source, 44., 1.5, 5000, observer_height=20)
+    observer_x = int((1.5 - geo_transform[0]) / geo_transform[1])
+
+    # the window is clamped to the top row of the tile, where the observer is
+    assert geo_transform[3] == data_source.GetGeoTransform()[3]
+    assert visibility.shape == (55, 153)
+    assert visibility[0, observer_x] == viewshed.VISIBLE
@@ -0,0 +1,188 @@
+"""
+Cache of DEM raster tiles shared between the readers of a dataset (typically the requests of the web server).
+
+The raster is split into fixed-size square tiles, each tile is read and decoded once into a numpy array then kept in a
+LRU cache bounded by a memory budget.
+
+CachedDataSource wraps a GDAL dataset and can be used in place of it with the geods functions.
+"""
+
+import collections
+import logging
+import os
+import threading
+
+import numpy as np
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_BUDGET_MB = 64
+
+
+class TileCache(object):
+    """
+    LRU cache of raster tiles decoded to numpy arrays, bounded by a memory budget.
+
+    It is thread safe and can be shared between several datasets, tiles are identified by a dataset key.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, tile_size=DEFAULT_TILE_SIZE):
+        """
+        :param budget_mb: the maximum size of the cached tiles in MB
+        :param tile_size: the width and height of a tile in pixels
+        """
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.tile_size = tile_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._tiles = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_tile(self, key, band, tile_x, tile_y):
+        """
+        Return a tile, reading it from the band if it is not in the cache.
+
+        :param key: the key identifying the band among the ones sharing this cache
+        :param band: the band to read the tile from on a cache miss
+        :param tile_x: the x index of the tile
+        :param tile_y: the y index of the tile
+        :return: the tile as a read-only numpy array, tiles on the right and bottom edges may be smaller
+        """
+        tile_key = (key, tile_x, tile_y)
+        with self._lock:
+            tile = self._tiles.pop(tile_key, None)
+            if tile is not None:
+                # re-inserted as the most recently used
+                self._tiles[tile_key] = tile
+                self.hits += 1
+                return tile
+            self.misses += 1
+
+        offset_x = tile_x * self.tile_size
+        offset_y = tile_y * self.tile_size
+        tile = band.ReadAsArray(offset_x, offset_y, min(self.tile_size, band.XSize - offset_x),
+                                min(self.tile_size, band.YSize - offset_y))
+        if tile is None:
+            raise IOError("Unable to read the DEM tile at %d, %d" % (offset_x, offset_y))
+        tile.flags.writeable = False
+
+        with self._lock:
+            if tile_key not in self._tiles:
+                self._tiles[tile_key] = tile
+                self.size += tile.nbytes
+                # always keep the last tile, even if it alone exceeds the budget
+                while self.size > self.budget and len(self._tiles) > 1:
+                    _, evicted = self._tiles.popitem(last=False)
+                    self.size -= evicted.nbytes
+                    self.evictions += 1
+
+        return tile
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: a dict with the 'hits', 'misses', 'evictions', 'tiles' and 'size' (in bytes) keys
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'tiles': len(self._tiles),
+                    'size': self.size}
+
+
+class CachedBand(object):
+    """
+    Raster band serving reads from a TileCache, it implements the subset of the GDAL band interface used by geods.
+    """
+
+    def __init__(self, band, cache, key):
+        """
+        :param band: the GDAL band to read tiles from
+        :param cache: the TileCache to use
+        :param key: the key identifying the band in the cache
+        """
+        self.band = band
+        self.cache = cache
+        self.key = key
+        self.XSize = band.XSize  # pylint: disable=invalid-name
+        self.YSize = band.YSize  # pylint: disable=invalid-name
+        self.DataType = band.DataType  # pylint: disable=invalid-name
+
+    def GetNoDataValue(self):  # pylint: disable=invalid-name
+        """
+        :return: the no data value of the band
+        """
+        return self.band.GetNoDataValue()
+
+    def GetBlockSize(self):  # pylint: disable=invalid-name
+        """
+        :return: the tile size of the cache as [width, height]
+        """
+        return [self.cache.tile_size, self.cache.tile_size]
+
+    def ReadAsArray(self, xoff, yoff, win_xsize, win_ysize):  # pylint: disable=invalid-name
+        """
+        Read a window of the band, assembled from the cached tiles.
+
+        :param xoff: the x offset of the window
+        :param yoff: the y offset of the window
+        :param win_xsize: the width of the window
+        :param win_ysize: the height of the window
+        :return: the window as a numpy array
+        """
+        tile_size = self.cache.tile_size
+        first_x, last_x = xoff // tile_size, (xoff + win_xsize - 1) // tile_size
+        first_y, last_y = yoff // tile_size, (yoff + win_ysize - 1) // tile_size
+
+        if first_x == last_x and first_y == last_y:
+            tile = self.cache.get_tile(self.key, self.band, first_x, first_y)
+            start_x = xoff - first_x * tile_size
+            start_y = yoff - first_y * tile_size
+            return tile[start_y:start_y + win_ysize, start_x:start_x + win_xsize]
+
+        window = None
+        for tile_y in range(first_y, last_y + 1):
+            for tile_x in range(first_x, last_x + 1):
+                tile = self.cache.get_tile(self.key, self.band, tile_x, tile_y)
+                if window is None:
+                    window = np.empty((win_ysize, win_xsize), dtype=tile.dtype)
+                # intersection of the tile and the window, in band coordinates
+                start_x = max(xoff, tile_x * tile_size)
+                end_x = min(xoff + win_xsize, (tile_x + 1) * tile_size)
+                start_y = max(yoff, tile_y * tile_size)
+                end_y = min(yoff + win_ysize, (tile_y + 1) * tile_size)
+                window[start_y - yoff:end_y - yoff, start_x - xoff:end_x - xoff] = \
+                    tile[start_y - tile_y * tile_size:end_y - tile_y * tile_size,
+                         start_x - tile_x * tile_size:end_x - tile_x * tile_size]
+
+        return window
+
+
+class CachedDataSource(object):
+    """
+    Dataset wrapper whose first band reads through a TileCache, other calls are forwarded to the wrapped dataset.
+    """
+
+    def __init__(self, data_source, cache):
+        """
+        :param data_source: the GDAL dataset to wrap
+        :param cache: the TileCache to use, it can be shared with other datasets
+        """
+        self.data_source = data_source
+        self.cache = cache
+        self.band = CachedBand(data_source.GetRasterBand(1), cache, data_source.GetDescription())
+
+    def GetRasterBand(self, index):  # pylint: disable=invalid-name
+        """
+        :param index: the 1-based band index, only the first band is cached
+        :return: the band
+        """
+        if index == 1:
+            return self.band
+
+        return self.data_source.GetRasterBand(index)
+
+    def __getattr__(self, name):
+        return getattr(self.data_source, name)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+"""
+Program that computes the viewshed of an observer referenced by its WGS 84 latitude and longitude: the DEM cells
+around it that it can see, within a radius. The result is written as a GeoTIFF (1 visible, 0 not visible, 255 out of
+the radius).
+"""
+
+import argparse
+import ConfigParser
+import logging
+import os
+
+import numpy as np
+from osgeo import gdal
+
+import dem_catalog
+import geods
+import geometry
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+VISIBLE = 1
+NOT_VISIBLE = 0
+OUT_OF_RADIUS = 255
+
+# number of rays swept at once, bounds the memory used by the sweep
+RAYS_PER_BATCH = 256
+
+
+def pixel_sizes(data_source, offset_x, offset_y):
+    """
+    Compute the size in meters of the pixels of a dataset around the given pixel.
+
+    :param data_source: the dataset
+    :param offset_x: the x offset of the pixel
+    :param offset_y: the y offset of the pixel
+    :return: the couple of sizes (width, height) in meters
+    """
+    transform = data_source.GetGeoTransform()
+    # centers of the pixel and of its right and bottom neighbours
+    pixel_x = np.array([offset_x, offset_x + 1, offset_x]) + 0.5
+    pixel_y = np.array([offset_y, offset_y, offset_y + 1]) + 0.5
+    transformer = geods.get_wgs84_transformer(data_source.GetProjectionRef())
+    lats, longs = transformer.inverse_transform_points(transform[0] + pixel_x * transform[1],
+                                                       transform[3] + pixel_y * transform[5])
+    sizes = geometry.distance_between_wgs84_coordinates(lats[0], longs[0], lats[1:], longs[1:])
+
+    return sizes[0], sizes[1]
+
+
+def perimeter(width, height):
+    """
+    List the cells on the border of a window, clockwise from the top left corner.
+
+    :param width: the width of the window
+    :param height: the height of the window
+    :return: the couple of numpy arrays of x and y offsets of the cells
+    """
+    top_x = np.arange(width)
+    right_y = np.arange(1, height)
+    bottom_x = np.arange(width - 2, -1, -1)
+    left_y = np.arange(height - 2, 0, -1)
+    cells_x = np.concatenate([top_x, np.full(len(right_y), width - 1, dtype=int), bottom_x,
+                              np.zeros(len(left_y), dtype=int)])
+    cells_y = np.concatenate([np.zeros(width, dtype=int), right_y, np.full(len(bottom_x), height - 1, dtype=int),
+                              left_y])
+
+    return cells_x, cells_y
+
+
+def viewshed(data_source, wgs84_lat, wgs84_long, radius, observer_height=0, target_height=0, above_ground=True):
+    """
+    Compute the viewshed of an observer, the cells of the DEM it can see within a radius.
+
+    The DEM window covering the radius is read once, then rays are swept from the observer to every cell of the
+    window border (R2 algorithm), all the rays of a batch at once with numpy: a cell is visible if the slope from the
+    observer to the target above it is at least the maximum slope of the terrain before it along a ray.
+    Elevations are corrected by the curvature of the earth (geometry.overhead_height), distances are computed on the
+    plane tangent at the observer, which is accurate for the usual radii.
+
+    A data source providing a data_source_at method (like a dem_catalog.DEMCatalog) is limited to the tile containing
+    the observer. An observer out of the DEM raises a geods.OutOfExtentError.
+
+    :param data_source: the dataset to read elevation data from
+    :param wgs84_lat: the latitude of the observer
+    :param wgs84_long: the longitude of the observer
+    :param radius: the radius of the viewshed in meters
+    :param observer_height: the height of the observer above the ground (or the sea), defaults to 0
+    :param target_height: the height of the targets above the ground, defaults to 0
+    :param above_ground: is observer height above the ground (True) or above the sea (False), defaults to True
+    :return: the visibility raster (VISIBLE, NOT_VISIBLE or OUT_OF_RADIUS) as a numpy array of uint8, with its
+             geotransform and projection (WKT)
+    """
+    if hasattr(data_source, 'data_source_at'):
+        data_source = data_source.data_source_at(wgs84_lat, wgs84_long)
+    if not geods.raster_contains(data_source, wgs84_lat, wgs84_long):
+        raise geods.OutOfExtentError("The observer is out of the DEM: %f, %f" % (wgs84_lat, wgs84_long))
+
+    transform = data_source.GetGeoTransform()
+    projected_x, projected_y = geods.transform_from_wgs84(data_source.GetProjectionRef(), wgs84_lat, wgs84_long)
+    observer_x, observer_y = [int(offset) for offset in geods.compute_offset(transform, projected_x, projected_y)]
+    size_x, size_y = pixel_sizes(data_source, observer_x, observer_y)
+
+    # read the window covering the radius, once
+    min_x = max(observer_x - int(np.ceil(radius / size_x)), 0)
+    max_x = min(observer_x + int(np.ceil(radius / size_x)), data_source.RasterXSize - 1)
+    min_y = max(observer_y - int(np.ceil(radius / size_y)), 0)
+    max_y = min(observer_y + int(np.ceil(radius / size_y)), data_source.RasterYSize - 1)
+    band = data_source.GetRasterBand(1)
+    elevations = geods.mask_no_data(geods.read_band_array(band, min_x, min_y, max_x - min_x + 1, max_y - min_y + 1),
+                                    band.GetNoDataValue()).astype(float)
+    height, width = elevations.shape
+    observer_x -= min_x
+    observer_y -= min_y
+    LOGGER.debug("viewshed window: %dx%d pixels", width, height)
+
+    # distances on the tangent plane and elevations corrected by the curvature of the earth
+    cells_y, cells_x = np.indices(elevations.shape)
+    distances = np.hypot((cells_x - observer_x) * size_x, (cells_y - observer_y) * size_y)
+    elevations -= geometry.overhead_height(distances / geometry.EARTH_RADIUS, geometry.EARTH_RADIUS)
+    observer_elevation = float(observer_height)
+    if above_ground:
+        observer_elevation += elevations[observer_y, observer_x]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terrain_slopes = ((elevations - observer_elevation) / distances).ravel()
+        target_slopes = ((elevations + target_height - observer_elevation) / distances).ravel()
+
+    visible = np.zeros(elevations.size, dtype=bool)
+    ends_x, ends_y = perimeter(width, height)
+    for start in range(0, len(ends_x), RAYS_PER_BATCH):
+        # rays of the batch as rows, sampled once per cell along their major axis
+        delta_x = (ends_x[start:start + RAYS_PER_BATCH] - observer_x)[:, np.newaxis]
+        delta_y = (ends_y[start:start + RAYS_PER_BATCH] - observer_y)[:, np.newaxis]
+        lengths = np.maximum(np.abs(delta_x), np.abs(delta_y))
+        steps = np.arange(1, lengths.max() + 1)
+        fractions = steps / np.maximum(lengths, 1).astype(float)
+        on_ray = steps <= lengths
+        ray_x = np.clip(np.round(observer_x + fractions * delta_x).astype(int), 0, width - 1)
+        ray_y = np.clip(np.round(observer_y + fractions * delta_y).astype(int), 0, height - 1)
+        cells = ray_y * width + ray_x
+
+        # maximum slope of the terrain before each cell of a ray, NaN (no data) being ignored
+        slopes = np.where(on_ray, terrain_slopes[cells], -np.inf)
+        previous_max = np.fmax.accumulate(np.concatenate([np.full((len(cells), 1), -np.inf), slopes[:, :-1]], axis=1),
+                                          axis=1)
+        visible[cells[on_ray & (target_slopes[cells] >= previous_max)]] = True
+
+    visibility = np.where(visible, VISIBLE, NOT_VISIBLE).astype(np.uint8).reshape(elevations.shape)
+    visibility[observer_y, observer_x] = VISIBLE
+    visibility[distances > radius] = OUT_OF_RADIUS
+
+    window_transform = (transform[0] + min_x * transform[1], transform[1], transform[2],
+                        transform[3] + min_y * transform[5], transform[4], transform[5])
+    return visibility, window_transform, data_source.GetProjectionRef()
+
+
+def write_geotiff(filename, raster, geo_transform, projection_ref, no_data=OUT_OF_RADIUS):
+    """
+    Write a raster to a GeoTIFF file.
+
+    :param filename: the file location
+    :param raster: the numpy array of uint8 to write
+    :param geo_transform: the affine transformation of the raster
+    :param projection_ref: the coordinate system of the raster in WKT
+    :param no_data: the no data value of the raster, defaults to OUT_OF_RADIUS
+    :return: None
+    """
+    driver = gdal.GetDriverByName('GTiff')
+    data_source = driver.Create(filename, raster.shape[1], raster.shape[0], 1, gdal.GDT_Byte, ['COMPRESS=DEFLATE'])
+    data_source.SetGeoTransform(geo_transform)
+    data_source.SetProjection(projection_ref)
+    band = data_source.GetRasterBand(1)
+    band.SetNoDataValue(no_data)
+    band.WriteArray(raster)
+    band.FlushCache()
+
+
+def main():
+    """Main entrypoint"""
+    config = ConfigParser.ConfigParser()
+    config.read('config.ini')
+    config_dem_location = config.get('dem', 'location')
+    config_dem_backend = config.get('dem', 'backend')
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('lat', type=float, help="observer latitude, ex: 43.561725")
+    parser.add_argument('long', type=float, help="observer longitude, ex: 1.444796")
+    parser.add_argument('-r', '--radius', type=float, default=10000, help="radius in meters, defaults to 10000")
+    parser.add_argument('-d', '--dem', help="DEM file or DEM tiles directory location, "
+                                            "ex: '/path/to/file/EUD_CP-DEMS_3500025000-AA.tif'",
+                        default=config_dem_location)
+    parser.add_argument('-b', '--backend', choices=dem_catalog.BACKENDS, default=config_dem_backend,
+                        help="DEM reader, 'auto' reads .hgt files natively and other files with GDAL")
+    offset_group = parser.add_mutually_exclusive_group()
+    offset_group.add_argument('-og', '--offset-ground', type=float, metavar='OFF',
+                              help="observer offset from the ground level, ex: 6")
+    offset_group.add_argument('-os', '--offset-sea', type=float, metavar='OFF',
+                              help="observer offset from the sea level, ex: 180")
+    parser.add_argument('-t', '--target-height', type=float, default=0,
+                        help="targets offset from the ground level, defaults to 0")
+    parser.add_argument('-f', '--filename', default='viewshed.tif', help="file name, defaults to viewshed.tif")
+    args = parser.parse_args()
+
+    kwargs = {}
+    if args.offset_sea is not None:
+        kwargs['observer_height'] = args.offset_sea
+        kwargs['above_ground'] = False
+    elif args.offset_ground is not None:
+        kwargs['observer_height'] = args.offset_ground
+
+    # register all of the drivers
+    gdal.AllRegister()
+    data_source = dem_catalog.open_dem(args.dem, args.backend)
+
+    visibility, geo_transform, projection_ref = viewshed(data_source, args.lat, args.long, args.radius,
+                                                         target_height=args.target_height, **kwargs)
+    write_geotiff(args.filename, visibility, geo_transform, projection_ref)
+    LOGGER.info("%d visible cells written to %s", np.count_nonzero(visibility == VISIBLE), args.filename)
+
+
+if __name__ == '__main__':
+    main()